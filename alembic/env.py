@@ -0,0 +1,34 @@
+"""Окружение alembic: engine и метаданные моделей берутся из приложения"""
+from alembic import context
+
+from app.database import Base
+
+config = context.config
+
+
+def run_migrations():
+    """
+    Миграции через engine приложения (DATABASE_URL) или соединение init_db
+
+    Только online-режим: миграции проверяют существующую схему.
+    """
+    from app.database import engine
+
+    connection = config.attributes.get("connection")
+    if connection is None:
+        with engine.begin() as connection:
+            _run(connection)
+    else:
+        _run(connection)
+
+
+def _run(connection):
+    context.configure(connection=connection, target_metadata=Base.metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    raise Exception("Offline migrations (--sql) are not supported")
+
+run_migrations()
@@ -0,0 +1,51 @@
+"""Исходная схема: publish_jobs
+
+Базы, созданные раньше через create_all, уже содержат таблицу — для них
+миграция ничего не делает.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("publish_jobs"):
+        return
+
+    op.create_table(
+        "publish_jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("submission_id", sa.String(), nullable=False),
+        sa.Column("video_hash", sa.String(), nullable=False),
+        sa.Column("s3_key", sa.String(), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("duration", sa.Integer(), nullable=True),
+        sa.Column("platform", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("tags", sa.JSON(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("platform_job_id", sa.String(), nullable=True),
+        sa.Column("public_url", sa.String(), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("retry_count", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("published_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_publish_jobs_submission_id", "publish_jobs", ["submission_id"], unique=True)
+    op.create_index("ix_publish_jobs_video_hash", "publish_jobs", ["video_hash"])
+    op.create_index("ix_publish_jobs_platform", "publish_jobs", ["platform"])
+    op.create_index("ix_publish_jobs_status", "publish_jobs", ["status"])
+
+
+def downgrade():
+    op.drop_table("publish_jobs")
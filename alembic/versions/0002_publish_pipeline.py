@@ -0,0 +1,243 @@
+"""Группы, дедупликация, outbox, аренда, попытки, архив и статистика
+
+Колонки и индексы publish_jobs, которые create_all не добавляет в
+существующую таблицу, и новые таблицы. Объекты, уже созданные create_all
+(например, новые таблицы после старта API), пропускаются.
+
+Перед созданием частичного уникального индекса лишние активные задачи
+одного видео и платформы переводятся в FAILED без повторов: остается
+задача с самым продвинутым статусом (COMPLETED, затем PROCESSING),
+среди равных — самая ранняя.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+ACTIVE_CONDITION = "status IN ('PENDING', 'PROCESSING', 'COMPLETED')"
+
+# retry_count > PUBLISH_MAX_RETRIES (3): задача финальная, повтора не ждет
+EXHAUSTED_RETRY_COUNT = 4
+
+DUPLICATE_ERROR = "Duplicate of another active job for the same video and platform"
+
+PUBLISH_JOB_INDEXES = (
+    ("ix_publish_jobs_group_id", ["group_id"]),
+    ("ix_publish_jobs_platform_status", ["platform_status"]),
+    ("ix_publish_jobs_created_id", ["created_at", "id"]),
+    ("ix_publish_jobs_platform_created_id", ["platform", "created_at", "id"]),
+    ("ix_publish_jobs_status_created_id", ["status", "created_at", "id"]),
+    ("ix_publish_jobs_hash_created_id", ["video_hash", "created_at", "id"]),
+    ("ix_publish_jobs_status_lease", ["status", "lease_expires_at"]),
+)
+
+
+def upgrade():
+    ensure_table(
+        "publish_groups",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("video_hash", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    ensure_index("ix_publish_groups_video_hash", "publish_groups", ["video_hash"])
+
+    ensure_columns(
+        "publish_jobs",
+        sa.Column("group_id", sa.String(), sa.ForeignKey("publish_groups.id", name="fk_publish_jobs_group_id"), nullable=True),
+        sa.Column("platform_status", sa.String(), nullable=True),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("lease_owner", sa.String(), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+        sa.Column("upload_state", sa.JSON(), nullable=True),
+    )
+    for name, columns in PUBLISH_JOB_INDEXES:
+        ensure_index(name, "publish_jobs", columns)
+
+    if not has_index("publish_jobs", "uq_publish_jobs_active_video_platform"):
+        retire_duplicate_active_jobs()
+        op.create_index(
+            "uq_publish_jobs_active_video_platform",
+            "publish_jobs",
+            ["video_hash", "platform"],
+            unique=True,
+            postgresql_where=sa.text(ACTIVE_CONDITION),
+            sqlite_where=sa.text(ACTIVE_CONDITION)
+        )
+
+    ensure_table(
+        "publish_jobs_archive",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("submission_id", sa.String(), nullable=False),
+        sa.Column("group_id", sa.String(), nullable=True),
+        sa.Column("video_hash", sa.String(), nullable=False),
+        sa.Column("s3_key", sa.String(), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("duration", sa.Integer(), nullable=True),
+        sa.Column("platform", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("tags", sa.JSON(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("platform_job_id", sa.String(), nullable=True),
+        sa.Column("public_url", sa.String(), nullable=True),
+        sa.Column("platform_status", sa.String(), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("retry_count", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("published_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+    )
+    ensure_index("ix_publish_jobs_archive_submission_id", "publish_jobs_archive", ["submission_id"], unique=True)
+    ensure_index("ix_publish_jobs_archive_group_id", "publish_jobs_archive", ["group_id"])
+
+    ensure_table(
+        "publish_attempts",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("submission_id", sa.String(), nullable=False),
+        sa.Column("platform", sa.String(), nullable=False),
+        sa.Column("attempt", sa.Integer(), nullable=False),
+        sa.Column("task_id", sa.String(), nullable=True),
+        sa.Column("worker_host", sa.String(), nullable=True),
+        sa.Column("outcome", sa.String(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=False),
+        sa.Column("queue_wait_seconds", sa.Float(), nullable=True),
+        sa.Column("download_seconds", sa.Float(), nullable=True),
+        sa.Column("publish_seconds", sa.Float(), nullable=True),
+        sa.Column("api_seconds", sa.Float(), nullable=False),
+        sa.Column("api_calls", sa.Integer(), nullable=False),
+        sa.Column("bytes_sent", sa.BigInteger(), nullable=True),
+        sa.Column("error_class", sa.String(), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+    )
+    ensure_index("ix_publish_attempts_submission_id", "publish_attempts", ["submission_id"])
+    ensure_index("ix_publish_attempts_platform_started", "publish_attempts", ["platform", "started_at"])
+
+    ensure_table(
+        "outbox_messages",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("task", sa.String(), nullable=False),
+        sa.Column("args", sa.JSON(), nullable=False),
+        sa.Column("options", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    ensure_index("ix_outbox_messages_sent_at", "outbox_messages", ["sent_at"])
+    ensure_index(
+        "ix_outbox_messages_unsent",
+        "outbox_messages",
+        ["id"],
+        postgresql_where=sa.text("sent_at IS NULL"),
+        sqlite_where=sa.text("sent_at IS NULL")
+    )
+
+    ensure_table(
+        "publish_stats_hourly",
+        sa.Column("platform", sa.String(), primary_key=True),
+        sa.Column("hour", sa.DateTime(), primary_key=True),
+        *[
+            sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+            for name in ("submitted", "completed", "failed", "retried")
+        ],
+        sa.Column("duration_sum", sa.Float(), nullable=False, server_default="0"),
+        *[
+            sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+            for name in (
+                "duration_count", "duration_le_60", "duration_le_300", "duration_le_900",
+                "duration_le_1800", "duration_le_3600", "duration_le_7200", "duration_le_inf"
+            )
+        ],
+    )
+
+    ensure_table(
+        "publish_stats_events",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("platform", sa.String(), nullable=False),
+        sa.Column("hour", sa.DateTime(), nullable=False),
+        sa.Column("counters", sa.JSON(), nullable=False),
+    )
+
+
+def downgrade():
+    for table in (
+        "publish_stats_events",
+        "publish_stats_hourly",
+        "outbox_messages",
+        "publish_attempts",
+        "publish_jobs_archive",
+    ):
+        op.drop_table(table)
+
+    op.drop_index("uq_publish_jobs_active_video_platform", table_name="publish_jobs")
+    for name, _ in PUBLISH_JOB_INDEXES:
+        op.drop_index(name, table_name="publish_jobs")
+
+    # Внешний ключ group_id удаляется вместе с колонкой
+    with op.batch_alter_table("publish_jobs") as batch:
+        for column in ("group_id", "platform_status", "version", "lease_owner", "lease_expires_at", "upload_state"):
+            batch.drop_column(column)
+
+    op.drop_table("publish_groups")
+
+
+def retire_duplicate_active_jobs():
+    """Оставить одну активную задачу на пару (видео, платформа)"""
+    op.execute(sa.text(f"""
+        UPDATE publish_jobs
+        SET status = 'FAILED',
+            retry_count = :retry_count,
+            error_message = :error_message,
+            version = version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY video_hash, platform
+                    ORDER BY
+                        CASE status WHEN 'COMPLETED' THEN 0 WHEN 'PROCESSING' THEN 1 ELSE 2 END,
+                        created_at,
+                        id
+                ) AS position
+                FROM publish_jobs
+                WHERE {ACTIVE_CONDITION}
+            ) ranked
+            WHERE position > 1
+        )
+    """).bindparams(retry_count=EXHAUSTED_RETRY_COUNT, error_message=DUPLICATE_ERROR))
+
+
+def has_index(table: str, name: str) -> bool:
+    return name in {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def ensure_index(name: str, table: str, columns: list, **kwargs):
+    if not has_index(table, name):
+        op.create_index(name, table, columns, **kwargs)
+
+
+def ensure_table(name: str, *columns: sa.Column):
+    """Создать таблицу или добавить недостающие колонки в существующую"""
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+    else:
+        ensure_columns(name, *columns)
+
+
+def ensure_columns(table: str, *columns: sa.Column):
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+    missing = [column for column in columns if column.name not in existing]
+    if not missing:
+        return
+
+    with op.batch_alter_table(table) as batch:
+        for column in missing:
+            batch.add_column(column)
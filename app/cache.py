@@ -0,0 +1,77 @@
+"""Кеш статусов публикаций в Redis"""
+import orjson
+import redis
+import structlog
+from typing import Dict, Iterable, Optional
+
+from app.config import get_settings
+from app.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+# Ключ компактной записи статуса заявки
+STATUS_KEY = "status:{submission_id}"
+
+
+def cache_status(payload: dict, pipe: Optional[redis.client.Pipeline] = None, nx: bool = False):
+    """
+    Записать статус заявки в кеш
+
+    Args:
+        payload: Статус в формате StatusResponse
+        pipe: Pipeline Redis (если запись идет вместе с другими командами)
+        nx: Только если записи еще нет (не перетирать статус от воркера)
+    """
+    target = pipe if pipe is not None else get_redis()
+    target.set(
+        STATUS_KEY.format(submission_id=payload["submission_id"]),
+        orjson.dumps(payload),
+        ex=get_settings().STATUS_CACHE_TTL,
+        nx=nx
+    )
+
+
+def get_cached_status(submission_id: str) -> Optional[dict]:
+    """Статус из кеша или None (промах или недоступный Redis)"""
+    try:
+        raw = get_redis().get(STATUS_KEY.format(submission_id=submission_id))
+    except redis.RedisError as e:
+        logger.warning("Status cache unavailable", error=str(e))
+        return None
+
+    return orjson.loads(raw) if raw else None
+
+
+def get_cached_statuses(submission_ids: Iterable[str]) -> Dict[str, dict]:
+    """Статусы нескольких заявок из кеша одним MGET (только найденные)"""
+    submission_ids = list(submission_ids)
+    if not submission_ids:
+        return {}
+
+    try:
+        values = get_redis().mget([STATUS_KEY.format(submission_id=sid) for sid in submission_ids])
+    except redis.RedisError as e:
+        logger.warning("Status cache unavailable", error=str(e))
+        return {}
+
+    return {
+        sid: orjson.loads(raw)
+        for sid, raw in zip(submission_ids, values)
+        if raw
+    }
+
+
+def store_statuses(payloads: Iterable[dict]):
+    """
+    Заполнить кеш после чтения из БД (ошибки Redis игнорируются)
+
+    Запись только при отсутствии ключа: если воркер успел записать новый
+    статус, пока API читал БД (или отстающую реплику), он не перетирается.
+    """
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for payload in payloads:
+            cache_status(payload, pipe, nx=True)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Status cache unavailable", error=str(e))
@@ -16,10 +16,26 @@ class Settings(BaseSettings):
     
     # База данных
     DATABASE_URL: str
+    DATABASE_READ_URL: str = ""  # Реплика для чтения статусов и списков (пусто — основная БД)
+    DB_POOL_SIZE: int = 10  # Постоянных соединений на процесс
+    DB_MAX_OVERFLOW: int = 20  # Дополнительных соединений при пиковой нагрузке
+    DB_POOL_RECYCLE: int = 1800  # Переоткрывать соединения старше, секунды
+    DB_PGBOUNCER: bool = False  # Подключение через PgBouncer в режиме transaction pooling
+    
+    # Трассировка (OpenTelemetry)
+    TRACE_EXPORTER: str = ""  # "" — выключена, file — JSON lines в TRACE_FILE, otlp — OTLP/HTTP (OTEL_EXPORTER_OTLP_ENDPOINT)
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_SAMPLE_RATIO: float = 1.0  # Доля трассируемых запросов
     
     # Redis
     REDIS_URL: str
     
+    STATUS_CACHE_TTL: int = 3600  # Время жизни записи статуса в кеше, секунды
+    
+    # Idempotency-Key
+    IDEMPOTENCY_TTL: int = 86400  # Сколько хранится ответ для повтора, секунды
+    IDEMPOTENCY_LOCK_TTL: int = 900  # Сколько ключ занят выполняющимся запросом, секунды
+    
     # Celery
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
@@ -35,6 +51,8 @@ class Settings(BaseSettings):
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     API_BASE_URL: str = "http://api:8000"
+    STATUS_STREAM_TIMEOUT: int = 600  # Максимальная длительность SSE-потока статуса, секунды
+    STATUS_STREAM_HEARTBEAT: float = 15.0  # Интервал heartbeat в SSE-потоке, секунды
     
     # YouTube
     YOUTUBE_CLIENT_ID: str = ""
@@ -47,6 +65,8 @@ class Settings(BaseSettings):
     VK_GROUP_ID: int = 0  # ID группы (опционально, 0 = публикация от имени пользователя)
     VK_DEFAULT_PRIVACY: str = "private"  # private или public
     VK_AS_CLIP: bool = False  # Публиковать как клип (короткое вертикальное видео)
+    VK_CHUNKED_UPLOAD: bool = True  # Загрузка частями с возобновлением
+    VK_UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # Размер чанка в байтах
     
     # TikTok
     TIKTOK_CLIENT_KEY: str = ""
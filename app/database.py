@@ -1,33 +1,119 @@
 """Настройка базы данных и моделей"""
-from sqlalchemy import create_engine, Column, String, DateTime, Integer, Text, JSON
+from sqlalchemy import create_engine, select, update, delete, Column, String, DateTime, Integer, BigInteger, Float, Text, JSON, Index, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
 from datetime import datetime
+import os
+from typing import Optional, Tuple
 import uuid
 
 from app.config import get_settings
+from app.tracing import inject_context
 
 settings = get_settings()
 
+
+
+def create_db_engine(url: str, pool_size: int, max_overflow: int):
+    """
+    Движок БД с пулом соединений
+    
+    При DB_PGBOUNCER соединения пулит PgBouncer (transaction pooling):
+    движок не держит своих соединений (NullPool) и каждый checkout —
+    новое дешевое подключение к PgBouncer.
+    """
+    if settings.DB_PGBOUNCER:
+        return create_engine(url, poolclass=NullPool)
+    
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
+
+
 # Создание движка БД
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
-)
+engine = create_db_engine(settings.DATABASE_URL, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Реплика для чтения: опрос статусов и списки не конкурируют с коммитами /ingest
+read_engine = create_db_engine(
+    settings.DATABASE_READ_URL, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+) if settings.DATABASE_READ_URL else engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+def configure_pool(pool_size: int, max_overflow: int):
+    """
+    Пересоздать движки с другим размером пула
+    
+    Для процессов, которым пул API не подходит (воркеры Celery, relay).
+    Вызывается до открытия соединений; сессии SessionLocal и
+    ReadSessionLocal, созданные после вызова, используют новые движки.
+    """
+    global engine, read_engine
+    
+    old_engines = {engine, read_engine}
+    engine = create_db_engine(settings.DATABASE_URL, pool_size, max_overflow)
+    read_engine = create_db_engine(
+        settings.DATABASE_READ_URL, pool_size, max_overflow
+    ) if settings.DATABASE_READ_URL else engine
+    
+    SessionLocal.configure(bind=engine)
+    ReadSessionLocal.configure(bind=read_engine)
+    
+    for old in old_engines:
+        old.dispose()
+
+
+def dispose_inherited_connections():
+    """
+    Забыть соединения, унаследованные от родителя при fork
+    
+    close=False: сокеты остаются открытыми в родителе, дочерний процесс
+    просто откроет свои соединения при первом обращении.
+    """
+    for item in {engine, read_engine}:
+        item.dispose(close=False)
+
+
 Base = declarative_base()
 
 
+class PublishGroup(Base):
+    """Группа задач одной загрузки видео (по задаче на каждую платформу)"""
+    __tablename__ = "publish_groups"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    video_hash = Column(String, nullable=False, index=True)
+    title = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<PublishGroup(id={self.id}, video_hash={self.video_hash})>"
+
+
 class PublishJob(Base):
     """Модель задачи публикации"""
     __tablename__ = "publish_jobs"
+    __table_args__ = (
+        # Keyset-пагинация списка задач: (created_at, id) с фильтрами
+        Index("ix_publish_jobs_created_id", "created_at", "id"),
+        Index("ix_publish_jobs_platform_created_id", "platform", "created_at", "id"),
+        Index("ix_publish_jobs_status_created_id", "status", "created_at", "id"),
+        Index("ix_publish_jobs_hash_created_id", "video_hash", "created_at", "id"),
+        # Поиск задач с истекшей арендой воркера
+        Index("ix_publish_jobs_status_lease", "status", "lease_expires_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     submission_id = Column(String, unique=True, nullable=False, index=True)
+    group_id = Column(String, ForeignKey("publish_groups.id"), nullable=True, index=True)
     
     # Видео
     video_hash = Column(String, nullable=False, index=True)
@@ -48,18 +134,401 @@ class PublishJob(Base):
     # Результаты публикации
     platform_job_id = Column(String, nullable=True)
     public_url = Column(String, nullable=True)
+    platform_status = Column(String, nullable=True, index=True)
+    # Обработка на платформе после загрузки: uploaded/processing -> ready / failed
     error_message = Column(Text, nullable=True)
     retry_count = Column(Integer, default=0)
     
+    # Версия строки: растет при каждом изменении (переходы и ORM-обновления)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    # Аренда задачи воркером в статусе PROCESSING: владелец продлевает ее,
+    # пока работает; истекшую аренду подбирает reap_expired_leases
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    
+    # Прогресс возобновляемой загрузки (upload URL, сессия, подтвержденные диапазоны)
+    upload_state = Column(JSON, nullable=True)
+    
     # Временные метки
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     published_at = Column(DateTime, nullable=True)
     
+    __mapper_args__ = {"version_id_col": version}
+    
     def __repr__(self):
         return f"<PublishJob(id={self.id}, platform={self.platform}, status={self.status})>"
 
 
+class PublishJobArchive(Base):
+    """
+    Архив завершенных задач публикации
+    
+    Задачи старше JOB_RETENTION_DAYS переносятся сюда пачками
+    (workers.tasks_retention), чтобы publish_jobs и его индексы не росли
+    бесконечно. Индексы только для поиска по submission_id и группе.
+    """
+    __tablename__ = "publish_jobs_archive"
+    
+    id = Column(String, primary_key=True)
+    submission_id = Column(String, unique=True, nullable=False, index=True)
+    group_id = Column(String, nullable=True, index=True)
+    
+    video_hash = Column(String, nullable=False)
+    s3_key = Column(String, nullable=False)
+    file_size = Column(Integer, nullable=False)
+    duration = Column(Integer, nullable=True)
+    
+    platform = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    tags = Column(JSON, nullable=True)
+    
+    status = Column(String, nullable=False)
+    platform_job_id = Column(String, nullable=True)
+    public_url = Column(String, nullable=True)
+    platform_status = Column(String, nullable=True)
+    error_message = Column(Text, nullable=True)
+    retry_count = Column(Integer, default=0)
+    
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    published_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<PublishJobArchive(id={self.id}, platform={self.platform}, status={self.status})>"
+
+
+class PublishAttempt(Base):
+    """
+    Одна попытка публикации (запуск publish_submission, захвативший задачу)
+    
+    Длительности этапов в секундах: ожидание в очереди, скачивание из
+    MinIO, публикация целиком и ее часть, ушедшая на вызовы API платформы.
+    Пишется в одной транзакции с итоговым переходом статуса задачи.
+    """
+    __tablename__ = "publish_attempts"
+    __table_args__ = (
+        # Выборки для анализа задержек: платформа за период
+        Index("ix_publish_attempts_platform_started", "platform", "started_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    submission_id = Column(String, nullable=False, index=True)
+    platform = Column(String, nullable=False)
+    attempt = Column(Integer, nullable=False)  # 1 — первая попытка, далее retry
+    task_id = Column(String, nullable=True)
+    worker_host = Column(String, nullable=True)
+    
+    outcome = Column(String, nullable=False)  # COMPLETED / FAILED
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    
+    # Этапы
+    queue_wait_seconds = Column(Float, nullable=True)
+    download_seconds = Column(Float, nullable=True)
+    publish_seconds = Column(Float, nullable=True)
+    api_seconds = Column(Float, nullable=False, default=0)
+    api_calls = Column(Integer, nullable=False, default=0)
+    bytes_sent = Column(BigInteger, nullable=True)
+    
+    # Ошибка неудачной попытки
+    error_class = Column(String, nullable=True)
+    error_message = Column(Text, nullable=True)
+    
+    def __repr__(self):
+        return f"<PublishAttempt(submission_id={self.submission_id}, attempt={self.attempt}, outcome={self.outcome})>"
+
+
+# Автоматических повторов публикации после первой попытки: FAILED с
+# retry_count <= PUBLISH_MAX_RETRIES ждет retry и еще не финальный
+PUBLISH_MAX_RETRIES = 3
+
+# Статусы, при которых повторная заявка на то же видео и платформу не создается
+ACTIVE_STATUSES = ("PENDING", "PROCESSING", "COMPLETED")
+
+# Не более одной активной задачи на пару (видео, платформа)
+Index(
+    "uq_publish_jobs_active_video_platform",
+    PublishJob.video_hash,
+    PublishJob.platform,
+    unique=True,
+    postgresql_where=PublishJob.status.in_(ACTIVE_STATUSES),
+    sqlite_where=PublishJob.status.in_(ACTIVE_STATUSES)
+)
+
+
+class OutboxMessage(Base):
+    """
+    Сообщение для брокера Celery (transactional outbox)
+    
+    Пишется в одной транзакции с задачей публикации и отправляется
+    в брокер процессом workers.outbox_relay.
+    """
+    __tablename__ = "outbox_messages"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task = Column(String, nullable=False)
+    args = Column(JSON, nullable=False, default=list)
+    options = Column(JSON, nullable=True)  # Параметры send_task (retries, countdown, ...)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True, index=True)
+    
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, task={self.task}, sent_at={self.sent_at})>"
+
+
+# Очередь неотправленных сообщений: relay читает ее по порядку id
+Index(
+    "ix_outbox_messages_unsent",
+    OutboxMessage.id,
+    postgresql_where=OutboxMessage.sent_at.is_(None),
+    sqlite_where=OutboxMessage.sent_at.is_(None)
+)
+
+
+class PublishStatsHourly(Base):
+    """
+    Почасовая статистика публикаций по платформам
+    
+    Счетчики собираются из publish_stats_events задачей beat
+    roll_up_stats, поэтому /api/stats читает O(часов) строк, а не
+    publish_jobs. Длительность — от создания заявки до публикации,
+    гистограмма по границам DURATION_BUCKETS (секунды) для перцентилей.
+    """
+    __tablename__ = "publish_stats_hourly"
+    
+    platform = Column(String, primary_key=True)
+    hour = Column(DateTime, primary_key=True)  # Начало часа (UTC)
+    
+    submitted = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+    failed = Column(Integer, nullable=False, default=0, server_default="0")  # Попытки исчерпаны
+    retried = Column(Integer, nullable=False, default=0, server_default="0")  # Неудачная попытка с повтором
+    
+    duration_sum = Column(Float, nullable=False, default=0, server_default="0")
+    duration_count = Column(Integer, nullable=False, default=0, server_default="0")
+    duration_le_60 = Column(Integer, nullable=False, default=0, server_default="0")
+    duration_le_300 = Column(Integer, nullable=False, default=0, server_default="0")
+    duration_le_900 = Column(Integer, nullable=False, default=0, server_default="0")
+    duration_le_1800 = Column(Integer, nullable=False, default=0, server_default="0")
+    duration_le_3600 = Column(Integer, nullable=False, default=0, server_default="0")
+    duration_le_7200 = Column(Integer, nullable=False, default=0, server_default="0")
+    duration_le_inf = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    def __repr__(self):
+        return f"<PublishStatsHourly(platform={self.platform}, hour={self.hour})>"
+
+
+class PublishStatsEvent(Base):
+    """
+    Приращения почасовой статистики, еще не свернутые в publish_stats_hourly
+    
+    Запросы и воркеры только добавляют строки (без конфликтов и блокировок
+    общей строки часа); сворачивает их один писатель — roll_up_stats.
+    """
+    __tablename__ = "publish_stats_events"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    platform = Column(String, nullable=False)
+    hour = Column(DateTime, nullable=False)  # Начало часа (UTC)
+    counters = Column(JSON, nullable=False)  # {колонка publish_stats_hourly: приращение}
+    
+    def __repr__(self):
+        return f"<PublishStatsEvent(id={self.id}, platform={self.platform}, hour={self.hour})>"
+
+
+# Верхние границы корзин гистограммы длительности (секунды) и их колонки
+DURATION_BUCKETS = (60, 300, 900, 1800, 3600, 7200, float("inf"))
+DURATION_BUCKET_COLUMNS = tuple(
+    "duration_le_inf" if bound == float("inf") else f"duration_le_{bound}"
+    for bound in DURATION_BUCKETS
+)
+
+
+def dialect_insert(db: Session):
+    """insert() с ON CONFLICT для диалекта сессии"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise Exception(f"Unsupported database dialect: {dialect}")
+    return insert
+
+
+def record_stats(
+    db: Session,
+    platform: str,
+    duration: Optional[float] = None,
+    at: Optional[datetime] = None,
+    **counters
+):
+    """
+    Записать приращение почасовых счетчиков платформы
+    
+    Добавляет строку publish_stats_events в транзакции вызывающего вместе
+    с переходом статуса (коммит — на его стороне). Строку часа не
+    обновляет: одновременные публикации платформы не ждут блокировку
+    одной строки; в /api/stats приращение попадет после roll_up_stats.
+    
+    Args:
+        db: Сессия БД
+        platform: Платформа
+        duration: Длительность публикации, секунды (для completed)
+        at: Время события (по умолчанию сейчас)
+        **counters: Приращения счетчиков (submitted=1, completed=1, ...)
+    """
+    values = dict(counters)
+    if duration is not None:
+        column = next(
+            name for bound, name in zip(DURATION_BUCKETS, DURATION_BUCKET_COLUMNS)
+            if duration <= bound
+        )
+        values.update({"duration_sum": duration, "duration_count": 1, column: 1})
+    
+    hour = (at or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+    
+    db.add(PublishStatsEvent(platform=platform, hour=hour, counters=values))
+
+
+def roll_up_stats(db: Session, limit: int = 10000) -> int:
+    """
+    Свернуть накопленные приращения в publish_stats_hourly
+    
+    DELETE ... RETURNING забирает пачку событий, а каждый (платформа, час)
+    получает один INSERT ... ON CONFLICT DO UPDATE с суммой приращений.
+    Одновременные свертки получают разные строки событий и не считают их
+    дважды. Коммит — на стороне вызывающего.
+    
+    Returns:
+        Сколько событий свернуто
+    """
+    batch = select(PublishStatsEvent.id).order_by(PublishStatsEvent.id).limit(limit)
+    rows = db.execute(
+        delete(PublishStatsEvent)
+        .where(PublishStatsEvent.id.in_(batch))
+        .returning(PublishStatsEvent.platform, PublishStatsEvent.hour, PublishStatsEvent.counters)
+    ).all()
+    
+    totals = {}
+    for platform, hour, counters in rows:
+        values = totals.setdefault((platform, hour), {})
+        for name, increment in counters.items():
+            values[name] = values.get(name, 0) + increment
+    
+    insert = dialect_insert(db)
+    for (platform, hour), values in totals.items():
+        stmt = insert(PublishStatsHourly).values(platform=platform, hour=hour, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PublishStatsHourly.platform, PublishStatsHourly.hour],
+            set_={
+                name: getattr(PublishStatsHourly, name) + stmt.excluded[name]
+                for name in values
+            }
+        )
+        db.execute(stmt)
+    
+    return len(rows)
+
+
+def enqueue_task(db: Session, task: str, *args, **options):
+    """
+    Поставить задачу Celery в outbox (отправится после коммита сессии)
+    
+    Контекст трассировки запроса, поставившего задачу, сохраняется в
+    заголовках: relay отправит задачу позже и из другого процесса.
+    """
+    headers = {**inject_context(), **options.get("headers", {})}
+    if headers:
+        options["headers"] = headers
+    db.add(OutboxMessage(task=task, args=list(args), options=options or None))
+
+
+def insert_group_if_missing(db: Session, **values):
+    """
+    Создать группу, если ее еще нет
+    
+    INSERT ... ON CONFLICT DO NOTHING: одновременные /ingest с одним
+    group_id не получают IntegrityError на первичном ключе.
+    """
+    insert = dialect_insert(db)
+    db.execute(insert(PublishGroup).values(**values).on_conflict_do_nothing(index_elements=[PublishGroup.id]))
+
+
+def insert_job_or_get_active(db: Session, **values) -> PublishJob:
+    """
+    Создать задачу или вернуть активную задачу того же видео и платформы
+    
+    Один INSERT ... ON CONFLICT DO UPDATE ... RETURNING по частичному
+    уникальному индексу: дубликаты, пришедшие одновременно, получают одну
+    и ту же задачу без предварительного SELECT. Пустой DO UPDATE нужен,
+    чтобы RETURNING вернул существующую строку.
+    
+    Returns:
+        Задача; новая, если ее submission_id совпадает с переданным
+    """
+    insert = dialect_insert(db)
+    stmt = insert(PublishJob).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PublishJob.video_hash, PublishJob.platform],
+        index_where=PublishJob.status.in_(ACTIVE_STATUSES),
+        set_={"video_hash": stmt.excluded.video_hash}
+    ).returning(PublishJob)
+    
+    return db.execute(
+        select(PublishJob).from_statement(stmt),
+        execution_options={"populate_existing": True}
+    ).scalar_one()
+
+
+def transition_job(
+    db: Session,
+    submission_id: str,
+    expected: Tuple[str, ...],
+    status: str,
+    *criteria,
+    **values
+) -> Optional[PublishJob]:
+    """
+    Атомарный переход статуса задачи
+    
+    Один UPDATE ... WHERE status IN (expected) RETURNING: из нескольких
+    одновременных попыток переход выполняет ровно одна, остальные
+    получают None. Версия строки увеличивается.
+    
+    Args:
+        db: Сессия БД (коммит — на вызывающей стороне)
+        submission_id: ID заявки
+        expected: Статусы, из которых разрешен переход
+        status: Новый статус
+        *criteria: Дополнительные условия WHERE
+        **values: Другие изменяемые колонки
+    
+    Returns:
+        Обновленная задача или None, если она не в ожидаемом статусе
+    """
+    stmt = update(PublishJob).where(
+        PublishJob.submission_id == submission_id,
+        PublishJob.status.in_(expected),
+        *criteria
+    ).values(
+        status=status,
+        version=PublishJob.version + 1,
+        **values
+    ).returning(PublishJob)
+    
+    # fetch: строки RETURNING обновляют объект задачи, уже загруженный
+    # в сессию, — без этого он хранил бы старые значения до коммита
+    return db.scalars(
+        stmt,
+        execution_options={"synchronize_session": "fetch"}
+    ).one_or_none()
+
+
 def get_db():
     """Dependency для получения сессии БД"""
     db = SessionLocal()
@@ -69,8 +538,33 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Dependency для получения сессии чтения (реплика, если настроена)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def is_replica(db: Session) -> bool:
+    """Сессия читает с реплики (данные могут отставать от основной БД)"""
+    return db.get_bind() is not engine
+
+
 def init_db():
-    """Инициализация базы данных (создание таблиц)"""
-    Base.metadata.create_all(bind=engine)
+    """
+    Инициализация базы данных: миграции alembic до последней версии
+    
+    create_all не меняет существующие таблицы, поэтому колонки и индексы
+    добавляются только миграциями (alembic/versions).
+    """
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
 
 
@@ -0,0 +1,193 @@
+"""События изменения статуса публикаций (Redis pub/sub)"""
+import json
+import redis
+import redis.asyncio as aioredis
+import structlog
+from typing import List, Optional
+from sqlalchemy.orm import object_session
+
+from app.config import get_settings
+from app.database import PublishJob, PUBLISH_MAX_RETRIES
+from app.redis_client import get_redis
+from app.cache import cache_status
+
+logger = structlog.get_logger()
+
+# Канал событий одной заявки
+JOB_CHANNEL = "publish_jobs:{submission_id}"
+
+# Канал событий группы: {"event": "job", "data": статус задачи}
+# и {"event": "group", "data": статус группы} при завершении всех задач
+GROUP_CHANNEL = "publish_groups:{group_id}"
+
+# Итоговые состояния группы
+GROUP_FINAL_STATES = ("COMPLETED", "PARTIAL", "FAILED")
+
+
+def job_status_payload(job: PublishJob) -> dict:
+    """Статус задачи в формате StatusResponse"""
+    return {
+        "submission_id": job.submission_id,
+        "group_id": job.group_id,
+        "status": job.status,
+        "platform": job.platform,
+        "platform_job_id": job.platform_job_id,
+        "public_url": job.public_url,
+        "platform_status": job.platform_status,
+        "error_message": job.error_message,
+        "retry_count": job.retry_count,
+        "will_retry": will_retry(job),
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+        "published_at": job.published_at.isoformat() if job.published_at else None
+    }
+
+
+def will_retry(job: PublishJob) -> bool:
+    """
+    FAILED после неудачной попытки, для которой запланирован retry
+    
+    Воркер и reaper повторяют попытку, пока retry_count не больше
+    PUBLISH_MAX_RETRIES; архивные задачи финальны.
+    """
+    return (
+        job.status == "FAILED"
+        and job.retry_count <= PUBLISH_MAX_RETRIES
+        and getattr(job, "archived_at", None) is None
+    )
+
+
+def is_final_status(payload: dict) -> bool:
+    """Больше изменений статуса не ожидается"""
+    if payload["status"] == "FAILED":
+        return not payload.get("will_retry")
+    return payload["status"] == "COMPLETED" and payload.get("platform_status") not in ("uploaded", "processing")
+
+
+def group_state(payloads: List[dict]) -> str:
+    """
+    Сводное состояние группы по статусам задач
+    
+    PENDING — ни одна задача не начата, PROCESSING — есть незавершенные,
+    COMPLETED / FAILED — все завершились успешно / неудачно,
+    PARTIAL — часть платформ опубликовала видео, часть нет.
+    """
+    if not all(is_final_status(payload) for payload in payloads):
+        if all(payload["status"] == "PENDING" for payload in payloads):
+            return "PENDING"
+        return "PROCESSING"
+    
+    succeeded = sum(
+        1 for payload in payloads
+        if payload["status"] == "COMPLETED" and payload.get("platform_status") != "failed"
+    )
+    if succeeded == len(payloads):
+        return "COMPLETED"
+    return "PARTIAL" if succeeded else "FAILED"
+
+
+def group_status_payload(group_id: str, payloads: List[dict]) -> dict:
+    """Статус группы в формате GroupStatusResponse"""
+    return {
+        "group_id": group_id,
+        "state": group_state(payloads),
+        "jobs": payloads
+    }
+
+
+def publish_job_event(job: PublishJob):
+    """
+    Записать текущий статус задачи в кеш и опубликовать подписчикам
+
+    Вызывается после каждого изменения статуса. Ошибки Redis не прерывают
+    публикацию видео: API прочитает статус из БД, а запись в кеше
+    устареет не дольше, чем на STATUS_CACHE_TTL.
+    """
+    payload = job_status_payload(job)
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        cache_status(payload, pipe)
+        pipe.publish(
+            JOB_CHANNEL.format(submission_id=job.submission_id),
+            json.dumps(payload)
+        )
+        if job.group_id:
+            pipe.publish(
+                GROUP_CHANNEL.format(group_id=job.group_id),
+                json.dumps({"event": "job", "data": payload})
+            )
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(
+            "Failed to publish status event",
+            submission_id=job.submission_id,
+            error=str(e)
+        )
+        return
+
+    if job.group_id and is_final_status(payload):
+        publish_group_completion(job)
+
+
+def publish_group_completion(job: PublishJob):
+    """
+    Опубликовать итог группы, если завершилась последняя задача
+    
+    Статус задачи уже закоммичен, поэтому при одновременном завершении
+    двух задач хотя бы один воркер увидит всю группу завершенной
+    (событие доставляется как минимум один раз).
+    """
+    db = object_session(job)
+    if db is None:
+        return
+
+    jobs = db.query(PublishJob).filter_by(group_id=job.group_id).all()
+    payload = group_status_payload(job.group_id, [job_status_payload(item) for item in jobs])
+
+    if payload["state"] not in GROUP_FINAL_STATES:
+        return
+
+    try:
+        get_redis().publish(
+            GROUP_CHANNEL.format(group_id=job.group_id),
+            json.dumps({"event": "group", "data": payload})
+        )
+    except redis.RedisError as e:
+        logger.warning("Failed to publish group event", group_id=job.group_id, error=str(e))
+        return
+
+    logger.info("Publish group finished", group_id=job.group_id, state=payload["state"])
+
+
+class EventSubscription:
+    """Подписка на канал событий (JOB_CHANNEL или GROUP_CHANNEL)"""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.client = aioredis.Redis.from_url(get_settings().REDIS_URL, decode_responses=True)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+
+    async def subscribe(self):
+        await self.pubsub.subscribe(self.channel)
+
+    async def __aenter__(self) -> "EventSubscription":
+        await self.subscribe()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Следующее событие или None по таймауту"""
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message and message["type"] == "message":
+            return json.loads(message["data"])
+        return None
+
+    async def close(self):
+        try:
+            await self.pubsub.unsubscribe(self.channel)
+            await self.pubsub.aclose()
+        finally:
+            await self.client.aclose()
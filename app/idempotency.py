@@ -0,0 +1,221 @@
+"""Повтор ответов по заголовку Idempotency-Key (Redis)"""
+import json
+import hashlib
+import redis
+import structlog
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+from app.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+# Запросы, которые клиенты повторяют после таймаута
+IDEMPOTENT_PATHS = ("/ingest", "/upload")
+
+IDEMPOTENCY_KEY = "idempotency:{path}:{key}"
+
+# Заголовки исходного ответа, которые сохраняются для повтора
+REPLAYED_HEADERS = ("content-type",)
+
+
+def idempotency_key(path: str, credential: str, key: str) -> str:
+    """
+    Ключ Redis: путь и хеш клиентского ключа вместе с учетными данными
+    
+    Middleware выполняется до проверки X-Service-Token в обработчике:
+    ключ, привязанный к токену, не дает вызывающему без токена получить
+    сохраненный ответ другого клиента.
+    """
+    digest = hashlib.sha256(f"{credential}\0{key}".encode()).hexdigest()
+    return IDEMPOTENCY_KEY.format(path=path, key=digest)
+
+
+class RequestFingerprint:
+    """
+    Отпечаток тела запроса, который считается по мере получения частей
+    
+    Тело не накапливается в памяти (для /upload — до MAX_FILE_SIZE):
+    хешируется каждая часть, кроме хвоста, в котором может начинаться
+    граница multipart. Случайная граница в отпечаток не входит.
+    """
+    
+    def __init__(self, content_type: str):
+        _, _, boundary = content_type.partition("boundary=")
+        self._boundary = boundary.split(";")[0].strip('"').encode()
+        self._hash = hashlib.sha256()
+        self._tail = b""
+    
+    def update(self, chunk: bytes):
+        if not self._boundary:
+            self._hash.update(chunk)
+            return
+        
+        data = self._tail + chunk
+        start = 0
+        while (found := data.find(self._boundary, start)) != -1:
+            self._hash.update(data[start:found])
+            start = found + len(self._boundary)
+        
+        # Неполная граница в конце части — до следующей части
+        keep = max(start, len(data) - len(self._boundary) + 1)
+        self._hash.update(data[start:keep])
+        self._tail = data[keep:]
+    
+    def hexdigest(self) -> str:
+        digest = self._hash.copy()
+        digest.update(self._tail)
+        return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Middleware Idempotency-Key для POST /ingest и /upload
+    
+    Первый запрос с ключом захватывает его (SET NX) и выполняется;
+    успешный ответ сохраняется на IDEMPOTENCY_TTL и отдается повторным
+    запросам без выполнения обработчика (для /upload — без повторной
+    записи файла в MinIO). Пока первый запрос выполняется, повторы
+    получают 409. Неуспешный ответ освобождает ключ.
+    
+    Ключ привязан к X-Service-Token, а вместе с ответом хранится отпечаток
+    тела: повтор ключа с другим телом получает 422, а не чужой результат.
+    Отпечаток считается по потоку тела (ASGI receive), тело целиком
+    middleware не читает. При недоступном Redis запрос выполняется как
+    без ключа.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in IDEMPOTENT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        
+        if len(key) > 255:
+            response = JSONResponse(status_code=400, content={"detail": "Idempotency-Key is too long"})
+            await response(scope, receive, send)
+            return
+        
+        settings = get_settings()
+        redis_key = idempotency_key(scope["path"], headers.get("x-service-token", ""), key)
+        fingerprint = RequestFingerprint(headers.get("content-type", ""))
+        
+        try:
+            client = get_redis()
+            acquired = client.set(
+                redis_key,
+                json.dumps({"state": "in_progress"}),
+                nx=True,
+                ex=settings.IDEMPOTENCY_LOCK_TTL
+            )
+            stored = None if acquired else client.get(redis_key)
+        except redis.RedisError as e:
+            logger.warning("Idempotency store unavailable", error=str(e))
+            await self.app(scope, receive, send)
+            return
+        
+        if not acquired:
+            record = json.loads(stored) if stored else {"state": "in_progress"}
+            response = await _stored_response(record, scope, receive, fingerprint)
+            await response(scope, receive, send)
+            return
+        
+        async def fingerprint_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                fingerprint.update(message.get("body", b""))
+            return message
+        
+        # Ответы /ingest и /upload — небольшой JSON: он отправляется клиенту
+        # после сохранения, чтобы повтор сразу получил сохраненный ответ
+        messages = []
+        
+        async def buffer_send(message: Message):
+            messages.append(message)
+        
+        try:
+            await self.app(scope, fingerprint_receive, buffer_send)
+        except Exception:
+            _release(redis_key)
+            raise
+        
+        status_code = messages[0]["status"] if messages else 500
+        
+        if not 200 <= status_code < 300:
+            _release(redis_key)
+        else:
+            response_headers = Headers(raw=messages[0]["headers"])
+            try:
+                get_redis().set(
+                    redis_key,
+                    json.dumps({
+                        "state": "completed",
+                        "fingerprint": fingerprint.hexdigest(),
+                        "status_code": status_code,
+                        "headers": {
+                            name: value for name, value in response_headers.items()
+                            if name in REPLAYED_HEADERS
+                        },
+                        "body": b"".join(
+                            message.get("body", b"") for message in messages
+                            if message["type"] == "http.response.body"
+                        ).decode()
+                    }),
+                    ex=settings.IDEMPOTENCY_TTL
+                )
+            except redis.RedisError as e:
+                logger.warning("Idempotency store unavailable", error=str(e))
+        
+        for message in messages:
+            await send(message)
+
+
+async def _stored_response(record: dict, scope: Scope, receive: Receive, fingerprint: RequestFingerprint) -> Response:
+    """Ответ на повтор ключа: сохраненный ответ, 422 или 409"""
+    if record["state"] != "completed":
+        return JSONResponse(
+            status_code=409,
+            content={"detail": "A request with this Idempotency-Key is still in progress"},
+            headers={"Retry-After": "5"}
+        )
+    
+    # Тело повтора читается только ради отпечатка
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        fingerprint.update(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    
+    if record.get("fingerprint") != fingerprint.hexdigest():
+        return JSONResponse(
+            status_code=422,
+            content={"detail": "Idempotency-Key was already used with a different request body"}
+        )
+    
+    logger.info("Replaying idempotent response", path=scope["path"])
+    return Response(
+        content=record["body"].encode(),
+        status_code=record["status_code"],
+        headers={**record["headers"], "Idempotent-Replayed": "true"}
+    )
+
+
+def _release(redis_key: str):
+    """Освободить ключ, чтобы клиент мог повторить запрос"""
+    try:
+        get_redis().delete(redis_key)
+    except redis.RedisError as e:
+        logger.warning("Idempotency store unavailable", error=str(e))
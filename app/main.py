@@ -1,21 +1,73 @@
 """Главное приложение FastAPI"""
-from fastapi import FastAPI, Depends, HTTPException, Header, Request, UploadFile, File, Form
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse, ORJSONResponse, HTMLResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterable
 import structlog
+import orjson
 import uuid
+import base64
 import hashlib
 import tempfile
 import os
-from datetime import datetime
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from minio import Minio
 
 from app.config import get_settings
-from app.database import get_db, init_db, PublishJob
-from app.schemas import IngestRequest, IngestResponse, StatusResponse, HealthResponse
+from app.database import (
+    get_db,
+    get_read_db,
+    is_replica,
+    SessionLocal,
+    init_db,
+    insert_group_if_missing,
+    insert_job_or_get_active,
+    transition_job,
+    enqueue_task,
+    record_stats,
+    PublishJob,
+    PublishJobArchive,
+    PublishGroup,
+    PublishAttempt,
+    PublishStatsHourly,
+    PUBLISH_MAX_RETRIES,
+    DURATION_BUCKETS,
+    DURATION_BUCKET_COLUMNS
+)
+from app.schemas import (
+    IngestRequest,
+    IngestResponse,
+    StatusResponse,
+    GroupStatusResponse,
+    HealthResponse,
+    BatchStatusRequest,
+    AttemptResponse
+)
+from app.redis_client import get_redis
+from app.events import (
+    EventSubscription,
+    JOB_CHANNEL,
+    GROUP_CHANNEL,
+    GROUP_FINAL_STATES,
+    job_status_payload,
+    group_status_payload,
+    is_final_status,
+    publish_job_event
+)
+from app.cache import get_cached_status, get_cached_statuses, store_statuses
+from app.progress import with_progress
+from app.tracing import setup_tracing, storage_span, tracing_middleware
+from app.idempotency import IdempotencyMiddleware
+from app.metrics import UPLOAD_PHASE_SECONDS, INGEST_DB_SECONDS, render_metrics
+from prometheus_client import CONTENT_TYPE_LATEST
 from workers.tasks_publish import publish_submission
+from workers.bandwidth import get_node_throughput
 
 # Настройка структурного логирования
 structlog.configure(
@@ -31,21 +83,59 @@ settings = get_settings()
 app = FastAPI(
     title="Fanout Publisher API",
     description="API для автоматической публикации видео на различные платформы",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Повтор ответов /ingest и /upload по Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+
+# Трассировка запроса (внешний middleware: в span входит и повтор ответа)
+app.middleware("http")(tracing_middleware)
+
 # Подключение статических файлов
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Инициализация MinIO клиента
 minio_client = None
 
+# Размер IN-списка при пакетном чтении статусов из БД
+STATUS_QUERY_CHUNK = 500
+
+# Максимальный размер страницы /api/jobs
+JOBS_PAGE_MAX = 100
+
+# Колонки элемента списка /api/jobs
+JOB_LIST_COLUMNS = (
+    PublishJob.submission_id,
+    PublishJob.title,
+    PublishJob.platform,
+    PublishJob.status,
+    PublishJob.public_url,
+    PublishJob.platform_status,
+    PublishJob.error_message,
+    PublishJob.created_at,
+    PublishJob.published_at,
+)
+
+# Сколько последних попыток учитывается в /api/attempts/latency
+LATENCY_SAMPLE_MAX = 10000
+
+# Этапы попытки: имя в ответе -> колонка publish_attempts
+ATTEMPT_STAGES = {
+    "queue_wait": PublishAttempt.queue_wait_seconds,
+    "download": PublishAttempt.download_seconds,
+    "publish": PublishAttempt.publish_seconds,
+    "api": PublishAttempt.api_seconds,
+}
+
 
 @app.on_event("startup")
 async def startup_event():
     """Инициализация при старте приложения"""
     global minio_client
     logger.info("Starting Fanout Publisher API")
+    setup_tracing("fanout-api")
     init_db()
     logger.info("Database initialized")
     
@@ -87,6 +177,212 @@ async def verify_service_token(x_service_token: Optional[str] = Header(None)):
     return True
 
 
+def find_job(submission_id: str, db: Session):
+    """Задача из рабочей таблицы или архива"""
+    return (
+        db.query(PublishJob).filter_by(submission_id=submission_id).first()
+        or db.query(PublishJobArchive).filter_by(submission_id=submission_id).first()
+    )
+
+
+def load_status(submission_id: str, db: Session) -> Optional[dict]:
+    """
+    Статус заявки: сначала кеш Redis, при промахе — БД с заполнением кеша
+    
+    Воркер обновляет кеш при каждом изменении статуса, поэтому опрос
+    статуса обычно не доходит до PostgreSQL. Заявки, перенесенные
+    в архив, ищутся в publish_jobs_archive. Если db — сессия реплики,
+    заявка, которой там еще нет (только что создана), читается из
+    основной БД.
+    """
+    payload = get_cached_status(submission_id)
+    if payload is not None:
+        return payload
+    
+    job = find_job(submission_id, db)
+    if job is None and is_replica(db):
+        with SessionLocal() as primary:
+            job = find_job(submission_id, primary)
+            payload = job_status_payload(job) if job else None
+    elif job is not None:
+        payload = job_status_payload(job)
+    
+    if payload is None:
+        return None
+    
+    store_statuses([payload])
+    return payload
+
+
+def query_statuses(submission_ids: List[str], db: Session, statuses: Dict[str, dict]) -> List[dict]:
+    """
+    Дочитать из БД статусы, которых нет в statuses: IN-запросом по индексу
+    (сначала рабочая таблица, оставшиеся — архив)
+    
+    Returns:
+        Загруженные статусы (они же добавлены в statuses)
+    """
+    loaded = []
+    for model in (PublishJob, PublishJobArchive):
+        missing = [sid for sid in submission_ids if sid not in statuses]
+        for start in range(0, len(missing), STATUS_QUERY_CHUNK):
+            chunk = missing[start:start + STATUS_QUERY_CHUNK]
+            for job in db.query(model).filter(model.submission_id.in_(chunk)):
+                payload = job_status_payload(job)
+                statuses[payload["submission_id"]] = payload
+                loaded.append(payload)
+    return loaded
+
+
+def load_statuses(submission_ids: List[str], db: Session) -> Dict[str, dict]:
+    """
+    Статусы нескольких заявок: MGET из кеша, промахи — из БД
+    (не найденные на реплике — из основной БД)
+    
+    Returns:
+        {submission_id: статус} только для найденных заявок
+    """
+    statuses = get_cached_statuses(submission_ids)
+    loaded = query_statuses(submission_ids, db, statuses)
+    
+    if is_replica(db) and len(statuses) < len(submission_ids):
+        with SessionLocal() as primary:
+            loaded += query_statuses(submission_ids, primary, statuses)
+    
+    if loaded:
+        store_statuses(loaded)
+    
+    return statuses
+
+
+def stream_status_map(submission_ids: Iterable[str], statuses: Dict[str, dict]):
+    """Потоковая сериализация {submission_id: StatusResponse | null}"""
+    yield b"{"
+    for index, submission_id in enumerate(submission_ids):
+        if index:
+            yield b","
+        yield orjson.dumps(submission_id) + b":" + orjson.dumps(statuses.get(submission_id))
+    yield b"}"
+
+
+def latency_stats(values: List[float]) -> Optional[dict]:
+    """Среднее, медиана, p95 и максимум (nearest-rank)"""
+    if not values:
+        return None
+    
+    values = sorted(values)
+    
+    def percentile(p: float) -> float:
+        return values[max(int(round(p * len(values))) - 1, 0)]
+    
+    return {
+        "avg": round(sum(values) / len(values), 3),
+        "p50": round(percentile(0.5), 3),
+        "p95": round(percentile(0.95), 3),
+        "max": round(values[-1], 3)
+    }
+
+
+def bucket_percentile(counts: List[int], q: float) -> Optional[float]:
+    """
+    Перцентиль по гистограмме DURATION_BUCKETS
+    
+    Линейная интерполяция внутри корзины; для последней (бесконечной)
+    корзины возвращается ее нижняя граница.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for bound, count in zip(DURATION_BUCKETS, counts):
+        if count and cumulative + count >= rank:
+            if bound == float("inf"):
+                return lower
+            return round(lower + (bound - lower) * (rank - cumulative) / count, 1)
+        cumulative += count
+        lower = bound
+    return lower
+
+
+def make_etag(*parts) -> str:
+    """ETag из версий ресурса (submission_id, updated_at, ...)"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Проверка условного запроса (RFC 9110)
+    
+    If-None-Match имеет приоритет; If-Modified-Since учитывается только
+    без него и сравнивается с точностью до секунды.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+    
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    """Заголовки для повторной валидации клиентом"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def conditional_status(request: Request, payload: dict) -> Response:
+    """
+    Ответ со статусом: 304, если статус не изменился, иначе JSON
+    
+    Версия статуса — updated_at, который меняется при каждом переходе,
+    и отправленные байты загрузки (прогресс не меняет updated_at).
+    payload уже в формате StatusResponse, поэтому сериализуется напрямую
+    через orjson без построения pydantic-модели.
+    """
+    payload = with_progress([payload])[payload["submission_id"]]
+    progress = payload["progress"] or {}
+    etag = make_etag(payload["submission_id"], payload["updated_at"], progress.get("bytes_sent"))
+    last_modified = datetime.fromisoformat(payload["updated_at"])
+    headers = validator_headers(etag, last_modified)
+    
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    return ORJSONResponse(payload, headers=headers)
+
+
+def encode_cursor(created_at: datetime, job_id: str) -> str:
+    """Курсор страницы — позиция последней строки (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{job_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Разобрать курсор; HTTP 400 для некорректного значения"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, job_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), job_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """Главная страница - возвращает веб-интерфейс"""
@@ -107,6 +403,12 @@ async def health_check():
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики Prometheus"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/ingest", response_model=IngestResponse)
 async def ingest_video(
     request: IngestRequest,
@@ -116,31 +418,21 @@ async def ingest_video(
     """
     Принять видео для публикации
     
-    Создает задачу публикации и помещает её в очередь Celery
+    Создает задачу публикации и в той же транзакции — сообщение
+    для очереди Celery (outbox), которое отправит workers.outbox_relay
     """
     try:
         # Генерируем submission_id
         submission_id = str(uuid.uuid4())
         
-        # Проверка идемпотентности (опционально, для повторных запросов)
-        existing = db.query(PublishJob).filter_by(
-            video_hash=request.video_hash,
-            platform=request.platform
-        ).first()
+        db_started = time.perf_counter()
         
-        if existing and existing.status in ["PENDING", "PROCESSING", "COMPLETED"]:
-            logger.info(
-                "Duplicate submission detected, returning existing",
-                submission_id=existing.submission_id,
-                status=existing.status
-            )
-            return IngestResponse(
-                submission_id=existing.submission_id,
-                status="QUEUED"
-            )
+        if request.group_id:
+            insert_group_if_missing(db, id=request.group_id, video_hash=request.video_hash, title=request.title)
         
-        # Создаем новую задачу
-        job = PublishJob(
+        # Создаем задачу; для активного дубликата вернется существующая
+        job = insert_job_or_get_active(
+            db,
             id=str(uuid.uuid4()),
             submission_id=submission_id,
             video_hash=request.video_hash,
@@ -151,28 +443,37 @@ async def ingest_video(
             title=request.title,
             description=request.description,
             tags=request.tags or [],
+            group_id=request.group_id,
             status="PENDING"
         )
         
-        db.add(job)
+        created = job.submission_id == submission_id
+        if created:
+            # Задача Celery уходит в outbox той же транзакцией
+            enqueue_task(db, publish_submission.name, submission_id)
+            record_stats(db, request.platform, submitted=1)
+        
         db.commit()
-        db.refresh(job)
+        INGEST_DB_SECONDS.observe(time.perf_counter() - db_started)
+        
+        if not created:
+            logger.info(
+                "Duplicate submission detected, returning existing",
+                submission_id=job.submission_id,
+                status=job.status
+            )
+            return IngestResponse(
+                submission_id=job.submission_id,
+                status="QUEUED"
+            )
         
         logger.info(
-            "Created publish job",
+            "Job queued for processing",
             submission_id=submission_id,
             platform=request.platform,
             job_id=job.id
         )
         
-        # Отправляем задачу в Celery
-        publish_submission.delay(submission_id)
-        
-        logger.info(
-            "Job queued for processing",
-            submission_id=submission_id
-        )
-        
         return IngestResponse(
             submission_id=submission_id,
             status="QUEUED"
@@ -191,29 +492,81 @@ async def ingest_video(
 @app.get("/status/{submission_id}", response_model=StatusResponse)
 async def get_status(
     submission_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     _: bool = Depends(verify_service_token)
 ):
     """Получить статус публикации"""
-    job = db.query(PublishJob).filter_by(submission_id=submission_id).first()
+    payload = load_status(submission_id, db)
     
-    if not job:
+    if not payload:
         raise HTTPException(status_code=404, detail="Submission not found")
     
-    return StatusResponse(
-        submission_id=job.submission_id,
-        status=job.status,
-        platform=job.platform,
-        platform_job_id=job.platform_job_id,
-        public_url=job.public_url,
-        error_message=job.error_message,
-        retry_count=job.retry_count,
-        created_at=job.created_at.isoformat(),
-        updated_at=job.updated_at.isoformat(),
-        published_at=job.published_at.isoformat() if job.published_at else None
+    return conditional_status(request, payload)
+
+
+@app.post("/status/batch")
+async def get_status_batch(
+    request: BatchStatusRequest,
+    db: Session = Depends(get_read_db),
+    _: bool = Depends(verify_service_token)
+):
+    """
+    Получить статусы нескольких публикаций
+    
+    Возвращает объект {submission_id: StatusResponse}; для неизвестных
+    заявок значение null. Ответ сериализуется потоково.
+    """
+    submission_ids = list(dict.fromkeys(request.submission_ids))
+    statuses = with_progress(load_statuses(submission_ids, db).values())
+    
+    logger.info(
+        "Batch status lookup",
+        requested=len(submission_ids),
+        found=len(statuses)
+    )
+    
+    return StreamingResponse(
+        stream_status_map(submission_ids, statuses),
+        media_type="application/json"
     )
 
 
+@app.get("/status/{submission_id}/attempts", response_model=List[AttemptResponse])
+async def get_status_attempts(
+    submission_id: str,
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_service_token)
+):
+    """История попыток публикации заявки с длительностями этапов"""
+    attempts = db.query(PublishAttempt).filter_by(
+        submission_id=submission_id
+    ).order_by(PublishAttempt.id).all()
+    
+    if not attempts and not load_status(submission_id, db):
+        raise HTTPException(status_code=404, detail="Submission not found")
+    
+    return ORJSONResponse([
+        {
+            "attempt": item.attempt,
+            "outcome": item.outcome,
+            "task_id": item.task_id,
+            "worker_host": item.worker_host,
+            "started_at": item.started_at.isoformat(),
+            "finished_at": item.finished_at.isoformat(),
+            "queue_wait_seconds": item.queue_wait_seconds,
+            "download_seconds": item.download_seconds,
+            "publish_seconds": item.publish_seconds,
+            "api_seconds": item.api_seconds,
+            "api_calls": item.api_calls,
+            "bytes_sent": item.bytes_sent,
+            "error_class": item.error_class,
+            "error_message": item.error_message
+        }
+        for item in attempts
+    ])
+
+
 @app.post("/retry_failed/{submission_id}")
 async def retry_failed(
     submission_id: str,
@@ -221,21 +574,45 @@ async def retry_failed(
     _: bool = Depends(verify_service_token)
 ):
     """Повторить неудавшуюся публикацию"""
-    job = db.query(PublishJob).filter_by(submission_id=submission_id).first()
+    # Сброс статуса одним условным UPDATE: параллельный повтор не
+    # поставит задачу в очередь дважды. Только после исчерпанных retry:
+    # пока автоматический retry в очереди, вторая задача опубликовала бы
+    # видео параллельно с ним. Счетчик попыток обнуляется вместе со
+    # статусом: новая задача начинает с retries=0, и ее автоматические
+    # retry захватывают задачу по retry_count == retries.
+    try:
+        job = transition_job(
+            db, submission_id, ("FAILED",), "PENDING",
+            PublishJob.retry_count > PUBLISH_MAX_RETRIES,
+            error_message=None,
+            retry_count=0
+        )
+        if job:
+            enqueue_task(db, publish_submission.name, submission_id)
+        db.commit()
+    except IntegrityError:
+        # Для этого видео и платформы уже создана новая активная заявка
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Another active submission exists for this video and platform"
+        )
     
     if not job:
-        raise HTTPException(status_code=404, detail="Submission not found")
-    
-    if job.status != "FAILED":
+        current = db.query(PublishJob.status).filter_by(submission_id=submission_id).scalar()
+        if current is None:
+            raise HTTPException(status_code=404, detail="Submission not found")
+        if current == "FAILED":
+            raise HTTPException(
+                status_code=409,
+                detail="An automatic retry is still pending for this job"
+            )
         raise HTTPException(
             status_code=400,
-            detail=f"Job is not in FAILED status (current: {job.status})"
+            detail=f"Job is not in FAILED status (current: {current})"
         )
     
-    # Сброс статуса и отправка в очередь
-    job.status = "PENDING"
-    job.error_message = None
-    db.commit()
+    publish_job_event(job)
     
     logger.info(
         "Retrying failed job",
@@ -243,8 +620,6 @@ async def retry_failed(
         retry_count=job.retry_count
     )
     
-    publish_submission.delay(submission_id)
-    
     return JSONResponse(
         content={
             "submission_id": submission_id,
@@ -291,26 +666,29 @@ async def upload_video(
         )
         
         # Проверка размера файла (2 ГБ)
-        content = await video.read()
+        with UPLOAD_PHASE_SECONDS.labels(phase="read").time():
+            content = await video.read()
         file_size = len(content)
         
         if file_size > 2 * 1024 * 1024 * 1024:
             raise HTTPException(status_code=400, detail="Файл слишком большой! Максимальный размер: 2 ГБ")
         
         # Вычисляем хеш
-        video_hash = hashlib.sha256(content).hexdigest()
+        with UPLOAD_PHASE_SECONDS.labels(phase="hash").time():
+            video_hash = hashlib.sha256(content).hexdigest()
         
         # Генерируем S3 ключ
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         s3_key = f"videos/web/{timestamp}_{video_hash[:16]}.mp4"
         
         # Загружаем в MinIO
+        storage_started = time.perf_counter()
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
             temp_file.write(content)
             temp_path = temp_file.name
         
         try:
-            with open(temp_path, 'rb') as f:
+            with open(temp_path, 'rb') as f, storage_span("put_object", settings.MINIO_BUCKET, s3_key):
                 minio_client.put_object(
                     settings.MINIO_BUCKET,
                     s3_key,
@@ -320,6 +698,7 @@ async def upload_video(
                 )
         finally:
             os.unlink(temp_path)
+        UPLOAD_PHASE_SECONDS.labels(phase="storage_put").observe(time.perf_counter() - storage_started)
         
         logger.info(
             "Video uploaded to MinIO",
@@ -335,6 +714,11 @@ async def upload_video(
         
         # Убрал автоматическое добавление хештега
         
+        # Группа объединяет задачи этого видео на всех платформах
+        group = PublishGroup(id=str(uuid.uuid4()), video_hash=video_hash, title=title)
+        db.add(group)
+        db.commit()
+        
         # Создаем задачи публикации для каждой платформы
         submissions = []
         
@@ -358,7 +742,8 @@ async def upload_video(
                 if hashtags.strip():
                     platform_description = f"{description}\n\n{hashtags}".strip()
             
-            job = PublishJob(
+            job = insert_job_or_get_active(
+                db,
                 id=str(uuid.uuid4()),
                 submission_id=submission_id,
                 video_hash=video_hash,
@@ -369,35 +754,54 @@ async def upload_video(
                 title=platform_title,
                 description=platform_description,
                 tags=tags_list if platform == "youtube" else [],
+                group_id=group.id,
                 status="PENDING"
             )
             
-            db.add(job)
+            created = job.submission_id == submission_id
+            if created:
+                enqueue_task(db, publish_submission.name, submission_id)
+                record_stats(db, platform, submitted=1)
+            
             db.commit()
-            db.refresh(job)
+            
+            if not created:
+                # Это видео уже публикуется или опубликовано на платформе
+                logger.info(
+                    "Duplicate submission detected, returning existing",
+                    submission_id=job.submission_id,
+                    platform=platform,
+                    status=job.status
+                )
+                submissions.append({
+                    "submission_id": job.submission_id,
+                    "platform": platform,
+                    "duplicate": True
+                })
+                continue
             
             logger.info(
-                "Created publish job",
+                "Job queued for processing",
                 submission_id=submission_id,
                 platform=platform,
                 job_id=job.id
             )
             
-            # Отправляем задачу в Celery
-            publish_submission.delay(submission_id)
-            
-            logger.info(
-                "Job queued for processing",
-                submission_id=submission_id
-            )
-            
             submissions.append({
                 "submission_id": submission_id,
                 "platform": platform
             })
         
+        group_id = group.id
+        if all(sub.get("duplicate") for sub in submissions):
+            # Новых задач нет — пустая группа не нужна
+            db.delete(group)
+            db.commit()
+            group_id = None
+        
         return {
             "status": "QUEUED",
+            "group_id": group_id,
             "message": f"Видео успешно загружено и отправлено на публикацию на {len(submissions)} платформ(у)",
             "submissions": submissions
         }
@@ -416,49 +820,371 @@ async def upload_video(
 @app.get("/api/status/{submission_id}", response_model=StatusResponse)
 async def get_status_api(
     submission_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_read_db)
 ):
     """Получить статус публикации (публичный API для веб-интерфейса)"""
-    job = db.query(PublishJob).filter_by(submission_id=submission_id).first()
+    payload = load_status(submission_id, db)
     
-    if not job:
+    if not payload:
         raise HTTPException(status_code=404, detail="Submission not found")
     
-    return StatusResponse(
-        submission_id=job.submission_id,
-        status=job.status,
-        platform=job.platform,
-        platform_job_id=job.platform_job_id,
-        public_url=job.public_url,
-        error_message=job.error_message,
-        retry_count=job.retry_count,
-        created_at=job.created_at.isoformat(),
-        updated_at=job.updated_at.isoformat(),
-        published_at=job.published_at.isoformat() if job.published_at else None
+    return conditional_status(request, payload)
+
+
+@app.get("/api/status/{submission_id}/stream")
+async def stream_status(
+    submission_id: str,
+    request: Request,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Поток изменений статуса публикации (Server-Sent Events)
+    
+    Сначала отправляет текущий статус, затем каждое изменение, которое
+    воркер публикует в Redis (event: status), и прогресс загрузки
+    (event: progress). Поток закрывается на финальном статусе или через
+    STATUS_STREAM_TIMEOUT секунд.
+    """
+    # Подписываемся до чтения из БД, чтобы не пропустить изменение между ними
+    subscription = EventSubscription(JOB_CHANNEL.format(submission_id=submission_id))
+    await subscription.subscribe()
+    
+    try:
+        initial = load_status(submission_id, db)
+    except Exception:
+        await subscription.close()
+        raise
+    
+    if not initial:
+        await subscription.close()
+        raise HTTPException(status_code=404, detail="Submission not found")
+    
+    initial = with_progress([initial])[submission_id]
+    
+    async def events():
+        deadline = time.monotonic() + settings.STATUS_STREAM_TIMEOUT
+        payload = initial
+        
+        try:
+            yield f"event: status\ndata: {json.dumps(payload)}\n\n"
+            
+            while not is_final_status(payload) and time.monotonic() < deadline:
+                if await request.is_disconnected():
+                    break
+                
+                event = await subscription.get(timeout=settings.STATUS_STREAM_HEARTBEAT)
+                
+                if event is None:
+                    # Комментарий-heartbeat держит соединение через прокси
+                    yield ": ping\n\n"
+                    continue
+                
+                if event.get("event") == "progress":
+                    yield f"event: progress\ndata: {json.dumps(event['data'])}\n\n"
+                    continue
+                
+                payload = event
+                yield f"event: status\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            await subscription.close()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def find_group(group_id: str, db: Session) -> Optional[dict]:
+    """Статус группы по индексу group_id (рабочая таблица и архив)"""
+    jobs = db.query(PublishJob).filter_by(group_id=group_id).order_by(PublishJob.created_at).all()
+    jobs += db.query(PublishJobArchive).filter_by(group_id=group_id).order_by(PublishJobArchive.created_at).all()
+    if not jobs:
+        return None
+    payloads = with_progress(job_status_payload(job) for job in jobs)
+    return group_status_payload(group_id, list(payloads.values()))
+
+
+def load_group(group_id: str, db: Session) -> Optional[dict]:
+    """Статус группы; только что созданная группа, которой нет на реплике, — из основной БД"""
+    payload = find_group(group_id, db)
+    if payload is None and is_replica(db):
+        with SessionLocal() as primary:
+            payload = find_group(group_id, primary)
+    return payload
+
+
+@app.get("/api/groups/{group_id}", response_model=GroupStatusResponse)
+async def get_group_status(
+    group_id: str,
+    db: Session = Depends(get_read_db)
+):
+    """Статусы публикации одного видео на всех платформах и сводное состояние"""
+    payload = load_group(group_id, db)
+    
+    if not payload:
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    return ORJSONResponse(payload)
+
+
+@app.get("/api/groups/{group_id}/stream")
+async def stream_group_status(
+    group_id: str,
+    request: Request,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Поток изменений статуса группы (Server-Sent Events)
+    
+    Каждое событие group — полный снимок группы, event: progress —
+    прогресс загрузки одной задачи. Поток закрывается, когда все задачи
+    группы завершены, или через STATUS_STREAM_TIMEOUT секунд.
+    """
+    subscription = EventSubscription(GROUP_CHANNEL.format(group_id=group_id))
+    await subscription.subscribe()
+    
+    try:
+        initial = load_group(group_id, db)
+    except Exception:
+        await subscription.close()
+        raise
+    
+    if not initial:
+        await subscription.close()
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    async def events():
+        deadline = time.monotonic() + settings.STATUS_STREAM_TIMEOUT
+        payload = initial
+        jobs = {job["submission_id"]: job for job in initial["jobs"]}
+        
+        try:
+            yield f"event: group\ndata: {json.dumps(payload)}\n\n"
+            
+            while payload["state"] not in GROUP_FINAL_STATES and time.monotonic() < deadline:
+                if await request.is_disconnected():
+                    break
+                
+                event = await subscription.get(timeout=settings.STATUS_STREAM_HEARTBEAT)
+                
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                
+                if event["event"] == "progress":
+                    yield f"event: progress\ndata: {json.dumps(event['data'])}\n\n"
+                    continue
+                
+                if event["event"] == "group":
+                    payload = event["data"]
+                else:
+                    jobs[event["data"]["submission_id"]] = event["data"]
+                    payload = group_status_payload(group_id, list(jobs.values()))
+                
+                yield f"event: group\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            await subscription.close()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
 @app.get("/api/jobs")
 async def get_recent_jobs(
-    limit: int = 10,
-    db: Session = Depends(get_db)
+    request: Request,
+    limit: int = Query(10, ge=1, le=JOBS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    platform: Optional[str] = None,
+    status: Optional[str] = None,
+    video_hash: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Получить список последних загрузок"""
-    jobs = db.query(PublishJob).order_by(PublishJob.created_at.desc()).limit(limit).all()
+    """
+    Получить список последних загрузок
     
-    return [
-        {
-            "submission_id": job.submission_id,
-            "title": job.title,
-            "platform": job.platform,
-            "status": job.status,
-            "public_url": job.public_url,
-            "error_message": job.error_message,
-            "created_at": job.created_at.isoformat(),
-            "published_at": job.published_at.isoformat() if job.published_at else None
+    Keyset-пагинация по (created_at, id): курсор следующей страницы
+    возвращается в заголовках X-Next-Cursor и Link. Фильтры platform,
+    status и video_hash покрыты составными индексами, поэтому запрос
+    читает только limit строк индекса независимо от размера таблицы.
+    
+    ETag строится по (submission_id, updated_at) страницы, которые читаются
+    легким запросом по индексу; полные строки загружаются, только если
+    список изменился.
+    
+    Список читается с реплики (DATABASE_READ_URL) и может отставать от
+    основной БД на ее задержку репликации.
+    """
+    query = db.query(PublishJob.id, PublishJob.submission_id, PublishJob.created_at, PublishJob.updated_at)
+    
+    if platform:
+        query = query.filter(PublishJob.platform == platform)
+    if status:
+        query = query.filter(PublishJob.status == status)
+    if video_hash:
+        query = query.filter(PublishJob.video_hash == video_hash)
+    if cursor:
+        query = query.filter(tuple_(PublishJob.created_at, PublishJob.id) < decode_cursor(cursor))
+    
+    # Лишняя строка показывает, есть ли следующая страница
+    versions = query.order_by(PublishJob.created_at.desc(), PublishJob.id.desc()).limit(limit + 1).all()
+    has_next = len(versions) > limit
+    versions = versions[:limit]
+    
+    etag = make_etag(
+        limit, cursor, platform, status, video_hash,
+        *(f"{row.submission_id}:{row.updated_at.isoformat()}" for row in versions)
+    )
+    last_modified = max((row.updated_at for row in versions), default=None)
+    headers = validator_headers(etag, last_modified)
+    
+    if has_next:
+        next_cursor = encode_cursor(versions[-1].created_at, versions[-1].id)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    # Только нужные колонки: без ORM-объектов, datetime сериализует orjson
+    rows = db.query(*JOB_LIST_COLUMNS).filter(
+        PublishJob.id.in_([row.id for row in versions])
+    ).order_by(PublishJob.created_at.desc(), PublishJob.id.desc()).all()
+    
+    return ORJSONResponse([row._asdict() for row in rows], headers=headers)
+
+
+@app.get("/api/uploads/throughput")
+def get_upload_throughput():
+    """
+    Текущая скорость загрузок на платформы по узлам воркеров
+    
+    Обычная функция: синхронный клиент Redis выполняется в пуле потоков,
+    а не блокирует event loop.
+    """
+    return get_node_throughput(get_redis())
+
+
+@app.get("/api/attempts/latency")
+async def get_attempt_latency(
+    platform: Optional[str] = None,
+    hours: int = Query(24, ge=1, le=24 * 30),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Задержки попыток публикации по платформам и этапам
+    
+    По последним LATENCY_SAMPLE_MAX попыткам за hours часов: число попыток
+    и неудач, классы ошибок и avg/p50/p95/max каждого этапа (ожидание
+    в очереди, скачивание, публикация, вызовы API) и попытки целиком.
+    """
+    query = db.query(
+        PublishAttempt.platform,
+        PublishAttempt.outcome,
+        PublishAttempt.error_class,
+        PublishAttempt.started_at,
+        PublishAttempt.finished_at,
+        *ATTEMPT_STAGES.values()
+    ).filter(PublishAttempt.started_at >= datetime.utcnow() - timedelta(hours=hours))
+    
+    if platform:
+        query = query.filter(PublishAttempt.platform == platform)
+    
+    rows = query.order_by(PublishAttempt.started_at.desc()).limit(LATENCY_SAMPLE_MAX).all()
+    
+    by_platform: Dict[str, list] = {}
+    for row in rows:
+        by_platform.setdefault(row.platform, []).append(row)
+    
+    platforms = {}
+    for name, items in by_platform.items():
+        errors: Dict[str, int] = {}
+        for row in items:
+            if row.error_class:
+                errors[row.error_class] = errors.get(row.error_class, 0) + 1
+        
+        stages = {
+            stage: latency_stats([row[index] for row in items if row[index] is not None])
+            for index, stage in enumerate(ATTEMPT_STAGES, start=5)
         }
-        for job in jobs
-    ]
+        stages["total"] = latency_stats([
+            (row.finished_at - row.started_at).total_seconds() for row in items
+        ])
+        
+        platforms[name] = {
+            "attempts": len(items),
+            "failed": sum(1 for row in items if row.outcome == "FAILED"),
+            "errors": errors,
+            "stages": stages
+        }
+    
+    return {"hours": hours, "sampled": len(rows), "platforms": platforms}
+
+
+@app.get("/api/stats")
+async def get_publish_stats(
+    platform: Optional[str] = None,
+    hours: int = Query(24, ge=1, le=24 * 90),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Статистика публикаций по платформам за последние hours часов
+    
+    Читается из почасовых счетчиков publish_stats_hourly (не больше hours
+    строк на платформу): число заявок, публикаций, окончательных неудач
+    и повторов, доля успешных и длительность от заявки до публикации
+    (среднее, p50/p95 по гистограмме), плюс почасовой ряд.
+    """
+    since = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    
+    query = db.query(PublishStatsHourly).filter(PublishStatsHourly.hour >= since)
+    if platform:
+        query = query.filter(PublishStatsHourly.platform == platform)
+    
+    platforms = {}
+    for row in query.order_by(PublishStatsHourly.platform, PublishStatsHourly.hour):
+        stats = platforms.setdefault(row.platform, {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "retried": 0,
+            "duration_sum": 0.0,
+            "duration_count": 0,
+            "buckets": [0] * len(DURATION_BUCKETS),
+            "hourly": []
+        })
+        for name in ("submitted", "completed", "failed", "retried", "duration_sum", "duration_count"):
+            stats[name] += getattr(row, name)
+        stats["buckets"] = [
+            total + getattr(row, column)
+            for total, column in zip(stats["buckets"], DURATION_BUCKET_COLUMNS)
+        ]
+        stats["hourly"].append({
+            "hour": row.hour,
+            "submitted": row.submitted,
+            "completed": row.completed,
+            "failed": row.failed,
+            "retried": row.retried
+        })
+    
+    for stats in platforms.values():
+        finished = stats["completed"] + stats["failed"]
+        duration_sum = stats.pop("duration_sum")
+        duration_count = stats.pop("duration_count")
+        buckets = stats.pop("buckets")
+        
+        stats["success_rate"] = round(stats["completed"] / finished, 4) if finished else None
+        stats["duration"] = {
+            "avg": round(duration_sum / duration_count, 1) if duration_count else None,
+            "p50": bucket_percentile(buckets, 0.5),
+            "p95": bucket_percentile(buckets, 0.95)
+        }
+    
+    return ORJSONResponse({"hours": hours, "since": since, "platforms": platforms})
 
 
 @app.exception_handler(Exception)
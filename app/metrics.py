@@ -0,0 +1,86 @@
+"""Метрики Prometheus для API и воркеров"""
+import os
+from prometheus_client import (
+    Counter,
+    Histogram,
+    CollectorRegistry,
+    REGISTRY,
+    generate_latest,
+    multiprocess
+)
+
+# Границы для длительных операций с видео (секунды)
+LONG_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Границы для запросов к БД (секунды)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# Границы скорости загрузки (байт/с): 100 KB/s ... 100 MB/s
+RATE_BUCKETS = (1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7, 1e8)
+
+# API
+UPLOAD_PHASE_SECONDS = Histogram(
+    'fanout_upload_phase_seconds',
+    'Длительность этапов /upload: read, hash, storage_put',
+    ['phase'],
+    buckets=LONG_BUCKETS
+)
+INGEST_DB_SECONDS = Histogram(
+    'fanout_ingest_db_seconds',
+    'Время запросов к БД при /ingest',
+    buckets=DB_BUCKETS
+)
+
+# Воркер
+QUEUE_WAIT_SECONDS = Histogram(
+    'fanout_queue_wait_seconds',
+    'Время от постановки задачи в очередь (или ее ETA) до начала выполнения',
+    ['task'],
+    buckets=LONG_BUCKETS
+)
+STORAGE_DOWNLOAD_SECONDS = Histogram(
+    'fanout_storage_download_seconds',
+    'Скачивание видео из MinIO',
+    buckets=LONG_BUCKETS
+)
+PUBLISH_DURATION_SECONDS = Histogram(
+    'fanout_publish_duration_seconds',
+    'Длительность публикации на платформу (загрузка и API)',
+    ['platform'],
+    buckets=LONG_BUCKETS
+)
+PUBLISH_BYTES_PER_SECOND = Histogram(
+    'fanout_publish_bytes_per_second',
+    'Средняя скорость публикации: размер видео / длительность',
+    ['platform'],
+    buckets=RATE_BUCKETS
+)
+PUBLISH_RETRIES = Counter(
+    'fanout_publish_retries_total',
+    'Публикации, отправленные на повтор',
+    ['platform', 'error']
+)
+PUBLISH_FAILURES = Counter(
+    'fanout_publish_failures_total',
+    'Публикации, завершившиеся ошибкой после всех попыток',
+    ['platform', 'error']
+)
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    Реестр для экспорта
+
+    С PROMETHEUS_MULTIPROC_DIR (prefork-воркеры Celery, несколько процессов
+    API) значения собираются из файлов всех процессов.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> bytes:
+    """Метрики в текстовом формате Prometheus"""
+    return generate_latest(get_registry())
@@ -0,0 +1,76 @@
+"""Прогресс загрузки видео на платформу (Redis)"""
+import json
+import orjson
+import redis
+import structlog
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from app.redis_client import get_redis
+from app.events import JOB_CHANNEL, GROUP_CHANNEL
+
+logger = structlog.get_logger()
+
+# Ключ последнего прогресса загрузки заявки
+PROGRESS_KEY = "progress:{submission_id}"
+
+# Сколько хранится прогресс (дольше любой загрузки), секунды
+PROGRESS_TTL = 3600
+
+
+def progress_payload(bytes_sent: int, total_bytes: int) -> dict:
+    """Прогресс в формате UploadProgress"""
+    return {
+        "bytes_sent": bytes_sent,
+        "total_bytes": total_bytes,
+        "percent": round(100 * bytes_sent / total_bytes, 1) if total_bytes else None,
+        "updated_at": datetime.utcnow().isoformat()
+    }
+
+
+def store_progress(submission_id: str, group_id: Optional[str], progress: dict):
+    """
+    Записать прогресс и разослать подписчикам заявки и группы
+
+    Одна команда pipeline: SET с TTL и PUBLISH событий
+    {"event": "progress", "data": {...}}. Ошибки Redis не прерывают загрузку.
+    """
+    event = json.dumps({"event": "progress", "data": {"submission_id": submission_id, **progress}})
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.set(PROGRESS_KEY.format(submission_id=submission_id), orjson.dumps(progress), ex=PROGRESS_TTL)
+        pipe.publish(JOB_CHANNEL.format(submission_id=submission_id), event)
+        if group_id:
+            pipe.publish(GROUP_CHANNEL.format(group_id=group_id), event)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Failed to store upload progress", submission_id=submission_id, error=str(e))
+
+
+def with_progress(payloads: Iterable[dict]) -> Dict[str, dict]:
+    """
+    Добавить прогресс загрузки к статусам задач в работе
+
+    Прогресс читается одним MGET только для статусов PROCESSING; исходные
+    словари (в том числе из кеша статусов) не изменяются.
+
+    Returns:
+        {submission_id: статус с полем progress}
+    """
+    payloads = {payload["submission_id"]: payload for payload in payloads}
+    processing = [sid for sid, payload in payloads.items() if payload["status"] == "PROCESSING"]
+
+    values = []
+    if processing:
+        try:
+            values = get_redis().mget([PROGRESS_KEY.format(submission_id=sid) for sid in processing])
+        except redis.RedisError as e:
+            logger.warning("Upload progress unavailable", error=str(e))
+
+    progress = {sid: orjson.loads(raw) for sid, raw in zip(processing, values) if raw}
+
+    return {
+        sid: {**payload, "progress": progress.get(sid)}
+        for sid, payload in payloads.items()
+    }
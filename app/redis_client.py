@@ -0,0 +1,21 @@
+"""Подключение к Redis"""
+import redis
+from functools import lru_cache
+
+from app.config import get_settings
+
+
+@lru_cache()
+def get_redis() -> redis.Redis:
+    """
+    Получить клиент Redis (с кешированием)
+
+    Пул соединений redis-py сам пересоздается после fork, поэтому клиент
+    безопасно использовать и в API, и в prefork-воркерах Celery.
+    """
+    return redis.Redis.from_url(
+        get_settings().REDIS_URL,
+        decode_responses=True,
+        socket_timeout=2,
+        socket_connect_timeout=2
+    )
@@ -14,6 +14,7 @@ class IngestRequest(BaseModel):
     title: str = Field(..., description="Заголовок видео")
     description: Optional[str] = Field(None, description="Описание видео")
     tags: Optional[List[str]] = Field(None, description="Теги видео")
+    group_id: Optional[str] = Field(None, description="ID группы загрузки (задачи одного видео на разные платформы)")
 
 
 class IngestResponse(BaseModel):
@@ -22,18 +23,42 @@ class IngestResponse(BaseModel):
     status: str = Field(..., description="Статус заявки (QUEUED)")
 
 
+class UploadProgress(BaseModel):
+    """Прогресс загрузки видео на платформу"""
+    bytes_sent: int
+    total_bytes: int
+    percent: Optional[float] = None
+    updated_at: str
+
+
 class StatusResponse(BaseModel):
     """Ответ со статусом публикации"""
     submission_id: str
+    group_id: Optional[str] = None
     status: str
     platform: str
     platform_job_id: Optional[str] = None
     public_url: Optional[str] = None
+    platform_status: Optional[str] = None
     error_message: Optional[str] = None
     retry_count: int
+    will_retry: bool = Field(False, description="FAILED, но попытка будет повторена автоматически")
     created_at: str
     updated_at: str
     published_at: Optional[str] = None
+    progress: Optional[UploadProgress] = Field(None, description="Только для PROCESSING")
+
+
+class GroupStatusResponse(BaseModel):
+    """Статус группы публикаций одного видео"""
+    group_id: str
+    state: str = Field(..., description="PENDING, PROCESSING, COMPLETED, PARTIAL или FAILED")
+    jobs: List[StatusResponse]
+
+
+class BatchStatusRequest(BaseModel):
+    """Запрос статусов нескольких заявок"""
+    submission_ids: List[str] = Field(..., min_length=1, max_length=1000, description="ID заявок (до 1000)")
 
 
 class HealthResponse(BaseModel):
@@ -43,3 +68,21 @@ class HealthResponse(BaseModel):
     service: str
 
 
+
+
+class AttemptResponse(BaseModel):
+    """Одна попытка публикации с длительностями этапов (секунды)"""
+    attempt: int
+    outcome: str
+    task_id: Optional[str] = None
+    worker_host: Optional[str] = None
+    started_at: str
+    finished_at: str
+    queue_wait_seconds: Optional[float] = None
+    download_seconds: Optional[float] = None
+    publish_seconds: Optional[float] = None
+    api_seconds: float
+    api_calls: int
+    bytes_sent: Optional[int] = None
+    error_class: Optional[str] = None
+    error_message: Optional[str] = None
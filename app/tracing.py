@@ -0,0 +1,182 @@
+"""Трассировка публикации: HTTP-запрос → задача Celery → БД, MinIO и API платформ"""
+import structlog
+from contextlib import contextmanager
+from typing import Optional
+from opentelemetry import context, propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+from starlette.requests import Request
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+
+logger = structlog.get_logger()
+
+tracer = trace.get_tracer("fanout")
+
+# Длина текста SQL-запроса в атрибуте span
+DB_STATEMENT_MAX = 500
+
+_configured = False
+
+
+def setup_tracing(service_name: str) -> bool:
+    """
+    Включить экспорт span'ов процесса (TRACE_EXPORTER)
+
+    Вызывается один раз в процессе, который выполняет запросы или задачи
+    (в prefork-воркере — в дочернем процессе: поток BatchSpanProcessor
+    после fork не переходит). Без TRACE_EXPORTER трассировка остается
+    no-op API OpenTelemetry.
+
+    Returns:
+        True если экспорт включен
+    """
+    global _configured
+
+    settings = get_settings()
+    if not settings.TRACE_EXPORTER or _configured:
+        return False
+
+    if settings.TRACE_EXPORTER == "file":
+        # Файл открыт в режиме добавления: процессы API и воркеров пишут
+        # в него построчно, каждая строка — один span
+        out = open(settings.TRACE_FILE, "a", buffering=1)
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+    elif settings.TRACE_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+    else:
+        raise Exception(f"Unknown TRACE_EXPORTER: {settings.TRACE_EXPORTER}")
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACE_SAMPLE_RATIO))
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+    # Запросы всех engine (основная БД, реплика, пересозданные пулы)
+    event.listen(Engine, "before_cursor_execute", _start_db_span)
+    event.listen(Engine, "after_cursor_execute", _end_db_span)
+    event.listen(Engine, "handle_error", _fail_db_span)
+
+    _configured = True
+
+    logger.info("Tracing enabled", service=service_name, exporter=settings.TRACE_EXPORTER)
+    return True
+
+
+def inject_context() -> dict:
+    """
+    Контекст текущего span'а для передачи в заголовках (traceparent)
+    
+    Пустой, если текущий span не записывается: без трассировки в задачи
+    не добавляются лишние заголовки.
+    """
+    carrier = {}
+    if trace.get_current_span().is_recording():
+        propagate.inject(carrier)
+    return carrier
+
+
+@contextmanager
+def detached_context():
+    """Без текущего span'а: задачи, поставленные внутри, не продолжают эту трассу"""
+    token = context.attach(context.Context())
+    try:
+        yield
+    finally:
+        context.detach(token)
+
+
+def extract_context(carrier: dict) -> context.Context:
+    """Контекст родительского span'а из заголовков"""
+    return propagate.extract(carrier)
+
+
+def storage_span(operation: str, bucket: str, key: str):
+    """Span вызова MinIO/S3"""
+    return tracer.start_as_current_span(
+        f"minio {operation}",
+        kind=SpanKind.CLIENT,
+        attributes={"s3.bucket": bucket, "s3.key": key}
+    )
+
+
+async def tracing_middleware(request: Request, call_next):
+    """
+    Серверный span HTTP-запроса
+
+    Родитель берется из входящего traceparent; ID трассы возвращается в
+    X-Trace-Id, чтобы найти ее по ответу /upload. Span закрывается, когда
+    готовы заголовки ответа: длительность SSE-потоков в него не входит.
+    """
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}",
+        context=extract_context(dict(request.headers)),
+        kind=SpanKind.SERVER,
+        attributes={"http.request.method": request.method, "url.path": request.url.path}
+    ) as span:
+        response = await call_next(request)
+
+        # Имя по шаблону маршрута, без ID в пути
+        route = request.scope.get("route")
+        if route is not None:
+            span.update_name(f"{request.method} {route.path}")
+            span.set_attribute("http.route", route.path)
+
+        span.set_attribute("http.response.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.set_status(Status(StatusCode.ERROR))
+
+        current = trace_id()
+        if current:
+            response.headers["X-Trace-Id"] = current
+
+        return response
+
+
+def trace_id() -> Optional[str]:
+    """ID текущей трассы (hex) или None, если запрос не трассируется"""
+    span_context = trace.get_current_span().get_span_context()
+    if not span_context.is_valid or not span_context.trace_flags.sampled:
+        return None
+    return format(span_context.trace_id, "032x")
+
+
+def _start_db_span(conn, cursor, statement, parameters, execution_context, executemany):
+    """Span запроса к БД — только внутри трассируемого запроса или задачи"""
+    if not trace.get_current_span().is_recording():
+        return
+
+    operation = statement.split(None, 1)[0].upper() if statement else "SQL"
+    execution_context._trace_span = tracer.start_span(
+        f"db {operation}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:DB_STATEMENT_MAX]
+        }
+    )
+
+
+def _end_db_span(conn, cursor, statement, parameters, execution_context, executemany):
+    span = getattr(execution_context, "_trace_span", None)
+    if span is not None:
+        span.end()
+        execution_context._trace_span = None
+
+
+def _fail_db_span(exception_context):
+    # Ошибка соединения возникает до создания execution_context
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(Status(StatusCode.ERROR, type(exception_context.original_exception).__name__))
+        span.end()
+        exception_context.execution_context._trace_span = None
@@ -0,0 +1,125 @@
+"""Общие HTTP-сессии с пулом keep-alive соединений для адаптеров платформ"""
+import os
+import threading
+import requests
+from urllib.parse import urlsplit
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+tracer = trace.get_tracer(__name__)
+
+# Размер пула на хост и число кешируемых пулов (хостов) на сессию
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))
+POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4'))
+
+# Повторы на уровне транспорта
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+BACKOFF_FACTOR = 0.5  # 0.5s, 1s, 2s
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Виды сессий:
+#   api        — повторяются только идемпотентные HTTP-методы (GET, PUT, DELETE, ...)
+#   idempotent — повторяются любые методы (для POST-вызовов только на чтение)
+#   upload     — повторяется только установка соединения: тело загрузки — поток из файла
+SESSION_KINDS = ('api', 'idempotent', 'upload')
+
+_sessions = {}
+_sessions_pid = None
+_lock = threading.Lock()
+
+
+def _build_retry(kind: str) -> Retry:
+    """Политика повторов для вида сессии"""
+    if kind == 'upload':
+        return Retry(
+            total=MAX_RETRIES,
+            connect=MAX_RETRIES,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=BACKOFF_FACTOR
+        )
+
+    return Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None if kind == 'idempotent' else Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False  # Последний ответ отдаем вызывающему коду
+    )
+
+
+class TracedHTTPAdapter(HTTPAdapter):
+    """
+    Адаптер с span'ом на каждый HTTP-запрос к платформе
+
+    В имени span'а только метод, хост и путь: query и тело могут содержать
+    токены. Повторы urllib3 входят в span запроса.
+    """
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        with tracer.start_as_current_span(
+            f"{request.method} {url.hostname}{url.path}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "http.request.method": request.method,
+                "server.address": url.hostname or "",
+                "url.path": url.path
+            }
+        ) as span:
+            response = super().send(request, **kwargs)
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            return response
+
+
+def _build_session(kind: str) -> requests.Session:
+    """Создать сессию с настроенным адаптером"""
+    session = requests.Session()
+    adapter = TracedHTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=_build_retry(kind)
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(name: str, kind: str = 'api') -> requests.Session:
+    """
+    Получить общую для процесса HTTP-сессию
+
+    Сессии кешируются по (name, kind) и переиспользуются всеми задачами
+    процесса, поэтому TCP+TLS соединения с API платформы не открываются
+    заново на каждый вызов. После fork (prefork-воркеры Celery) дочерний
+    процесс создает свои сессии и не трогает сокеты родителя.
+
+    Args:
+        name: Имя платформы (vk, tiktok, ...)
+        kind: Вид сессии (api, idempotent, upload)
+
+    Returns:
+        requests.Session
+    """
+    global _sessions_pid
+
+    if kind not in SESSION_KINDS:
+        raise ValueError(f"Unknown session kind: {kind}")
+
+    with _lock:
+        pid = os.getpid()
+        if _sessions_pid != pid:
+            _sessions.clear()
+            _sessions_pid = pid
+
+        key = (name, kind)
+        if key not in _sessions:
+            _sessions[key] = _build_session(kind)
+
+        return _sessions[key]
@@ -0,0 +1,62 @@
+"""Обертки над файловыми потоками загрузки"""
+import os
+from typing import BinaryIO, Callable
+
+
+class MeteredStream:
+    """
+    Файловый поток, сообщающий о каждом прочитанном блоке
+
+    requests/http.client отправляют тело загрузки, читая его блоками,
+    поэтому on_read вызывается по мере отправки и может как считать байты,
+    так и притормаживать чтение (ограничение полосы).
+    """
+
+    def __init__(self, fileobj: BinaryIO, on_read: Callable[[int], None]):
+        """
+        Args:
+            fileobj: Исходный поток (файл или BytesIO)
+            on_read: Callback с числом прочитанных байт
+        """
+        self._fileobj = fileobj
+        self._on_read = on_read
+
+        position = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        self._size = fileobj.tell()
+        fileobj.seek(position)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        if data:
+            self._on_read(len(data))
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._fileobj.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._fileobj.tell()
+
+    def __len__(self) -> int:
+        # Используется requests для Content-Length
+        return self._size
+
+
+def report_progress(fileobj: BinaryIO, total: int, on_progress: Callable[[int, int], None]) -> MeteredStream:
+    """
+    Поток, сообщающий прогресс загрузки по мере чтения тела запроса
+
+    Args:
+        fileobj: Поток тела запроса
+        total: Полный размер загрузки, байт
+        on_progress: Callback (отправлено байт, всего байт)
+    """
+    sent = 0
+
+    def on_read(size: int):
+        nonlocal sent
+        sent += size
+        on_progress(min(sent, total), total)
+
+    return MeteredStream(fileobj, on_read)
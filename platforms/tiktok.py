@@ -4,9 +4,12 @@ import json
 import time
 import requests
 import structlog
-from typing import Dict, Optional, Callable
+from typing import BinaryIO, Dict, List, Optional, Callable
 import hashlib
 
+from platforms.sessions import get_session
+from platforms.streams import report_progress
+
 logger = structlog.get_logger()
 
 
@@ -21,13 +24,21 @@ class TikTokPublisher:
     # API версия
     API_VERSION = "v2"
     
+    # Ссылка на опубликованное видео (username автора из user/info)
+    PUBLIC_VIDEO_URL = "https://www.tiktok.com/@{username}/video/{post_id}"
+    
+    # Статусы publish/status/fetch
+    READY_STATUSES = ('PUBLISH_COMPLETE', 'SEND_TO_USER_INBOX')
+    FAILED_STATUSES = ('FAILED',)
+    
     def __init__(
         self,
         client_key: str,
         client_secret: str,
         access_token: str,
         refresh_token: Optional[str] = None,
-        on_token_refresh: Optional[Callable[[str, str], None]] = None
+        on_token_refresh: Optional[Callable[[str, str], None]] = None,
+        on_api_call: Optional[Callable[[str, float, bool], None]] = None
     ):
         """
         Инициализация TikTok publisher
@@ -38,12 +49,21 @@ class TikTokPublisher:
             access_token: OAuth Access Token пользователя
             refresh_token: OAuth Refresh Token для автоматического обновления
             on_token_refresh: Callback функция для сохранения нового токена (access_token, refresh_token)
+            on_api_call: Callback после каждого вызова API (endpoint, длительность, API доступно)
         """
         self.client_key = client_key
         self.client_secret = client_secret
         self.access_token = access_token
         self.refresh_token = refresh_token
         self.on_token_refresh = on_token_refresh
+        self.on_api_call = on_api_call
+        
+        # Общие для процесса keep-alive сессии
+        self.session = get_session('tiktok')
+        self.upload_session = get_session('tiktok', kind='upload')
+        
+        # Username автора для ссылок на видео (запрашивается один раз)
+        self._username = None
     
     def _refresh_access_token(self) -> bool:
         """
@@ -71,7 +91,7 @@ class TikTokPublisher:
                 'Cache-Control': 'no-cache'
             }
             
-            response = requests.post(self.TOKEN_URL, data=data, headers=headers, timeout=30)
+            response = self.session.post(self.TOKEN_URL, data=data, headers=headers, timeout=30)
             result = response.json()
             
             # Проверка на ошибки
@@ -173,23 +193,35 @@ class TikTokPublisher:
             default_headers.update(headers)
         
         try:
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=default_headers, params=data, timeout=30)
-            elif method.upper() == 'POST':
-                if files:
-                    # Для загрузки файлов не отправляем Content-Type (requests сам установит multipart/form-data)
-                    response = requests.post(url, headers=default_headers, data=data, files=files, timeout=600)
-                else:
-                    # Если явно указан x-www-form-urlencoded, отправляем как form-data
-                    content_type = default_headers.get('Content-Type')
-                    logger.info("Sending POST request", url=url, data=data)
-                    if content_type == 'application/x-www-form-urlencoded':
-                        response = requests.post(url, headers=default_headers, data=data, timeout=30)
+            started = time.monotonic()
+            try:
+                if method.upper() == 'GET':
+                    response = self.session.get(url, headers=default_headers, params=data, timeout=30)
+                elif method.upper() == 'POST':
+                    if files:
+                        # Для загрузки файлов не отправляем Content-Type (requests сам установит multipart/form-data)
+                        response = self.upload_session.post(url, headers=default_headers, data=data, files=files, timeout=600)
                     else:
-                        default_headers['Content-Type'] = 'application/json'
-                        response = requests.post(url, headers=default_headers, json=data, timeout=30)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+                        # Если явно указан x-www-form-urlencoded, отправляем как form-data
+                        content_type = default_headers.get('Content-Type')
+                        logger.info("Sending POST request", url=url, data=data)
+                        if content_type == 'application/x-www-form-urlencoded':
+                            response = self.session.post(url, headers=default_headers, data=data, timeout=30)
+                        else:
+                            default_headers['Content-Type'] = 'application/json'
+                            response = self.session.post(url, headers=default_headers, json=data, timeout=30)
+                else:
+                    raise ValueError(f"Unsupported HTTP method: {method}")
+            
+            except requests.RequestException:
+                self._report_api_call(endpoint, started, healthy=False)
+                raise
+            
+            self._report_api_call(
+                endpoint,
+                started,
+                healthy=response.status_code < 500 and response.status_code != 429
+            )
             
             # Логируем ответ для отладки
             logger.info("Response received", status_code=response.status_code)
@@ -318,6 +350,16 @@ class TikTokPublisher:
             logger.error("TikTok API request failed", error=str(e), url=url)
             raise Exception(f"TikTok API request failed: {str(e)}")
     
+    def _report_api_call(self, name: str, started: float, healthy: bool):
+        """Передать результат вызова API в on_api_call"""
+        if not self.on_api_call:
+            return
+        
+        try:
+            self.on_api_call(name, time.monotonic() - started, healthy)
+        except Exception as e:
+            logger.warning("API call callback failed", error=str(e))
+    
     def publish_video(
         self,
         video_path: str,
@@ -328,7 +370,9 @@ class TikTokPublisher:
         disable_comment: bool = False,
         disable_stitch: bool = False,
         brand_content: bool = False,
-        brand_organic: bool = False
+        brand_organic: bool = False,
+        wrap_stream: Optional[Callable[[BinaryIO], BinaryIO]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None
     ) -> Dict[str, str]:
         """
         Публикация видео на TikTok
@@ -347,6 +391,8 @@ class TikTokPublisher:
             disable_stitch: Отключить стич
             brand_content: Помечено как брендированный контент
             brand_organic: Органический брендированный контент
+            wrap_stream: Обертка потока загрузки (учет байт, ограничение полосы)
+            on_progress: Callback прогресса (отправлено байт, всего байт)
             
         Returns:
             Dict с platform_job_id и public_url
@@ -465,10 +511,15 @@ class TikTokPublisher:
                     'Content-Length': str(file_size),
                     'Content-Range': content_range
                 }
+                body = wrap_stream(video_file) if wrap_stream else video_file
+                if on_progress:
+                    # Тело отправляется по мере чтения: прочитанное = отправленное
+                    body = report_progress(body, file_size, on_progress)
+                
                 logger.info("PUT upload start", content_range=content_range)
-                upload_response = requests.put(
+                upload_response = self.upload_session.put(
                     upload_url,
-                    data=video_file,
+                    data=body,
                     headers=upload_headers,
                     timeout=600  # 10 минут на загрузку
                 )
@@ -481,9 +532,9 @@ class TikTokPublisher:
             # TikTok обрабатывает видео асинхронно
             # Можно сразу вернуть результат или подождать обработки
             
-            # Формируем URL (TikTok не возвращает прямую ссылку сразу)
-            # Ссылка будет доступна после обработки через creator center
-            public_url = f"https://www.tiktok.com/@me/video/{publish_id}"  # Примерный формат
+            # publish_id — не ID поста: ссылку дает опрос статуса
+            # (get_videos_status), когда TikTok опубликует видео
+            public_url = None
             
             logger.info(
                 "TikTok upload completed",
@@ -523,9 +574,9 @@ class TikTokPublisher:
             Dict со статусом обработки
         """
         try:
-            endpoint = f'{self.API_VERSION}/post/publish/status/{publish_id}/'
+            endpoint = f'{self.API_VERSION}/post/publish/status/fetch/'
             
-            response = self._api_request('POST', endpoint)
+            response = self._api_request('POST', endpoint, data={'publish_id': publish_id})
             
             data = response.get('data', {})
             
@@ -548,6 +599,61 @@ class TikTokPublisher:
             )
             return {'status': 'error', 'error': str(e)}
     
+    def get_videos_status(self, publish_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Получить статусы нескольких публикаций
+        
+        У TikTok нет пакетного метода статуса, поэтому id опрашиваются по
+        одному через общую keep-alive сессию.
+        
+        Args:
+            publish_ids: Список ID публикаций на TikTok
+            
+        Returns:
+            Dict {publish_id: {'status': ready|processing|failed|error, ...}}
+        """
+        statuses = {}
+        
+        for publish_id in publish_ids:
+            status = self.get_video_status(publish_id)
+            raw_status = status.get('status')
+            
+            if raw_status == 'error':
+                statuses[publish_id] = status
+                continue
+            
+            if raw_status in self.READY_STATUSES:
+                normalized = 'ready'
+            elif raw_status in self.FAILED_STATUSES:
+                normalized = 'failed'
+            else:
+                normalized = 'processing'
+            
+            post_ids = status.get('publicaly_available_post_id') or []
+            
+            statuses[publish_id] = {
+                'status': normalized,
+                'public_url': self.video_url(post_ids[0]) if post_ids else None,
+                'error': status.get('fail_reason')
+            }
+        
+        return statuses
+    
+    def video_url(self, post_id: str) -> Optional[str]:
+        """
+        Каноническая ссылка на пост
+        
+        Returns:
+            URL или None, если username автора получить не удалось
+        """
+        if not self._username:
+            self._username = self.get_creator_info().get('username')
+        
+        if not self._username:
+            return None
+        
+        return self.PUBLIC_VIDEO_URL.format(username=self._username, post_id=post_id)
+    
     def get_creator_info(self) -> Dict:
         """
         Получить информацию о creator аккаунте
@@ -558,13 +664,14 @@ class TikTokPublisher:
         try:
             endpoint = f'{self.API_VERSION}/user/info/'
             
-            response = self._api_request('GET', endpoint, data={'fields': 'open_id,union_id,avatar_url,display_name'})
+            response = self._api_request('GET', endpoint, data={'fields': 'open_id,union_id,avatar_url,display_name,username'})
             
             data = response.get('data', {}).get('user', {})
             
             return {
                 'open_id': data.get('open_id'),
                 'display_name': data.get('display_name'),
+                'username': data.get('username'),
                 'avatar_url': data.get('avatar_url')
             }
             
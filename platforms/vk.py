@@ -1,13 +1,39 @@
 """VK (ВКонтакте) адаптер для публикации видео и клипов"""
+import io
 import os
+import re
 import time
+import uuid
 import requests
 import structlog
-from typing import Dict, Optional
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+from platforms.sessions import get_session
 
 logger = structlog.get_logger()
 
 
+def _merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+    """Объединить пересекающиеся и соседние диапазоны байт [start, end]"""
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _parse_ranges(text: str) -> List[List[int]]:
+    """Разобрать подтвержденные сервером диапазоны вида "0-524287/2097152" """
+    return [[int(start), int(end)] for start, end in re.findall(r'(\d+)-(\d+)', text.split('/')[0])]
+
+
+def _is_covered(ranges: List[List[int]], start: int, end: int) -> bool:
+    """Проверить, что диапазон [start, end] целиком подтвержден"""
+    return any(r_start <= start and end <= r_end for r_start, r_end in ranges)
+
+
 class VKPublisher:
     """Публикация видео на VK (ВКонтакте)"""
     
@@ -15,10 +41,26 @@ class VKPublisher:
     API_VERSION = "5.131"
     API_BASE_URL = "https://api.vk.com/method"
     
+    # Чанковая загрузка
+    CHUNK_SIZE = 8 * 1024 * 1024  # 8 MB
+    CHUNK_MAX_RETRIES = 5
+    CHUNK_TIMEOUT = (10, 120)  # connect, read
+    
+    # Методы только на чтение: их можно безопасно повторять на уровне транспорта
+    READ_METHODS = ('video.get',)
+    
+    # video.get принимает список видео через запятую (до 200 за вызов)
+    STATUS_BATCH_SIZE = 200
+    
+    # Коды ошибок, означающие недоступность API (а не ошибку запроса):
+    # 1 — неизвестная ошибка, 6 — слишком много запросов, 10 — внутренняя ошибка сервера
+    UNAVAILABLE_ERROR_CODES = (1, 6, 10)
+    
     def __init__(
         self,
         access_token: str,
-        group_id: Optional[int] = None
+        group_id: Optional[int] = None,
+        on_api_call: Optional[Callable[[str, float, bool], None]] = None
     ):
         """
         Инициализация VK publisher
@@ -26,9 +68,16 @@ class VKPublisher:
         Args:
             access_token: VK Access Token с правами video,offline
             group_id: ID группы (опционально, если публикуем от имени группы)
+            on_api_call: Callback после каждого вызова API (метод, длительность, API доступно)
         """
         self.access_token = access_token
         self.group_id = group_id
+        self.on_api_call = on_api_call
+        
+        # Общие для процесса keep-alive сессии
+        self.session = get_session('vk')
+        self.read_session = get_session('vk', kind='idempotent')
+        self.upload_session = get_session('vk', kind='upload')
         
     def _api_request(self, method: str, params: dict) -> dict:
         """
@@ -49,14 +98,20 @@ class VKPublisher:
         
         url = f"{self.API_BASE_URL}/{method}"
         
+        started = time.monotonic()
+        healthy = False
+        
         try:
-            response = requests.post(url, data=params, timeout=30)
+            session = self.read_session if method in self.READ_METHODS else self.session
+            response = session.post(url, data=params, timeout=30)
+            healthy = response.status_code < 500 and response.status_code != 429
             response.raise_for_status()
             
             result = response.json()
             
             if 'error' in result:
                 error = result['error']
+                healthy = error.get('error_code') not in self.UNAVAILABLE_ERROR_CODES
                 error_msg = f"VK API Error {error.get('error_code')}: {error.get('error_msg')}"
                 logger.error(
                     "VK API error",
@@ -70,6 +125,19 @@ class VKPublisher:
         except requests.RequestException as e:
             logger.error("VK API request failed", error=str(e))
             raise Exception(f"VK API request failed: {str(e)}")
+        
+        finally:
+            self._report_api_call(method, started, healthy)
+    
+    def _report_api_call(self, name: str, started: float, healthy: bool):
+        """Передать результат вызова API в on_api_call"""
+        if not self.on_api_call:
+            return
+        
+        try:
+            self.on_api_call(name, time.monotonic() - started, healthy)
+        except Exception as e:
+            logger.warning("API call callback failed", error=str(e))
     
     def publish_video(
         self,
@@ -78,7 +146,13 @@ class VKPublisher:
         description: str = "",
         is_private: bool = True,
         is_clip: bool = False,
-        wallpost: bool = False
+        wallpost: bool = False,
+        chunked: bool = False,
+        chunk_size: Optional[int] = None,
+        upload_state: Optional[Dict] = None,
+        on_upload_state: Optional[Callable[[Optional[Dict]], None]] = None,
+        wrap_stream: Optional[Callable[[BinaryIO], BinaryIO]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None
     ) -> Dict[str, str]:
         """
         Публикация видео на VK
@@ -90,6 +164,12 @@ class VKPublisher:
             is_private: Приватное видео (True) или публичное (False)
             is_clip: Опубликовать как клип (короткое вертикальное видео)
             wallpost: Опубликовать на стене после загрузки
+            chunked: Загружать частями (Content-Range + Session-ID) с возобновлением
+            chunk_size: Размер чанка в байтах (по умолчанию CHUNK_SIZE)
+            upload_state: Сохраненный прогресс прошлой попытки (для возобновления)
+            on_upload_state: Callback для сохранения прогресса после каждого чанка
+            wrap_stream: Обертка потока загрузки (учет байт, ограничение полосы)
+            on_progress: Callback прогресса (принято сервером байт, всего байт)
             
         Returns:
             Dict с platform_job_id и public_url
@@ -112,52 +192,74 @@ class VKPublisher:
             
             file_size = os.path.getsize(video_path)
             
-            # Шаг 1: Получить upload URL
-            logger.info("Getting VK upload URL")
-            
-            save_params = {
-                'name': title[:128],  # VK ограничивает 128 символами
-                'description': description[:5000],
-                'is_private': 1 if is_private else 0,
-                'wallpost': 1 if wallpost else 0,
-            }
-            
-            # Если публикуем от имени группы
-            if self.group_id:
-                save_params['group_id'] = self.group_id
-            
-            upload_data = self._api_request('video.save', save_params)
-            
-            upload_url = upload_data.get('upload_url')
-            video_id = upload_data.get('video_id')
-            owner_id = upload_data.get('owner_id')
-            
-            if not upload_url:
-                raise Exception("Failed to get upload URL from VK")
-            
-            logger.info(
-                "Got upload URL",
-                video_id=video_id,
-                owner_id=owner_id
-            )
-            
-            # Шаг 2: Загрузить видео
-            logger.info("Uploading video to VK", size=file_size)
-            
-            with open(video_path, 'rb') as video_file:
-                files = {'video_file': video_file}
+            # Возобновление: используем upload URL прошлой попытки, если файл тот же
+            if chunked and upload_state and upload_state.get('file_size') == file_size:
+                upload_state = dict(upload_state)
+                upload_url = upload_state['upload_url']
+                video_id = upload_state.get('video_id')
+                owner_id = upload_state.get('owner_id')
                 
-                upload_response = requests.post(
-                    upload_url,
-                    files=files,
-                    timeout=600  # 10 минут на загрузку
+                logger.info(
+                    "Resuming VK upload",
+                    video_id=video_id,
+                    owner_id=owner_id,
+                    acked=upload_state.get('acked')
                 )
-                upload_response.raise_for_status()
+            else:
+                upload_state = None
+                
+                # Шаг 1: Получить upload URL
+                logger.info("Getting VK upload URL")
+                
+                save_params = {
+                    'name': title[:128],  # VK ограничивает 128 символами
+                    'description': description[:5000],
+                    'is_private': 1 if is_private else 0,
+                    'wallpost': 1 if wallpost else 0,
+                }
                 
-                upload_result = upload_response.json()
+                # Если публикуем от имени группы
+                if self.group_id:
+                    save_params['group_id'] = self.group_id
+                
+                upload_data = self._api_request('video.save', save_params)
+                
+                upload_url = upload_data.get('upload_url')
+                video_id = upload_data.get('video_id')
+                owner_id = upload_data.get('owner_id')
+                
+                if not upload_url:
+                    raise Exception("Failed to get upload URL from VK")
+                
+                logger.info(
+                    "Got upload URL",
+                    video_id=video_id,
+                    owner_id=owner_id
+                )
+            
+            # Шаг 2: Загрузить видео
+            logger.info("Uploading video to VK", size=file_size, chunked=chunked)
+            
+            if chunked:
+                if upload_state is None:
+                    upload_state = {
+                        'upload_url': upload_url,
+                        'video_id': video_id,
+                        'owner_id': owner_id,
+                        'session_id': uuid.uuid4().hex,
+                        'file_size': file_size,
+                        'chunk_size': chunk_size or self.CHUNK_SIZE,
+                        'acked': []
+                    }
+                    # Сохраняем сразу, чтобы retry задачи не создавал новое видео
+                    if on_upload_state:
+                        on_upload_state(upload_state)
                 
-                if 'error' in upload_result:
-                    raise Exception(f"Upload error: {upload_result.get('error')}")
+                self._upload_chunked(video_path, upload_state, on_upload_state, wrap_stream, on_progress)
+            else:
+                self._upload_single(video_path, upload_url, wrap_stream)
+                if on_progress:
+                    on_progress(file_size, file_size)
             
             logger.info(
                 "Video uploaded successfully",
@@ -213,6 +315,162 @@ class VKPublisher:
             )
             raise
     
+    def _upload_single(
+        self,
+        video_path: str,
+        upload_url: str,
+        wrap_stream: Optional[Callable[[BinaryIO], BinaryIO]] = None
+    ):
+        """
+        Загрузить видео одним multipart-запросом
+        
+        requests собирает multipart-тело в памяти, поэтому wrap_stream видит
+        чтение файла целиком до отправки; для точного ограничения полосы
+        используйте чанковую загрузку.
+        
+        Args:
+            video_path: Путь к видеофайлу
+            upload_url: URL загрузки из video.save
+            wrap_stream: Обертка потока загрузки
+        """
+        with open(video_path, 'rb') as video_file:
+            files = {'video_file': wrap_stream(video_file) if wrap_stream else video_file}
+            
+            upload_response = self.upload_session.post(
+                upload_url,
+                files=files,
+                timeout=600  # 10 минут на загрузку
+            )
+            upload_response.raise_for_status()
+            
+            upload_result = upload_response.json()
+            
+            if 'error' in upload_result:
+                raise Exception(f"Upload error: {upload_result.get('error')}")
+    
+    def _upload_chunked(
+        self,
+        video_path: str,
+        upload_state: Dict,
+        on_upload_state: Optional[Callable[[Optional[Dict]], None]] = None,
+        wrap_stream: Optional[Callable[[BinaryIO], BinaryIO]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ):
+        """
+        Загрузить видео частями с Content-Range и Session-ID
+        
+        Отправляются только чанки, не подтвержденные сервером. После каждого
+        чанка прогресс передается в on_upload_state, поэтому повторная попытка
+        задачи продолжает загрузку с места обрыва.
+        
+        Args:
+            video_path: Путь к видеофайлу
+            upload_state: Состояние загрузки (upload_url, session_id, acked, ...)
+            on_upload_state: Callback для сохранения прогресса
+            wrap_stream: Обертка потока загрузки
+            on_progress: Callback прогресса (подтвержденные байты, всего байт)
+        """
+        file_size = upload_state['file_size']
+        chunk_size = upload_state['chunk_size']
+        upload_state['acked'] = _merge_ranges(upload_state.get('acked') or [])
+        
+        with open(video_path, 'rb') as video_file:
+            for start in range(0, file_size, chunk_size):
+                end = min(start + chunk_size, file_size) - 1
+                
+                if _is_covered(upload_state['acked'], start, end):
+                    continue
+                
+                video_file.seek(start)
+                chunk = video_file.read(end - start + 1)
+                
+                try:
+                    response = self._send_chunk(upload_state, chunk, start, end, wrap_stream)
+                except requests.HTTPError:
+                    # Сессия загрузки отклонена — следующая попытка начнет заново
+                    if on_upload_state:
+                        on_upload_state(None)
+                    raise
+                
+                if response.status_code == 201:
+                    # Промежуточный чанк: сервер возвращает все принятые диапазоны
+                    acked = _parse_ranges(response.text) or [[start, end]]
+                    upload_state['acked'] = _merge_ranges(upload_state['acked'] + acked)
+                else:
+                    upload_result = response.json()
+                    if 'error' in upload_result:
+                        raise Exception(f"Upload error: {upload_result.get('error')}")
+                    upload_state['acked'] = [[0, file_size - 1]]
+                
+                logger.info(
+                    "VK chunk uploaded",
+                    content_range=f"{start}-{end}/{file_size}",
+                    acked=upload_state['acked']
+                )
+                
+                if on_upload_state:
+                    on_upload_state(upload_state)
+                
+                if on_progress:
+                    on_progress(sum(last - first + 1 for first, last in upload_state['acked']), file_size)
+    
+    def _send_chunk(
+        self,
+        upload_state: Dict,
+        chunk: bytes,
+        start: int,
+        end: int,
+        wrap_stream: Optional[Callable[[BinaryIO], BinaryIO]] = None
+    ) -> requests.Response:
+        """
+        Отправить один чанк с повтором при сетевых и серверных ошибках
+        
+        Returns:
+            Ответ сервера загрузки (201 для промежуточного, 200 для последнего)
+            
+        Raises:
+            Exception: Если чанк не удалось отправить за CHUNK_MAX_RETRIES попыток
+        """
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Disposition': 'attachment; filename="video.mp4"',
+            'Content-Range': f"bytes {start}-{end}/{upload_state['file_size']}",
+            'Session-ID': upload_state['session_id']
+        }
+        
+        error = None
+        for attempt in range(1, self.CHUNK_MAX_RETRIES + 1):
+            try:
+                response = self.upload_session.post(
+                    upload_state['upload_url'],
+                    data=wrap_stream(io.BytesIO(chunk)) if wrap_stream else chunk,
+                    headers=headers,
+                    timeout=self.CHUNK_TIMEOUT
+                )
+                
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    return response
+                
+                error = f"Server error: {response.status_code}"
+                
+            except requests.HTTPError:
+                # 4xx: сессия загрузки недействительна, возобновлять нечего
+                raise
+            except requests.RequestException as e:
+                error = str(e)
+            
+            wait_time = 2 ** attempt
+            logger.warning(
+                f"VK chunk failed, retrying in {wait_time}s",
+                content_range=headers['Content-Range'],
+                attempt=attempt,
+                error=error
+            )
+            time.sleep(wait_time)
+        
+        raise Exception(f"VK chunk upload failed after {self.CHUNK_MAX_RETRIES} retries: {error}")
+    
     def get_video_status(self, video_id: str) -> Dict:
         """
         Получить статус видео
@@ -254,6 +512,40 @@ class VKPublisher:
             )
             return {'status': 'error', 'error': str(e)}
     
+    def get_videos_status(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Получить статусы нескольких видео пачками по STATUS_BATCH_SIZE
+        
+        Args:
+            video_ids: Список ID видео в формате "{owner_id}_{video_id}"
+            
+        Returns:
+            Dict {video_id: {'status': ready|processing|not_found, ...}}
+        """
+        statuses = {}
+        
+        for i in range(0, len(video_ids), self.STATUS_BATCH_SIZE):
+            batch = video_ids[i:i + self.STATUS_BATCH_SIZE]
+            
+            response = self._api_request('video.get', {
+                'videos': ','.join(batch),
+                'count': self.STATUS_BATCH_SIZE
+            })
+            
+            for video in response.get('items', []):
+                key = f"{video.get('owner_id')}_{video.get('id')}"
+                ready = video.get('player') and not video.get('processing')
+                
+                statuses[key] = {
+                    'status': 'ready' if ready else 'processing',
+                    'public_url': f"https://vk.com/video{key}"
+                }
+            
+            for video_id in batch:
+                statuses.setdefault(video_id, {'status': 'not_found'})
+        
+        return statuses
+    
     def delete_video(self, video_id: str) -> bool:
         """
         Удалить видео (для тестирования)
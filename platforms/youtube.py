@@ -2,19 +2,26 @@
 import os
 import time
 import structlog
-from typing import Dict, Optional
+from typing import BinaryIO, Callable, Dict, List, Optional
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
 from googleapiclient.errors import HttpError
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind
 
 logger = structlog.get_logger()
 
+tracer = trace.get_tracer(__name__)
+
 
 class YouTubePublisher:
     """Публикация видео на YouTube"""
     
+    # videos.list принимает до 50 id за вызов
+    STATUS_BATCH_SIZE = 50
+    
     def __init__(
         self,
         client_id: str,
@@ -65,7 +72,9 @@ class YouTubePublisher:
         tags: Optional[list] = None,
         category_id: str = "22",  # People & Blogs
         privacy_status: str = "public",
-        made_for_kids: bool = False
+        made_for_kids: bool = False,
+        wrap_stream: Optional[Callable[[BinaryIO], BinaryIO]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None
     ) -> Dict[str, str]:
         """
         Публикация видео на YouTube
@@ -78,6 +87,8 @@ class YouTubePublisher:
             category_id: ID категории (22 = People & Blogs)
             privacy_status: Статус приватности (public, private, unlisted)
             made_for_kids: Видео для детей
+            wrap_stream: Обертка потока загрузки (учет байт, ограничение полосы)
+            on_progress: Callback прогресса (принято сервером байт, всего байт)
             
         Returns:
             Dict с platform_job_id и public_url
@@ -92,6 +103,8 @@ class YouTubePublisher:
             privacy_status=privacy_status
         )
         
+        video_file = None
+        
         try:
             youtube = self._get_youtube_service()
             
@@ -114,12 +127,21 @@ class YouTubePublisher:
                 raise FileNotFoundError(f"Video file not found: {video_path}")
             
             # Создание MediaFileUpload
-            media = MediaFileUpload(
-                video_path,
-                mimetype='video/*',
-                resumable=True,
-                chunksize=10 * 1024 * 1024  # 10 MB chunks
-            )
+            if wrap_stream:
+                video_file = open(video_path, 'rb')
+                media = MediaIoBaseUpload(
+                    wrap_stream(video_file),
+                    mimetype='video/*',
+                    resumable=True,
+                    chunksize=10 * 1024 * 1024  # 10 MB chunks
+                )
+            else:
+                media = MediaFileUpload(
+                    video_path,
+                    mimetype='video/*',
+                    resumable=True,
+                    chunksize=10 * 1024 * 1024  # 10 MB chunks
+                )
             
             # Инициализация загрузки
             request = youtube.videos().insert(
@@ -137,11 +159,16 @@ class YouTubePublisher:
             while response is None and retry < max_retries:
                 try:
                     logger.info(f"Upload attempt {retry + 1}/{max_retries}")
-                    status, response = request.next_chunk()
+                    # googleapiclient ходит через httplib2, а не общие сессии:
+                    # span на каждый чанк resumable upload
+                    with tracer.start_as_current_span("youtube videos.insert chunk", kind=SpanKind.CLIENT):
+                        status, response = request.next_chunk()
                     
                     if status:
                         progress = int(status.progress() * 100)
                         logger.info(f"Upload progress: {progress}%")
+                        if on_progress:
+                            on_progress(status.resumable_progress, status.total_size)
                         
                 except HttpError as e:
                     if e.resp.status in [500, 502, 503, 504]:
@@ -175,6 +202,10 @@ class YouTubePublisher:
             video_id = response['id']
             public_url = f"https://www.youtube.com/watch?v={video_id}"
             
+            if on_progress:
+                file_size = os.path.getsize(video_path)
+                on_progress(file_size, file_size)
+            
             logger.info(
                 "Video uploaded successfully",
                 video_id=video_id,
@@ -208,6 +239,10 @@ class YouTubePublisher:
                 error_type=type(e).__name__
             )
             raise
+        
+        finally:
+            if video_file:
+                video_file.close()
     
     def get_video_status(self, video_id: str) -> Dict:
         """
@@ -249,6 +284,52 @@ class YouTubePublisher:
             )
             return {'status': 'error', 'error': str(e)}
     
+    def get_videos_status(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Получить статусы нескольких видео пачками по STATUS_BATCH_SIZE
+        
+        Args:
+            video_ids: Список ID видео на YouTube
+            
+        Returns:
+            Dict {video_id: {'status': ready|processing|failed|not_found, ...}}
+        """
+        youtube = self._get_youtube_service()
+        statuses = {}
+        
+        for i in range(0, len(video_ids), self.STATUS_BATCH_SIZE):
+            batch = video_ids[i:i + self.STATUS_BATCH_SIZE]
+            
+            response = youtube.videos().list(
+                part='status,processingDetails',
+                id=','.join(batch),
+                maxResults=self.STATUS_BATCH_SIZE
+            ).execute()
+            
+            for video in response.get('items', []):
+                status = video.get('status', {})
+                processing = video.get('processingDetails', {})
+                upload_status = status.get('uploadStatus')
+                processing_status = processing.get('processingStatus')
+                
+                if upload_status in ('failed', 'rejected', 'deleted') or processing_status in ('failed', 'terminated'):
+                    normalized = 'failed'
+                elif upload_status == 'processed' or processing_status == 'succeeded':
+                    normalized = 'ready'
+                else:
+                    normalized = 'processing'
+                
+                statuses[video['id']] = {
+                    'status': normalized,
+                    'public_url': f"https://www.youtube.com/watch?v={video['id']}",
+                    'error': status.get('failureReason') or status.get('rejectionReason')
+                }
+            
+            for video_id in batch:
+                statuses.setdefault(video_id, {'status': 'not_found'})
+        
+        return statuses
+    
     def delete_video(self, video_id: str) -> bool:
         """
         Удалить видео (для тестирования)
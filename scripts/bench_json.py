@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сериализации ответов API: прежний путь (pydantic + JSONResponse)
+против orjson (ORJSONResponse и прямое кодирование строк)
+
+Запуск (нужны переменные окружения приложения, как для тестов):
+    python scripts/bench_json.py --rps 200
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.schemas import StatusResponse
+
+
+def make_job(index: int) -> SimpleNamespace:
+    created = datetime(2024, 1, 1) + timedelta(seconds=index, microseconds=index)
+    return SimpleNamespace(
+        submission_id=str(uuid.uuid4()),
+        group_id=str(uuid.uuid4()),
+        title=f"Видео {index}",
+        platform="vk",
+        status="COMPLETED",
+        platform_job_id=f"-1_{index}",
+        public_url=f"https://vk.com/video-1_{index}",
+        platform_status="ready",
+        error_message=None,
+        retry_count=0,
+        created_at=created,
+        updated_at=created,
+        published_at=created
+    )
+
+
+def status_payload(job) -> dict:
+    return {
+        "submission_id": job.submission_id,
+        "group_id": job.group_id,
+        "status": job.status,
+        "platform": job.platform,
+        "platform_job_id": job.platform_job_id,
+        "public_url": job.public_url,
+        "platform_status": job.platform_status,
+        "error_message": job.error_message,
+        "retry_count": job.retry_count,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+        "published_at": job.published_at.isoformat()
+    }
+
+
+def status_before(payload):
+    # Модель в обработчике + проверка response_model + jsonable_encoder
+    model = StatusResponse(**payload)
+    validated = StatusResponse.model_validate(model.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def status_after(payload):
+    return ORJSONResponse(payload).body
+
+
+def jobs_before(jobs):
+    return JSONResponse(content=[
+        {
+            "submission_id": job.submission_id,
+            "title": job.title,
+            "platform": job.platform,
+            "status": job.status,
+            "public_url": job.public_url,
+            "platform_status": job.platform_status,
+            "error_message": job.error_message,
+            "created_at": job.created_at.isoformat(),
+            "published_at": job.published_at.isoformat() if job.published_at else None
+        }
+        for job in jobs
+    ]).body
+
+
+def jobs_after(rows):
+    return ORJSONResponse(rows).body
+
+
+def batch_before(payloads):
+    parts = ["{"]
+    for index, payload in enumerate(payloads):
+        separator = "," if index else ""
+        parts.append(f"{separator}{json.dumps(payload['submission_id'])}:{json.dumps(payload)}")
+    parts.append("}")
+    return "".join(parts).encode()
+
+
+def batch_after(payloads):
+    parts = [b"{"]
+    for index, payload in enumerate(payloads):
+        if index:
+            parts.append(b",")
+        parts.append(orjson.dumps(payload["submission_id"]) + b":" + orjson.dumps(payload))
+    parts.append(b"}")
+    return b"".join(parts)
+
+
+def measure(func, arg, iterations: int) -> float:
+    """CPU-время одного вызова, микросекунды"""
+    func(arg)
+    started = time.process_time()
+    for _ in range(iterations):
+        func(arg)
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rps", type=float, default=100, help="Запросов в секунду на процесс API")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    jobs = [make_job(index) for index in range(100)]
+    rows = [
+        {
+            "submission_id": job.submission_id,
+            "title": job.title,
+            "platform": job.platform,
+            "status": job.status,
+            "public_url": job.public_url,
+            "platform_status": job.platform_status,
+            "error_message": job.error_message,
+            "created_at": job.created_at,
+            "published_at": job.published_at
+        }
+        for job in jobs
+    ]
+    payloads = [status_payload(make_job(index)) for index in range(500)]
+
+    cases = [
+        ("GET /api/status/{id}", status_before, status_after, payloads[0], payloads[0], args.iterations),
+        ("GET /api/jobs (100)", jobs_before, jobs_after, jobs, rows, args.iterations // 10),
+        ("POST /status/batch (500)", batch_before, batch_after, payloads, payloads, args.iterations // 50),
+    ]
+
+    print(f"{'Endpoint':<28}{'before, us':>12}{'after, us':>12}{'speedup':>10}{'CPU saved @ rps':>18}")
+    for name, before, after, before_arg, after_arg, iterations in cases:
+        before_us = measure(before, before_arg, max(iterations, 20))
+        after_us = measure(after, after_arg, max(iterations, 20))
+        saved = (before_us - after_us) * args.rps / 1e6 * 100
+        print(f"{name:<28}{before_us:>12.1f}{after_us:>12.1f}{before_us / after_us:>9.1f}x{saved:>16.2f}% core")
+
+
+if __name__ == "__main__":
+    main()
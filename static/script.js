@@ -247,10 +247,12 @@ videoForm.addEventListener('submit', async (e) => {
             const result = await response.json();
             showSuccess(result);
             
-            // Начинаем отслеживание статуса для всех submission_id
-            if (result.submissions && result.submissions.length > 0) {
+            // Отслеживаем все платформы одним потоком группы
+            if (result.group_id) {
+                watchGroup(result.group_id);
+            } else if (result.submissions && result.submissions.length > 0) {
                 result.submissions.forEach(sub => {
-                    pollStatus(sub.submission_id);
+                    watchStatus(sub.submission_id);
                 });
             }
         } else {
@@ -389,7 +391,201 @@ function resetForm() {
     document.getElementById('tiktok-disable-stitch').checked = false;
 }
 
-// Отслеживание статуса публикации
+// Отслеживание статуса публикации (Server-Sent Events)
+function watchStatus(submissionId) {
+    if (!window.EventSource) {
+        pollStatus(submissionId);
+        return;
+    }
+    
+    const source = new EventSource(`${API_BASE}/api/status/${submissionId}/stream`);
+    let finished = false;
+    
+    source.addEventListener('status', (e) => {
+        finished = renderStatus(JSON.parse(e.data));
+        if (finished) {
+            source.close();
+        }
+    });
+    
+    source.addEventListener('progress', (e) => {
+        const progress = JSON.parse(e.data);
+        renderUploadProgress(progress.submission_id, progress);
+    });
+    
+    source.onerror = () => {
+        // Поток закрыт сервером или соединение потеряно — не переподключаемся бесконечно
+        source.close();
+        if (!finished) {
+            pollStatus(submissionId);
+        }
+    };
+}
+
+// Отображение статуса; возвращает true, если статус финальный
+function renderStatus(data) {
+    const statusBadge = document.getElementById('jobStatus');
+    
+    // Обновляем статус
+    statusBadge.textContent = getStatusText(data.status);
+    statusBadge.className = `badge badge-${data.status.toLowerCase()}`;
+    
+    uploadLabels[data.submission_id] = getPlatformName(data.platform);
+    renderUploadProgress(data.submission_id, data.status === 'PROCESSING' ? data.progress : null);
+    
+    if (data.status === 'COMPLETED') {
+        // Показываем ссылку
+        if (data.public_url) {
+            const urlContainer = document.getElementById('urlContainer');
+            const videoUrl = document.getElementById('videoUrl');
+            videoUrl.href = data.public_url;
+            videoUrl.textContent = data.public_url;
+            urlContainer.style.display = 'block';
+        }
+        
+        // Обновляем список
+        loadRecentJobs();
+        return true;
+        
+    } else if (data.status === 'FAILED' && data.will_retry) {
+        // Неудачная попытка, повтор запланирован — ждем следующий статус
+        statusBadge.textContent = 'Повтор';
+        statusBadge.className = 'badge badge-processing';
+        
+    } else if (data.status === 'FAILED') {
+        statusBadge.className = 'badge badge-failed';
+        
+        if (data.error_message) {
+            const errorP = document.createElement('p');
+            errorP.className = 'error-text';
+            errorP.textContent = `Ошибка: ${data.error_message}`;
+            successResult.appendChild(errorP);
+        }
+        return true;
+    }
+    
+    return false;
+}
+
+// Названия платформ заявок для строк прогресса загрузки
+const uploadLabels = {};
+
+// Прогресс загрузки на платформу; null убирает строку
+function renderUploadProgress(submissionId, progress) {
+    let line = successResult.querySelector(`.upload-progress[data-submission-id="${submissionId}"]`);
+    
+    if (!progress) {
+        if (line) {
+            line.remove();
+        }
+        return;
+    }
+    
+    if (!line) {
+        line = document.createElement('p');
+        line.className = 'upload-progress';
+        line.dataset.submissionId = submissionId;
+        successResult.appendChild(line);
+    }
+    
+    const label = uploadLabels[submissionId] || 'Загрузка';
+    const percent = progress.percent !== null ? `${Math.round(progress.percent)}%` : formatFileSize(progress.bytes_sent);
+    line.textContent = `${label}: загружено ${percent}`;
+}
+
+// Отслеживание всех публикаций одной загрузки (Server-Sent Events)
+function watchGroup(groupId) {
+    if (!window.EventSource) {
+        pollGroup(groupId);
+        return;
+    }
+    
+    const source = new EventSource(`${API_BASE}/api/groups/${groupId}/stream`);
+    let finished = false;
+    
+    source.addEventListener('group', (e) => {
+        finished = renderGroup(JSON.parse(e.data));
+        if (finished) {
+            source.close();
+        }
+    });
+    
+    source.addEventListener('progress', (e) => {
+        const progress = JSON.parse(e.data);
+        renderUploadProgress(progress.submission_id, progress);
+    });
+    
+    source.onerror = () => {
+        source.close();
+        if (!finished) {
+            pollGroup(groupId);
+        }
+    };
+}
+
+// Отображение статуса группы; возвращает true, если все публикации завершены
+function renderGroup(data) {
+    const statusBadge = document.getElementById('jobStatus');
+    statusBadge.textContent = getStatusText(data.state);
+    statusBadge.className = `badge badge-${data.state.toLowerCase()}`;
+    
+    data.jobs.forEach(job => {
+        uploadLabels[job.submission_id] = getPlatformName(job.platform);
+        renderUploadProgress(job.submission_id, job.status === 'PROCESSING' ? job.progress : null);
+    });
+    
+    const links = data.jobs.filter(job => job.status === 'COMPLETED' && job.public_url);
+    const urlContainer = document.getElementById('urlContainer');
+    if (links.length > 0) {
+        urlContainer.innerHTML = '<strong>Ссылки:</strong> ' + links.map(job =>
+            `<div>${getPlatformName(job.platform)}: <a href="${escapeHtml(job.public_url)}" target="_blank">${escapeHtml(job.public_url)}</a></div>`
+        ).join('');
+        urlContainer.style.display = 'block';
+    }
+    
+    const errors = data.jobs.filter(job => job.status === 'FAILED' && !job.will_retry && job.error_message);
+    successResult.querySelectorAll('.error-text').forEach(el => el.remove());
+    errors.forEach(job => {
+        const errorP = document.createElement('p');
+        errorP.className = 'error-text';
+        errorP.textContent = `${getPlatformName(job.platform)}: ${job.error_message}`;
+        successResult.appendChild(errorP);
+    });
+    
+    const finished = ['COMPLETED', 'PARTIAL', 'FAILED'].includes(data.state);
+    if (finished) {
+        loadRecentJobs();
+    }
+    return finished;
+}
+
+// Опрос статуса группы (для браузеров без EventSource)
+async function pollGroup(groupId) {
+    let attempts = 0;
+    const maxAttempts = 20; // 10 минут (30 сек * 20)
+    
+    const interval = setInterval(async () => {
+        attempts++;
+        
+        try {
+            const response = await fetch(`${API_BASE}/api/groups/${groupId}`);
+            
+            if (response.ok && renderGroup(await response.json())) {
+                clearInterval(interval);
+            }
+            
+        } catch (error) {
+            console.error('Error polling group status:', error);
+        }
+        
+        if (attempts >= maxAttempts) {
+            clearInterval(interval);
+        }
+        
+    }, 30000); // Каждые 30 секунд
+}
+
+// Опрос статуса (для браузеров без EventSource)
 async function pollStatus(submissionId) {
     let attempts = 0;
     const maxAttempts = 20; // 10 минут (30 сек * 20)
@@ -400,40 +596,8 @@ async function pollStatus(submissionId) {
         try {
             const response = await fetch(`${API_BASE}/api/status/${submissionId}`);
             
-            if (response.ok) {
-                const data = await response.json();
-                const statusBadge = document.getElementById('jobStatus');
-                
-                // Обновляем статус
-                statusBadge.textContent = getStatusText(data.status);
-                statusBadge.className = `badge badge-${data.status.toLowerCase()}`;
-                
-                if (data.status === 'COMPLETED') {
-                    clearInterval(interval);
-                    
-                    // Показываем ссылку
-                    if (data.public_url) {
-                        const urlContainer = document.getElementById('urlContainer');
-                        const videoUrl = document.getElementById('videoUrl');
-                        videoUrl.href = data.public_url;
-                        videoUrl.textContent = data.public_url;
-                        urlContainer.style.display = 'block';
-                    }
-                    
-                    // Обновляем список
-                    loadRecentJobs();
-                    
-                } else if (data.status === 'FAILED') {
-                    clearInterval(interval);
-                    statusBadge.className = 'badge badge-failed';
-                    
-                    if (data.error_message) {
-                        const errorP = document.createElement('p');
-                        errorP.className = 'error-text';
-                        errorP.textContent = `Ошибка: ${data.error_message}`;
-                        successResult.appendChild(errorP);
-                    }
-                }
+            if (response.ok && renderStatus(await response.json())) {
+                clearInterval(interval);
             }
             
         } catch (error) {
@@ -502,6 +666,7 @@ function getStatusText(status) {
         'PENDING': 'В очереди',
         'PROCESSING': 'Обработка',
         'COMPLETED': 'Завершено',
+        'PARTIAL': 'Частично',
         'FAILED': 'Ошибка'
     };
     return statusMap[status] || status;
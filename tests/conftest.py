@@ -0,0 +1,64 @@
+"""Общие фикстуры тестов"""
+import uuid
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture
+def fake_redis():
+    """Общий fakeredis для кеша статусов, событий, Idempotency-Key и прогресса (decode_responses, как get_redis)"""
+    import fakeredis
+
+    server = fakeredis.FakeRedis(decode_responses=True)
+    with patch('app.cache.get_redis', return_value=server), \
+            patch('app.events.get_redis', return_value=server), \
+            patch('app.idempotency.get_redis', return_value=server), \
+            patch('app.progress.get_redis', return_value=server):
+        yield server
+
+
+@pytest.fixture
+def make_job():
+    """
+    Фабрика задач публикации в тестовой БД
+
+    По умолчанию — задача VK в статусе PENDING; любые колонки задаются
+    аргументами. Задача сохраняется и возвращается отсоединенной от сессии.
+    После теста удаляются только созданные фабрикой задачи, их попытки,
+    сообщения outbox и архивные копии — остальные строки БД не трогаются.
+    """
+    from app.database import SessionLocal, PublishJob, PublishJobArchive, PublishAttempt, OutboxMessage, init_db
+
+    init_db()
+    db = SessionLocal()
+    submission_ids = []
+
+    def factory(**values):
+        job = PublishJob(**{
+            "id": str(uuid.uuid4()),
+            "submission_id": str(uuid.uuid4()),
+            "video_hash": uuid.uuid4().hex,
+            "s3_key": "videos/test.mp4",
+            "file_size": 1000,
+            "platform": "vk",
+            "title": "Test",
+            "status": "PENDING",
+            **values
+        })
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+        submission_ids.append(job.submission_id)
+        return job
+
+    yield factory
+
+    db.rollback()
+    for message in db.query(OutboxMessage).all():
+        if message.args and message.args[0] in submission_ids:
+            db.delete(message)
+    for model in (PublishAttempt, PublishJobArchive, PublishJob):
+        db.query(model).filter(model.submission_id.in_(submission_ids)).delete(synchronize_session=False)
+    db.commit()
+    db.close()
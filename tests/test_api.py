@@ -3,6 +3,7 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 import uuid
+from datetime import datetime
 
 from app.main import app
 from app.config import get_settings
@@ -100,3 +101,420 @@ def test_status_not_found():
     assert response.status_code in [404, 500]
 
 
+
+
+@pytest.fixture
+def completed_job(make_job):
+    """Завершенная задача публикации в тестовой БД"""
+    return make_job(
+        status="COMPLETED",
+        platform_job_id="-1_2",
+        public_url="https://vk.com/video-1_2",
+        platform_status="ready"
+    )
+
+
+def test_status_stream_sends_current_status(completed_job):
+    """SSE-поток сразу отдает текущий статус и закрывается на финальном"""
+    import fakeredis.aioredis
+
+    with patch('app.events.aioredis.Redis.from_url', return_value=fakeredis.aioredis.FakeRedis(decode_responses=True)):
+        response = client.get(f"/api/status/{completed_job.submission_id}/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: status\ndata: ")
+    assert completed_job.public_url in response.text
+
+
+def test_status_served_from_cache(completed_job, fake_redis):
+    """Промах кеша заполняет его из БД, следующий запрос читает кеш"""
+    from app.cache import STATUS_KEY
+
+    url = f"/api/status/{completed_job.submission_id}"
+    key = STATUS_KEY.format(submission_id=completed_job.submission_id)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert fake_redis.exists(key)
+
+    # Изменение в обход воркера не видно, пока запись в кеше жива
+    from app.database import SessionLocal, PublishJob
+    db = SessionLocal()
+    db.query(PublishJob).filter_by(id=completed_job.id).update({"public_url": "https://changed"})
+    db.commit()
+    db.close()
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.json()["public_url"] == completed_job.public_url
+
+
+def test_job_event_updates_cache(completed_job, fake_redis):
+    """Воркер обновляет кеш вместе с публикацией события"""
+    from app.cache import get_cached_status
+    from app.events import publish_job_event
+
+    completed_job.platform_status = "failed"
+    publish_job_event(completed_job)
+
+    assert get_cached_status(completed_job.submission_id)["platform_status"] == "failed"
+
+
+def test_status_conditional_get(completed_job, fake_redis):
+    """Повторный запрос с If-None-Match получает 304 без тела"""
+    url = f"/api/status/{completed_job.submission_id}"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["last-modified"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = client.get(url, headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert response.status_code == 304
+
+
+def test_jobs_conditional_get(completed_job):
+    """ETag списка меняется вместе с updated_at задач"""
+    from app.database import SessionLocal, PublishJob
+
+    response = client.get("/api/jobs")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    assert client.get("/api/jobs", headers={"If-None-Match": etag}).status_code == 304
+
+    db = SessionLocal()
+    db.query(PublishJob).filter_by(id=completed_job.id).update({"status": "FAILED", "updated_at": datetime.utcnow()})
+    db.commit()
+    db.close()
+
+    response = client.get("/api/jobs", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_status_batch(completed_job, fake_redis):
+    """Пакетный запрос отдает найденные статусы и null для неизвестных"""
+    unknown = str(uuid.uuid4())
+    headers = {"X-Service-Token": settings.SERVICE_TOKEN}
+    payload = {"submission_ids": [completed_job.submission_id, unknown]}
+
+    response = client.post("/status/batch", json=payload, headers=headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data[completed_job.submission_id]["public_url"] == completed_job.public_url
+    assert data[unknown] is None
+
+    assert client.post("/status/batch", json=payload).status_code == 401
+
+
+def test_jobs_keyset_pagination(make_job):
+    """Курсор обходит отфильтрованный список без пропусков и повторов"""
+    video_hash = uuid.uuid4().hex
+    created = datetime(2024, 1, 1)
+    ids = [
+        make_job(
+            video_hash=video_hash,
+            title=f"Test {index}",
+            status="FAILED",
+            # Две задачи с одинаковым created_at — порядок решает id
+            created_at=created.replace(minute=min(index, 3))
+        ).submission_id
+        for index in range(5)
+    ]
+
+    seen = []
+    params = {"video_hash": video_hash, "limit": 2}
+    while True:
+        response = client.get("/api/jobs", params=params)
+        assert response.status_code == 200
+        seen.extend(item["submission_id"] for item in response.json())
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+
+    assert sorted(seen) == sorted(ids)
+    assert len(seen) == len(set(seen))
+
+    assert client.get("/api/jobs", params={"limit": 1000}).status_code == 422
+    assert client.get("/api/jobs", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_group_status_aggregates_platforms(make_job):
+    """Группа отдает все платформы одним запросом и сводное состояние"""
+    from app.database import SessionLocal, PublishJob, PublishGroup
+
+    db = SessionLocal()
+    group = PublishGroup(id=str(uuid.uuid4()), video_hash=uuid.uuid4().hex, title="Test")
+    db.add(group)
+    db.commit()
+    for platform, status in (("vk", "COMPLETED"), ("tiktok", "FAILED")):
+        # FAILED с исчерпанными повторами
+        make_job(
+            group_id=group.id,
+            video_hash=group.video_hash,
+            platform=platform,
+            status=status,
+            retry_count=4 if status == "FAILED" else 0
+        )
+
+    try:
+        response = client.get(f"/api/groups/{group.id}")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["state"] == "PARTIAL"
+        assert {job["platform"] for job in data["jobs"]} == {"vk", "tiktok"}
+
+        # Неудачная попытка, которая будет повторена, группу не завершает
+        db.query(PublishJob).filter_by(group_id=group.id, platform="tiktok").update({"retry_count": 1})
+        db.commit()
+        data = client.get(f"/api/groups/{group.id}").json()
+        assert data["state"] == "PROCESSING"
+        assert [job["will_retry"] for job in data["jobs"] if job["platform"] == "tiktok"] == [True]
+
+        assert client.get(f"/api/groups/{uuid.uuid4()}").status_code == 404
+    finally:
+        db.query(PublishJob).filter_by(group_id=group.id).delete()
+        db.query(PublishGroup).filter_by(id=group.id).delete()
+        db.commit()
+        db.close()
+
+
+def test_ingest_into_existing_group(fake_redis):
+    """Заявки разных платформ с одним group_id: группа создается один раз"""
+    from app.database import SessionLocal, PublishJob, PublishGroup, init_db, insert_group_if_missing
+
+    init_db()
+    group_id = str(uuid.uuid4())
+    video_hash = uuid.uuid4().hex
+    headers = {"X-Service-Token": settings.SERVICE_TOKEN}
+
+    db = SessionLocal()
+    try:
+        # Группу уже вставил параллельный запрос — повторная вставка не падает
+        insert_group_if_missing(db, id=group_id, video_hash=video_hash, title="Test")
+        insert_group_if_missing(db, id=group_id, video_hash=video_hash, title="Test")
+        db.commit()
+
+        for platform in ("vk", "tiktok"):
+            response = client.post("/ingest", headers=headers, json={
+                "video_hash": video_hash,
+                "s3_key": "videos/test.mp4",
+                "file_size": 1000,
+                "platform": platform,
+                "title": "Test",
+                "group_id": group_id
+            })
+            assert response.status_code == 200
+
+        assert db.query(PublishGroup).filter_by(id=group_id).count() == 1
+        assert db.query(PublishJob).filter_by(group_id=group_id).count() == 2
+    finally:
+        db.query(PublishJob).filter_by(group_id=group_id).delete()
+        db.query(PublishGroup).filter_by(id=group_id).delete()
+        db.commit()
+        db.close()
+
+
+def test_group_state():
+    """Сводное состояние группы"""
+    from app.events import group_state
+
+    pending = {"status": "PENDING"}
+    processing = {"status": "COMPLETED", "platform_status": "processing"}
+    ready = {"status": "COMPLETED", "platform_status": "ready"}
+    failed = {"status": "FAILED"}
+
+    assert group_state([pending, pending]) == "PENDING"
+    assert group_state([pending, processing]) == "PROCESSING"
+    assert group_state([ready, ready]) == "COMPLETED"
+    assert group_state([ready, failed]) == "PARTIAL"
+    assert group_state([failed, {"status": "COMPLETED", "platform_status": "failed"}]) == "FAILED"
+    assert group_state([ready, {"status": "FAILED", "will_retry": True}]) == "PROCESSING"
+
+
+def outbox_messages_for(db, submission_id):
+    """Сообщения outbox для заявки"""
+    from app.database import OutboxMessage
+
+    return [message for message in db.query(OutboxMessage).all() if message.args == [submission_id]]
+
+
+@patch('app.main.publish_submission.delay')
+def test_ingest_deduplicates_active_job(mock_delay, fake_redis):
+    """Повторный /ingest активного видео возвращает существующую заявку"""
+    from app.database import SessionLocal, PublishJob, init_db
+
+    init_db()
+    headers = {"X-Service-Token": settings.SERVICE_TOKEN}
+    payload = {
+        "video_hash": uuid.uuid4().hex,
+        "s3_key": "videos/test.mp4",
+        "file_size": 1000,
+        "platform": "vk",
+        "title": "Test"
+    }
+
+    db = SessionLocal()
+    try:
+        first = client.post("/ingest", json=payload, headers=headers).json()["submission_id"]
+        second = client.post("/ingest", json=payload, headers=headers).json()["submission_id"]
+        assert first == second
+        assert len(outbox_messages_for(db, first)) == 1
+        mock_delay.assert_not_called()
+
+        # После неудачи видео можно отправить снова
+        db.query(PublishJob).filter_by(submission_id=first).update({"status": "FAILED", "retry_count": 4})
+        db.commit()
+        third = client.post("/ingest", json=payload, headers=headers).json()["submission_id"]
+        assert third != first
+
+        # Старую заявку нельзя вернуть в очередь, пока активна новая
+        response = client.post(f"/retry_failed/{first}", headers=headers)
+        assert response.status_code == 409
+    finally:
+        db.query(PublishJob).filter_by(video_hash=payload["video_hash"]).delete()
+        db.commit()
+        db.close()
+
+
+@patch('app.main.publish_submission.delay')
+def test_ingest_idempotency_key_replays_response(mock_delay, fake_redis):
+    """Повтор с тем же Idempotency-Key отдает сохраненный ответ"""
+    from app.database import SessionLocal, PublishJob, init_db
+
+    init_db()
+    headers = {"X-Service-Token": settings.SERVICE_TOKEN, "Idempotency-Key": str(uuid.uuid4())}
+    payload = {
+        "video_hash": uuid.uuid4().hex,
+        "s3_key": "videos/test.mp4",
+        "file_size": 1000,
+        "platform": "vk",
+        "title": "Test"
+    }
+
+    try:
+        first = client.post("/ingest", json=payload, headers=headers)
+        assert first.status_code == 200
+
+        with patch('app.main.insert_job_or_get_active') as mock_insert:
+            second = client.post("/ingest", json=payload, headers=headers)
+            mock_insert.assert_not_called()
+
+        assert second.status_code == 200
+        assert second.json() == first.json()
+        assert second.headers["idempotent-replayed"] == "true"
+
+        db = SessionLocal()
+        assert len(outbox_messages_for(db, first.json()["submission_id"])) == 1
+        db.close()
+
+        # Без токена сохраненный ответ не отдается
+        response = client.post("/ingest", json=payload, headers={"Idempotency-Key": headers["Idempotency-Key"]})
+        assert response.status_code == 401
+
+        # Тот же ключ с другим телом — 422, а не чужой результат
+        response = client.post("/ingest", json={**payload, "title": "Other"}, headers=headers)
+        assert response.status_code == 422
+    finally:
+        db = SessionLocal()
+        db.query(PublishJob).filter_by(video_hash=payload["video_hash"]).delete()
+        db.commit()
+        db.close()
+
+
+def test_idempotency_key_in_progress(fake_redis):
+    """Пока первый запрос выполняется, повтор получает 409"""
+    from app.idempotency import idempotency_key
+
+    key = str(uuid.uuid4())
+    fake_redis.set(idempotency_key("/upload", "", key), '{"state": "in_progress"}')
+
+    response = client.post("/upload", headers={"Idempotency-Key": key})
+    assert response.status_code == 409
+
+
+def test_request_fingerprint_streams_multipart():
+    """Отпечаток по частям тела не зависит от разбиения и границы multipart"""
+    from app.idempotency import RequestFingerprint
+
+    def fingerprint(boundary, chunk_size):
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"title\"\r\n\r\nTest\r\n"
+            f"--{boundary}--\r\n"
+        ).encode()
+        result = RequestFingerprint(f"multipart/form-data; boundary={boundary}")
+        for start in range(0, len(body), chunk_size):
+            result.update(body[start:start + chunk_size])
+        return result.hexdigest()
+
+    expected = fingerprint("a" * 16, 1000)
+    assert fingerprint("b" * 16, 7) == expected
+    assert fingerprint("c" * 24, 3) == expected
+
+
+@pytest.fixture
+def empty_replica():
+    """Реплика, до которой еще не дошли новые заявки (отдельная пустая БД)"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base, get_read_db
+
+    replica = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=replica)
+    ReplicaSession = sessionmaker(bind=replica)
+
+    def get_replica_db():
+        db = ReplicaSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_read_db] = get_replica_db
+    yield
+    app.dependency_overrides.pop(get_read_db)
+    replica.dispose()
+
+
+def test_status_falls_back_to_primary(completed_job, fake_redis, empty_replica):
+    """Заявка, которой еще нет на реплике, читается из основной БД"""
+    response = client.get(f"/api/status/{completed_job.submission_id}")
+    assert response.status_code == 200
+    assert response.json()["public_url"] == completed_job.public_url
+
+    fake_redis.flushall()
+    unknown = str(uuid.uuid4())
+    with patch('app.main.settings') as mock_settings:
+        mock_settings.SERVICE_TOKEN = "test_service_token"
+        response = client.post(
+            "/status/batch",
+            json={"submission_ids": [completed_job.submission_id, unknown]},
+            headers={"X-Service-Token": "test_service_token"}
+        )
+
+    assert response.status_code == 200
+    statuses = response.json()
+    assert statuses[completed_job.submission_id]["status"] == "COMPLETED"
+    assert statuses[unknown] is None
+
+    assert client.get(f"/api/status/{unknown}").status_code == 404
+
+
+def test_cache_fill_keeps_worker_status(completed_job, fake_redis):
+    """Заполнение кеша из БД не перетирает статус, записанный воркером"""
+    from app.cache import cache_status, store_statuses, get_cached_status
+
+    fresh = {"submission_id": completed_job.submission_id, "status": "COMPLETED"}
+    cache_status(fresh)
+    store_statuses([{"submission_id": completed_job.submission_id, "status": "PROCESSING"}])
+
+    assert get_cached_status(completed_job.submission_id) == fresh
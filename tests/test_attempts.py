@@ -0,0 +1,235 @@
+"""Тесты истории попыток публикации"""
+import uuid
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database import SessionLocal, PublishJob, PublishAttempt, OutboxMessage
+from workers.tasks_publish import publish_submission
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def vk_job(make_job):
+    """Задача VK в статусе PENDING"""
+    return make_job().submission_id
+
+
+def download(bucket, key, path):
+    with open(path, 'wb') as f:
+        f.write(b'x' * 1000)
+
+
+def outbox_messages(db, submission_id):
+    """Неотправленные сообщения outbox для заявки"""
+    return [
+        message for message in db.query(OutboxMessage).filter(OutboxMessage.sent_at.is_(None)).all()
+        if message.args == [submission_id]
+    ]
+
+
+def deliver_outbox(submission_id, result=None):
+    """Выполнить задачи заявки из outbox (и поставленные ими retry), как relay и воркер"""
+    db = SessionLocal()
+    try:
+        while messages := outbox_messages(db, submission_id):
+            for message in messages:
+                message.sent_at = datetime.utcnow()
+            db.commit()
+            for message in messages:
+                options = message.options or {}
+                result = publish_submission.apply(
+                    args=message.args,
+                    retries=options.get('retries', 0),
+                    headers=options.get('headers')
+                )
+        return result
+    finally:
+        db.close()
+
+
+def run_with_retries(submission_id):
+    """Первая попытка и все ее retry"""
+    return deliver_outbox(submission_id, publish_submission.apply(args=[submission_id]))
+
+
+def load_attempts(submission_id):
+    db = SessionLocal()
+    try:
+        return db.query(PublishAttempt).filter_by(submission_id=submission_id).order_by(PublishAttempt.id).all()
+    finally:
+        db.close()
+
+
+def test_successful_attempt_is_recorded(vk_job):
+    """Успешная попытка: этапы, вызовы API и отправленные байты"""
+    def fake_publish(video_path, wrap_stream, on_api_call, **kwargs):
+        on_api_call("video.save", 0.25, True)
+        on_api_call("video.get", 0.5, True)
+        with open(video_path, 'rb') as f:
+            stream = wrap_stream(f)
+            while stream.read(256):
+                pass
+        return {'platform_job_id': '1_2', 'public_url': 'https://vk.com/video1_2', 'status': 'uploaded'}
+
+    with patch('workers.tasks_publish.minio_client') as mock_minio, \
+            patch('workers.tasks_publish.publish_to_vk', side_effect=fake_publish), \
+            patch('workers.tasks_publish.publish_job_event'):
+        mock_minio.fget_object.side_effect = download
+        result = publish_submission.apply(args=[vk_job]).get()
+
+    assert result['status'] == 'COMPLETED'
+
+    [attempt] = load_attempts(vk_job)
+    assert attempt.outcome == "COMPLETED"
+    assert attempt.attempt == 1
+    assert attempt.platform == "vk"
+    assert attempt.worker_host
+    assert attempt.api_calls == 2
+    assert attempt.api_seconds == pytest.approx(0.75)
+    assert attempt.bytes_sent == 1000
+    assert attempt.download_seconds is not None
+    assert attempt.publish_seconds is not None
+    assert attempt.error_class is None
+
+
+def test_failed_attempts_and_history_api(vk_job):
+    """Каждый retry — отдельная строка с классом ошибки; история доступна через API"""
+    with patch('workers.tasks_publish.minio_client') as mock_minio, \
+            patch('workers.tasks_publish.publish_to_vk', side_effect=TimeoutError("upload timed out")), \
+            patch('workers.tasks_publish.publish_job_event'):
+        mock_minio.fget_object.side_effect = download
+        result = run_with_retries(vk_job)
+
+    assert result.failed()
+
+    attempts = load_attempts(vk_job)
+    assert [item.attempt for item in attempts] == [1, 2, 3, 4]
+    assert {item.outcome for item in attempts} == {"FAILED"}
+    assert {item.error_class for item in attempts} == {"TimeoutError"}
+
+    with patch('app.main.settings') as mock_settings:
+        mock_settings.SERVICE_TOKEN = "test_service_token"
+        response = client.get(
+            f"/status/{vk_job}/attempts",
+            headers={"X-Service-Token": "test_service_token"}
+        )
+
+    assert response.status_code == 200
+    history = response.json()
+    assert [item["attempt"] for item in history] == [1, 2, 3, 4]
+    assert history[0]["error_message"] == "upload timed out"
+
+    response = client.get("/api/attempts/latency", params={"platform": "vk"})
+    assert response.status_code == 200
+    stats = response.json()["platforms"]["vk"]
+    assert stats["failed"] >= 4
+    assert stats["errors"]["TimeoutError"] >= 4
+    assert stats["stages"]["download"]["p95"] >= stats["stages"]["download"]["p50"]
+
+
+def test_manual_retry_allows_automatic_retries(vk_job):
+    """После ручного повтора исчерпанной задачи работают автоматические retry"""
+    headers = {"X-Service-Token": "test_service_token"}
+    db = SessionLocal()
+    db.query(PublishJob).filter_by(submission_id=vk_job).update({"status": "FAILED", "retry_count": 3})
+    db.commit()
+
+    with patch('app.main.publish_job_event'):
+        # Автоматический retry еще в очереди — ручной повтор запрещен
+        assert client.post(f"/retry_failed/{vk_job}", headers=headers).status_code == 409
+
+        db.query(PublishJob).filter_by(submission_id=vk_job).update({"retry_count": 4})
+        db.commit()
+        db.close()
+        response = client.post(f"/retry_failed/{vk_job}", headers=headers)
+    assert response.status_code == 200
+
+    published = {'platform_job_id': '1_2', 'public_url': 'https://vk.com/video1_2', 'status': 'uploaded'}
+    with patch('workers.tasks_publish.minio_client') as mock_minio, \
+            patch('workers.tasks_publish.publish_to_vk', side_effect=[TimeoutError("upload timed out"), published]), \
+            patch('workers.tasks_publish.publish_job_event'):
+        mock_minio.fget_object.side_effect = download
+        result = deliver_outbox(vk_job).get()
+
+    assert result['status'] == 'COMPLETED'
+    assert [item.outcome for item in load_attempts(vk_job)] == ["FAILED", "COMPLETED"]
+
+
+def test_upload_stops_when_lease_is_lost(vk_job):
+    """Задачу забрал reaper: прогресс не сохраняется, загрузка и retry останавливаются"""
+    def fake_publish(on_upload_state, **kwargs):
+        on_upload_state({'upload_url': 'https://upload.vk.com/1', 'acked': []})
+        # reaper вернул задачу в очередь
+        db = SessionLocal()
+        db.query(PublishJob).filter_by(submission_id=vk_job).update(
+            {"status": "FAILED", "lease_owner": None, "retry_count": 1}
+        )
+        db.commit()
+        db.close()
+        on_upload_state({'upload_url': 'https://upload.vk.com/1', 'acked': [[0, 999]]})
+        raise AssertionError("upload continued after the lease was lost")
+
+    with patch('workers.tasks_publish.minio_client') as mock_minio, \
+            patch('workers.tasks_publish.publish_to_vk', side_effect=fake_publish), \
+            patch('workers.tasks_publish.publish_job_event'):
+        mock_minio.fget_object.side_effect = download
+        result = publish_submission.apply(args=[vk_job]).get()
+
+    assert result['status'] == 'LEASE_LOST'
+
+    db = SessionLocal()
+    job = db.query(PublishJob).filter_by(submission_id=vk_job).one()
+    assert job.upload_state == {'upload_url': 'https://upload.vk.com/1', 'acked': []}
+    assert job.retry_count == 1
+    assert outbox_messages(db, vk_job) == []
+    db.close()
+
+
+def test_circuit_parking_is_capped(vk_job):
+    """Открытая цепь откладывает задачу не больше CIRCUIT_MAX_PARKS раз"""
+    from unittest.mock import MagicMock
+    from workers.tasks_publish import CIRCUIT_MAX_PARKS
+
+    breaker = MagicMock(**{'allow.return_value': False, 'retry_after.return_value': 10})
+    published = {'platform_job_id': '1_2', 'public_url': 'https://vk.com/video1_2', 'status': 'uploaded'}
+
+    with patch('workers.tasks_publish.get_circuit_breaker', return_value=breaker), \
+            patch('workers.tasks_publish.minio_client') as mock_minio, \
+            patch('workers.tasks_publish.publish_to_vk', return_value=published), \
+            patch('workers.tasks_publish.publish_job_event'):
+        mock_minio.fget_object.side_effect = download
+
+        result = publish_submission.apply(args=[vk_job], headers={'parked': 1}).get()
+        assert result['status'] == 'PARKED'
+
+        # Отложенная доставка — через outbox
+        db = SessionLocal()
+        [message] = outbox_messages(db, vk_job)
+        assert message.options['headers'] == {'parked': 2}
+        assert message.options['countdown'] > 10
+        db.close()
+
+        # Лимит исчерпан: попытка выполняется, несмотря на открытую цепь
+        result = publish_submission.apply(args=[vk_job], headers={'parked': CIRCUIT_MAX_PARKS}).get()
+        assert result['status'] == 'COMPLETED'
+
+    db = SessionLocal()
+    assert len(outbox_messages(db, vk_job)) == 1
+    db.close()
+
+
+def test_attempts_of_unknown_submission():
+    """Неизвестная заявка — 404"""
+    with patch('app.main.settings') as mock_settings, \
+            patch('app.main.get_cached_status', return_value=None):
+        mock_settings.SERVICE_TOKEN = "test_service_token"
+        response = client.get(
+            f"/status/{uuid.uuid4()}/attempts",
+            headers={"X-Service-Token": "test_service_token"}
+        )
+
+    assert response.status_code == 404
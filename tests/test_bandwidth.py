@@ -0,0 +1,69 @@
+"""Тесты распределения исходящей полосы"""
+import io
+import fakeredis
+import pytest
+
+from workers.bandwidth import BandwidthManager, allocate, parse_rates
+
+
+def test_allocate_weighted_share():
+    """Полоса делится пропорционально весам"""
+    rates = allocate(
+        {'yt': ('youtube', 1.0), 'tt': ('tiktok', 3.0)},
+        total_rate=4000
+    )
+
+    assert rates == {'yt': pytest.approx(1000), 'tt': pytest.approx(3000)}
+
+
+def test_allocate_redistributes_platform_cap():
+    """Остаток полосы платформы с лимитом уходит остальным"""
+    rates = allocate(
+        {'yt1': ('youtube', 1.0), 'yt2': ('youtube', 1.0), 'vk': ('vk', 2.0)},
+        total_rate=10000,
+        platform_caps={'vk': 1000}
+    )
+
+    assert rates['vk'] == pytest.approx(1000)
+    assert rates['yt1'] == pytest.approx(4500)
+    assert rates['yt2'] == pytest.approx(4500)
+
+
+def test_allocate_unlimited_respects_caps():
+    """Без общего лимита действуют только лимиты платформ"""
+    rates = allocate({'a': ('youtube', 1.0), 'b': ('vk', 1.0)}, platform_caps={'vk': 500})
+
+    assert rates['a'] == float('inf')
+    assert rates['b'] == pytest.approx(500)
+
+
+def test_parse_rates():
+    assert parse_rates("youtube=5000000, vk=2e6") == {'youtube': 5000000.0, 'vk': 2000000.0}
+    assert parse_rates("") == {}
+
+    for value in ("vk=0", "tiktok=3,vk=-1"):
+        with pytest.raises(Exception, match="positive"):
+            parse_rates(value)
+
+
+def test_manager_shares_node_registry():
+    """Загрузки узла видят друг друга через Redis и публикуют скорость"""
+    manager = BandwidthManager(
+        fakeredis.FakeRedis(decode_responses=True),
+        node="worker-1",
+        total_rate=3000,
+        weights={'tiktok': 2.0}
+    )
+
+    with manager.upload("job-yt", "youtube") as youtube:
+        with manager.upload("job-tt", "tiktok") as tiktok:
+            assert tiktok.allocated == pytest.approx(2000)
+
+            stream = youtube.wrap(io.BytesIO(b"x" * 10))
+            assert len(stream) == 10
+            assert stream.read() == b"x" * 10
+            assert youtube.bytes_sent == 10
+
+            assert set(manager.redis.hkeys("bandwidth:worker-1")) == {"job-yt", "job-tt"}
+
+    assert manager.redis.hkeys("bandwidth:worker-1") == []
@@ -0,0 +1,60 @@
+"""Тесты circuit breaker платформ"""
+import fakeredis
+import pytest
+
+from workers.circuit_breaker import CircuitBreaker, CIRCUIT_FAILURE_THRESHOLD
+
+
+@pytest.fixture
+def breaker():
+    """Breaker поверх in-memory Redis"""
+    return CircuitBreaker(fakeredis.FakeRedis(decode_responses=True), "vk", "account")
+
+
+def test_opens_after_threshold(breaker):
+    """Цепь открывается после порога неудач подряд"""
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        breaker.record("video.save", 1.0, healthy=False)
+    assert breaker.allow()
+
+    breaker.record("video.save", 1.0, healthy=False)
+    assert not breaker.allow()
+    assert breaker.retry_after() > 0
+
+
+def test_success_resets_failures(breaker):
+    """Успешный вызов сбрасывает счетчик неудач"""
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.allow()
+
+
+def test_half_open_allows_single_probe(breaker):
+    """После паузы пропускается один пробный вызов"""
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure()
+
+    # Истекла пауза открытой цепи
+    breaker.redis.delete(breaker.open_key)
+
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens(breaker):
+    """Неудачная проба снова открывает цепь"""
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure()
+    breaker.redis.delete(breaker.open_key)
+
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert not breaker.allow()
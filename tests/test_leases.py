@@ -0,0 +1,82 @@
+"""Тесты аренды задач и возврата задач погибших воркеров"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.database import SessionLocal, PublishJob, OutboxMessage
+from workers.leases import JobLease
+from workers.tasks_publish import reap_expired_leases
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def leased_job(make_job):
+    """Фабрика задач PROCESSING с арендой воркера"""
+    def factory(lease_expires_at, retry_count=0, lease_owner="worker-1:1:abc"):
+        return make_job(
+            status="PROCESSING",
+            retry_count=retry_count,
+            lease_owner=lease_owner,
+            lease_expires_at=lease_expires_at
+        )
+
+    return factory
+
+
+def outbox_messages(db, submission_ids):
+    """Сообщения outbox для заявок"""
+    return [message for message in db.query(OutboxMessage).all() if message.args[0] in submission_ids]
+
+
+def test_reaper_requeues_expired_leases(db, leased_job):
+    """Истекшая аренда: попытка считается неудачной, retry уходит в outbox"""
+    now = datetime.utcnow()
+    jobs = {
+        'expired': leased_job(now - timedelta(seconds=10)),
+        'live': leased_job(now + timedelta(seconds=60)),
+        'exhausted': leased_job(now - timedelta(seconds=10), retry_count=3),
+    }
+    submission_ids = {name: job.submission_id for name, job in jobs.items()}
+
+    with patch('workers.tasks_publish.publish_job_event'):
+        result = reap_expired_leases.apply().get()
+
+    assert result['reaped'] == 2
+
+    db.expire_all()
+    expired = db.query(PublishJob).filter_by(submission_id=submission_ids['expired']).one()
+    assert expired.status == "FAILED"
+    assert expired.retry_count == 1
+    assert expired.lease_owner is None
+
+    live = db.query(PublishJob).filter_by(submission_id=submission_ids['live']).one()
+    assert live.status == "PROCESSING"
+
+    exhausted = db.query(PublishJob).filter_by(submission_id=submission_ids['exhausted']).one()
+    assert exhausted.status == "FAILED"
+    assert exhausted.retry_count == 4
+
+    [message] = outbox_messages(db, list(submission_ids.values()))
+    assert message.args == [submission_ids['expired']]
+    assert message.options == {"retries": 1}
+
+
+def test_lease_renewal_only_by_owner(db, leased_job):
+    """Продлить аренду может только ее владелец"""
+    job = leased_job(datetime.utcnow() + timedelta(seconds=5))
+    version, updated_at = job.version, job.updated_at
+
+    assert JobLease(SessionLocal, job.submission_id, "worker-2:2:def").renew() is False
+    assert JobLease(SessionLocal, job.submission_id, job.lease_owner).renew() is True
+
+    db.expire_all()
+    renewed = db.query(PublishJob).filter_by(submission_id=job.submission_id).one()
+    assert renewed.lease_expires_at > datetime.utcnow() + timedelta(seconds=60)
+    assert renewed.version == version
+    assert renewed.updated_at == updated_at
@@ -0,0 +1,50 @@
+"""Тесты метрик Prometheus"""
+import time
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import QUEUE_WAIT_SECONDS
+from workers.metrics import add_enqueued_at, observe_queue_wait
+
+client = TestClient(app)
+
+
+def test_metrics_endpoint():
+    """/metrics отдает метрики API и воркера в формате Prometheus"""
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "fanout_upload_phase_seconds" in response.text
+    assert "fanout_publish_duration_seconds" in response.text
+
+
+def _wait_sum(task_name: str) -> float:
+    return QUEUE_WAIT_SECONDS.labels(task=task_name)._sum.get()
+
+
+def test_queue_wait_measured_from_enqueue():
+    """Ожидание считается от отметки enqueued_at"""
+    headers = {}
+    add_enqueued_at(headers=headers)
+    headers['enqueued_at'] -= 5
+
+    task = SimpleNamespace(name='test.queue_wait', request=SimpleNamespace(enqueued_at=headers['enqueued_at'], headers=None, eta=None))
+    observe_queue_wait(task=task)
+
+    assert _wait_sum('test.queue_wait') >= 5
+
+
+def test_queue_wait_counts_from_eta():
+    """Для отложенной задачи (countdown) задержка до ETA не считается ожиданием"""
+    eta = datetime.now().astimezone() - timedelta(seconds=1)
+    task = SimpleNamespace(
+        name='test.queue_wait_eta',
+        request=SimpleNamespace(enqueued_at=time.time() - 600, headers=None, eta=eta.isoformat())
+    )
+    observe_queue_wait(task=task)
+
+    assert 1 <= _wait_sum('test.queue_wait_eta') < 60
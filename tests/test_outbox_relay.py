@@ -0,0 +1,55 @@
+"""Тесты relay transactional outbox"""
+import uuid
+import pytest
+from unittest.mock import patch, MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, OutboxMessage, enqueue_task
+from workers.outbox_relay import relay_batch
+
+
+@pytest.fixture
+def db():
+    """
+    Сессия отдельной пустой БД
+
+    relay_batch отправляет все неотправленные сообщения: в общей БД тест
+    отметил бы отправленными чужие задачи, которые mock не отправил.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_relay_sends_and_marks_messages(db):
+    """Сообщения отправляются в брокер и больше не выбираются"""
+    submission_ids = [str(uuid.uuid4()) for _ in range(3)]
+    for submission_id in submission_ids:
+        enqueue_task(db, "workers.tasks_publish.publish_submission", submission_id)
+    db.commit()
+
+    with patch('workers.outbox_relay.celery_app.send_task') as mock_send:
+        assert relay_batch(db) == 3
+        assert relay_batch(db) == 0
+
+    assert [call.kwargs['args'] for call in mock_send.call_args_list] == [[sid] for sid in submission_ids]
+    assert all(message.sent_at for message in db.query(OutboxMessage).all())
+
+
+def test_relay_keeps_unsent_on_broker_error(db):
+    """При ошибке брокера неотправленные сообщения остаются в outbox"""
+    for _ in range(2):
+        enqueue_task(db, "workers.tasks_publish.publish_submission", str(uuid.uuid4()))
+    db.commit()
+
+    send = MagicMock(side_effect=[None, ConnectionError("broker down")])
+    with patch('workers.outbox_relay.celery_app.send_task', send):
+        assert relay_batch(db) == 1
+
+    unsent = db.query(OutboxMessage).filter(OutboxMessage.sent_at.is_(None)).count()
+    assert unsent == 1
@@ -0,0 +1,62 @@
+"""Тесты прогресса загрузки на платформу"""
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.progress import progress_payload, store_progress
+from workers.progress import ProgressReporter
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def processing_job(make_job):
+    """Задача VK в статусе PROCESSING"""
+    return make_job(status="PROCESSING").submission_id
+
+
+def test_reporter_throttles_updates():
+    """Отчеты прорежены по времени и шагу; завершение отправляется всегда"""
+    reporter = ProgressReporter("sub-1")
+    clock = [100.0]
+
+    with patch('workers.progress.store_progress') as mock_store, \
+            patch('workers.progress.time.monotonic', side_effect=lambda: clock[0]):
+        reporter(10, 1000)      # первый отчет
+        reporter(500, 1000)     # слишком рано
+        clock[0] += 5
+        reporter(505, 1000)     # прошло время, прогресс вырос
+        clock[0] += 5
+        reporter(506, 1000)     # шаг меньше PROGRESS_MIN_STEP
+        reporter(1000, 1000)    # завершение
+        reporter(1000, 1000)    # повтор завершения
+
+    sent = [call.args[2]["bytes_sent"] for call in mock_store.call_args_list]
+    assert sent == [10, 505, 1000]
+    assert reporter.reports == 3
+
+
+def test_status_includes_progress(processing_job, fake_redis):
+    """Статус PROCESSING отдается с прогрессом; ETag меняется вместе с ним"""
+    url = f"/api/status/{processing_job}"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.json()["progress"] is None
+    etag = response.headers["etag"]
+
+    store_progress(processing_job, None, progress_payload(250, 1000))
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["progress"]["bytes_sent"] == 250
+    assert response.json()["progress"]["percent"] == 25.0
+    assert response.headers["etag"] != etag
+
+    response = client.post(
+        "/status/batch",
+        json={"submission_ids": [processing_job]},
+        headers={"X-Service-Token": "test_service_token"}
+    )
+    assert response.json()[processing_job]["progress"]["total_bytes"] == 1000
@@ -0,0 +1,62 @@
+"""Тесты переноса задач публикации в архив"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import fakeredis
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database import SessionLocal, PublishJob, PublishJobArchive
+from workers.tasks_retention import archive_batch
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def old_job(make_job):
+    """Фабрика задач, созданных age_days назад"""
+    def factory(status, platform_status=None, age_days=120, retry_count=0):
+        created = datetime.utcnow() - timedelta(days=age_days)
+        return make_job(
+            status=status,
+            platform_status=platform_status,
+            retry_count=retry_count,
+            created_at=created,
+            updated_at=created
+        )
+
+    return factory
+
+
+def test_archive_moves_only_old_terminal_jobs(old_job):
+    """В архив уходят старые завершенные задачи; статус остается доступен"""
+    jobs = {
+        'completed': old_job("COMPLETED", "ready"),
+        'failed': old_job("FAILED", retry_count=4),
+        'awaiting_retry': old_job("FAILED", retry_count=2),
+        'processing_on_platform': old_job("COMPLETED", "processing"),
+        'pending': old_job("PENDING"),
+        'recent': old_job("COMPLETED", "ready", age_days=1),
+    }
+    ids = [job.id for job in jobs.values()]
+    submission_id = jobs['completed'].submission_id
+
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=90)
+        while archive_batch(db, cutoff):
+            pass
+
+        archived = {row.id for row in db.query(PublishJobArchive.id).filter(PublishJobArchive.id.in_(ids))}
+        remaining = {row.id for row in db.query(PublishJob.id).filter(PublishJob.id.in_(ids))}
+
+        assert archived == {jobs['completed'].id, jobs['failed'].id}
+        assert remaining == set(ids) - archived
+
+        with patch('app.cache.get_redis', return_value=fakeredis.FakeRedis(decode_responses=True)):
+            response = client.get(f"/api/status/{submission_id}")
+        assert response.status_code == 200
+        assert response.json()["status"] == "COMPLETED"
+    finally:
+        db.close()
@@ -0,0 +1,71 @@
+"""Тесты почасовой статистики публикаций"""
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app, bucket_percentile
+from app.database import SessionLocal, PublishStatsHourly, PublishStatsEvent, init_db, record_stats
+from workers.tasks_stats import roll_up_publish_stats
+
+client = TestClient(app)
+
+
+def test_stats_accumulate_per_hour():
+    """Счетчики суммируются по часам; /api/stats считает итоги и перцентили"""
+    init_db()
+    platform = f"test-{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+
+    try:
+        record_stats(db, platform, submitted=1, at=datetime.utcnow() - timedelta(hours=1))
+        for _ in range(3):
+            record_stats(db, platform, submitted=1)
+        record_stats(db, platform, completed=1, duration=30)
+        record_stats(db, platform, completed=1, duration=200)
+        record_stats(db, platform, completed=1, duration=4000)
+        record_stats(db, platform, retried=1)
+        record_stats(db, platform, failed=1)
+        db.commit()
+
+        # Запись статистики не трогает строку часа: ее обновляет только свертка
+        assert db.query(PublishStatsHourly).filter_by(platform=platform).count() == 0
+        assert roll_up_publish_stats.apply().get()['rolled_up'] >= 9
+        assert db.query(PublishStatsEvent).filter_by(platform=platform).count() == 0
+        assert db.query(PublishStatsHourly).filter_by(platform=platform).count() == 2
+
+        response = client.get("/api/stats", params={"platform": platform, "hours": 2})
+        assert response.status_code == 200
+        stats = response.json()["platforms"][platform]
+
+        assert stats["submitted"] == 4
+        assert stats["completed"] == 3
+        assert stats["failed"] == 1
+        assert stats["retried"] == 1
+        assert stats["success_rate"] == 0.75
+        assert stats["duration"]["avg"] == round(4230 / 3, 1)
+        assert 3600 <= stats["duration"]["p95"] <= 7200
+        assert [item["submitted"] for item in stats["hourly"]] == [1, 3]
+
+        # За последний час — только текущая строка
+        response = client.get("/api/stats", params={"platform": platform, "hours": 1})
+        assert response.json()["platforms"][platform]["submitted"] == 3
+
+        # Следующая свертка добавляет приращения к существующей строке часа
+        record_stats(db, platform, submitted=1)
+        db.commit()
+        roll_up_publish_stats.apply().get()
+        response = client.get("/api/stats", params={"platform": platform, "hours": 1})
+        assert response.json()["platforms"][platform]["submitted"] == 4
+    finally:
+        db.rollback()
+        db.query(PublishStatsHourly).filter_by(platform=platform).delete()
+        db.commit()
+        db.close()
+
+
+def test_bucket_percentile():
+    """Интерполяция внутри корзины гистограммы"""
+    assert bucket_percentile([0] * 7, 0.5) is None
+    assert bucket_percentile([10, 0, 0, 0, 0, 0, 0], 0.5) == 30.0
+    assert bucket_percentile([0, 0, 0, 0, 0, 0, 4], 0.95) == 7200
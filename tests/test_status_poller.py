@@ -0,0 +1,77 @@
+"""Тесты пакетного опроса статусов платформ"""
+from unittest.mock import MagicMock, patch
+
+from platforms.tiktok import TikTokPublisher
+from platforms.youtube import YouTubePublisher
+from workers.tasks_status import apply_platform_status
+
+
+def test_youtube_status_is_batched_by_50():
+    """videos.list вызывается одним запросом на каждые 50 id"""
+    video_ids = [f"vid{i}" for i in range(120)]
+
+    youtube = MagicMock()
+    youtube.videos.return_value.list.return_value.execute.side_effect = lambda: {
+        'items': [{'id': 'vid0', 'status': {'uploadStatus': 'processed'}, 'processingDetails': {}}]
+    }
+
+    publisher = YouTubePublisher("id", "secret", "refresh")
+    publisher.youtube = youtube
+
+    statuses = publisher.get_videos_status(video_ids)
+
+    assert youtube.videos.return_value.list.call_count == 3
+    batch_sizes = [
+        len(call.kwargs['id'].split(','))
+        for call in youtube.videos.return_value.list.call_args_list
+    ]
+    assert batch_sizes == [50, 50, 20]
+    assert statuses['vid0']['status'] == 'ready'
+    assert statuses['vid119'] == {'status': 'not_found'}
+
+
+def test_apply_platform_status_updates_url(make_job):
+    """Готовое видео получает реальную ссылку вместо заглушки"""
+    job = make_job(
+        platform="tiktok",
+        status="COMPLETED",
+        platform_status="processing",
+        public_url="https://www.tiktok.com/@me/video/publish123"
+    )
+
+    changed = apply_platform_status(job, {
+        'status': 'ready',
+        'public_url': 'https://www.tiktok.com/@creator/video/7300000000000000000'
+    })
+
+    assert changed
+    assert job.platform_status == 'ready'
+    assert job.public_url == 'https://www.tiktok.com/@creator/video/7300000000000000000'
+
+
+def test_apply_platform_status_ignores_transient_errors(make_job):
+    """Ошибка опроса не меняет задачу"""
+    job = make_job(status="COMPLETED", platform_status="uploaded")
+
+    assert not apply_platform_status(job, {'status': 'error', 'error': 'timeout'})
+    assert job.platform_status == 'uploaded'
+
+
+def test_tiktok_video_url_uses_creator_username():
+    """Ссылка TikTok строится по username автора; без него — None, а не битый URL"""
+    publisher = TikTokPublisher("key", "secret", "token")
+    status = {'status': 'PUBLISH_COMPLETE', 'publicaly_available_post_id': ['7300000000000000000']}
+
+    with patch.object(publisher, 'get_video_status', return_value=status), \
+            patch.object(publisher, 'get_creator_info', return_value={'username': 'creator'}) as mock_info:
+        statuses = publisher.get_videos_status(['p1', 'p2'])
+
+    assert statuses['p1']['public_url'] == 'https://www.tiktok.com/@creator/video/7300000000000000000'
+    assert mock_info.call_count == 1
+
+    publisher = TikTokPublisher("key", "secret", "token")
+    with patch.object(publisher, 'get_video_status', return_value=status), \
+            patch.object(publisher, 'get_creator_info', return_value={'error': 'scope missing'}):
+        statuses = publisher.get_videos_status(['p1'])
+
+    assert statuses['p1'] == {'status': 'ready', 'public_url': None, 'error': None}
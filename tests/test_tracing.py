@@ -0,0 +1,106 @@
+"""Тесты сквозной трассировки: HTTP-запрос → outbox → задача Celery"""
+import json
+import uuid
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+from fastapi.testclient import TestClient
+from opentelemetry import trace
+
+from app.main import app
+from app.config import get_settings
+from app.database import SessionLocal, PublishJob, OutboxMessage, init_db
+from app.tracing import setup_tracing
+from platforms.sessions import get_session
+from workers.tasks_publish import publish_submission
+
+client = TestClient(app)
+settings = get_settings()
+
+TRACE_ID = uuid.uuid4().hex
+TRACEPARENT = f"00-{TRACE_ID}-{uuid.uuid4().hex[:16]}-01"
+
+
+@pytest.fixture(scope="module")
+def trace_file(tmp_path_factory):
+    """Экспорт span'ов в файл (глобальный provider ставится один раз на процесс)"""
+    path = tmp_path_factory.mktemp("traces") / "traces.jsonl"
+    trace_settings = MagicMock(TRACE_EXPORTER="file", TRACE_FILE=str(path), TRACE_SAMPLE_RATIO=1.0)
+
+    with patch('app.tracing.get_settings', return_value=trace_settings):
+        if not setup_tracing("fanout-test"):
+            pytest.skip("Tracer provider already configured in this process")
+
+    return path
+
+
+def read_spans(path):
+    trace.get_tracer_provider().force_flush()
+    return [json.loads(line) for line in path.read_text().splitlines() if line]
+
+
+def download(bucket, key, path):
+    with open(path, 'wb') as f:
+        f.write(b'x' * 1000)
+
+
+def test_trace_spans_request_outbox_and_task(trace_file, fake_redis):
+    """Запрос, задача и ее этапы попадают в одну трассу"""
+    init_db()
+    payload = {
+        "video_hash": uuid.uuid4().hex,
+        "s3_key": "videos/test.mp4",
+        "file_size": 1000,
+        "platform": "vk",
+        "title": "Test"
+    }
+
+    response = client.post(
+        "/ingest",
+        json=payload,
+        headers={"X-Service-Token": settings.SERVICE_TOKEN, "traceparent": TRACEPARENT}
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Trace-Id"] == TRACE_ID
+    submission_id = response.json()["submission_id"]
+
+    db = SessionLocal()
+    try:
+        [message] = [item for item in db.query(OutboxMessage).all() if item.args == [submission_id]]
+        headers = message.options["headers"]
+        assert TRACE_ID in headers["traceparent"]
+
+        with patch('workers.tasks_publish.minio_client') as mock_minio, \
+                patch('workers.tasks_publish.publish_to_vk', return_value={
+                    'platform_job_id': '1_2', 'public_url': 'https://vk.com/video1_2', 'status': 'uploaded'
+                }), \
+                patch('workers.tasks_publish.publish_job_event'):
+            mock_minio.fget_object.side_effect = download
+            result = publish_submission.apply(args=[submission_id], headers=headers).get()
+        assert result['status'] == 'COMPLETED'
+    finally:
+        db.query(OutboxMessage).filter(OutboxMessage.id == message.id).delete()
+        db.query(PublishJob).filter_by(submission_id=submission_id).delete()
+        db.commit()
+        db.close()
+
+    spans = [span for span in read_spans(trace_file) if span["context"]["trace_id"] == f"0x{TRACE_ID}"]
+    names = {span["name"] for span in spans}
+
+    assert "POST /ingest" in names
+    assert "celery workers.tasks_publish.publish_submission" in names
+    assert {"stage download", "stage publish", "minio fget_object"} <= names
+    assert any(name.startswith("db ") for name in names)
+
+
+def test_platform_http_span_hides_query(trace_file):
+    """Span запроса к API платформы: хост и путь без query с токеном"""
+    url = "https://api.vk.com/method/video.save?access_token=secret"
+    request = requests.Request("POST", url).prepare()
+
+    with patch('requests.adapters.HTTPAdapter.send', return_value=MagicMock(status_code=200)):
+        get_session('vk').get_adapter(url).send(request)
+
+    [span] = [span for span in read_spans(trace_file) if span["name"].startswith("POST api.vk.com")]
+    assert span["name"] == "POST api.vk.com/method/video.save"
+    assert "secret" not in json.dumps(span)
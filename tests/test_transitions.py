@@ -0,0 +1,59 @@
+"""Тесты атомарных переходов статуса задачи"""
+import pytest
+from unittest.mock import patch
+
+from app.database import SessionLocal, PublishJob, transition_job
+
+
+@pytest.fixture
+def pending_job(make_job):
+    """Задача в статусе PENDING и сессия БД"""
+    submission_id = make_job().submission_id
+    db = SessionLocal()
+
+    yield db, submission_id
+
+    db.rollback()
+    db.close()
+
+
+def test_transition_applies_once(pending_job):
+    """Переход выполняется один раз и увеличивает версию"""
+    db, submission_id = pending_job
+
+    claimed = transition_job(db, submission_id, ("PENDING",), "PROCESSING")
+    db.commit()
+    assert claimed.status == "PROCESSING"
+    assert claimed.version == 2
+
+    assert transition_job(db, submission_id, ("PENDING",), "PROCESSING") is None
+
+
+def test_duplicate_delivery_is_skipped(pending_job):
+    """Повторная доставка задачи в работе завершается без загрузки"""
+    from workers.tasks_publish import publish_submission
+
+    db, submission_id = pending_job
+    transition_job(db, submission_id, ("PENDING",), "PROCESSING")
+    db.commit()
+
+    with patch('workers.tasks_publish.minio_client') as mock_minio:
+        result = publish_submission.apply(args=[submission_id]).get()
+        mock_minio.fget_object.assert_not_called()
+
+    assert result['status'] == 'SKIPPED'
+    assert result['current_status'] == 'PROCESSING'
+
+
+def test_transition_refreshes_loaded_job(pending_job):
+    """Загруженный в сессию объект получает новые значения до коммита"""
+    db, submission_id = pending_job
+    job = db.query(PublishJob).filter_by(submission_id=submission_id).one()
+
+    failed = transition_job(
+        db, submission_id, ("PENDING",), "FAILED",
+        retry_count=PublishJob.retry_count + 1
+    )
+
+    assert failed is job
+    assert (job.status, job.retry_count, job.version) == ("FAILED", 1, 2)
@@ -0,0 +1,121 @@
+"""Тесты чанковой загрузки VK"""
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+
+from platforms.vk import VKPublisher, _merge_ranges, _parse_ranges
+
+
+FILE_SIZE = 25
+CHUNK_SIZE = 10
+
+
+@pytest.fixture
+def video_file(tmp_path):
+    """Временный видеофайл из 25 байт (3 чанка по 10 байт)"""
+    path = tmp_path / "video.mp4"
+    path.write_bytes(bytes(range(FILE_SIZE)))
+    return str(path)
+
+
+def make_chunk_response(headers):
+    """Ответ сервера загрузки VK на чанк"""
+    start, end = headers['Content-Range'].split(' ')[1].split('/')[0].split('-')
+    response = MagicMock()
+    if int(end) == FILE_SIZE - 1:
+        response.status_code = 200
+        response.json.return_value = {'video_hash': 'abc', 'size': FILE_SIZE}
+    else:
+        response.status_code = 201
+        response.text = f"0-{end}/{FILE_SIZE}"
+    return response
+
+
+def test_range_helpers():
+    """Тест разбора и объединения диапазонов"""
+    assert _parse_ranges("0-9,20-29/100") == [[0, 9], [20, 29]]
+    assert _merge_ranges([[10, 19], [0, 9], [30, 39]]) == [[0, 19], [30, 39]]
+
+
+@patch('platforms.vk.time.sleep')
+def test_chunked_upload_retries_only_failed_chunk(mock_sleep, video_file):
+    """Повторно отправляется только упавший чанк"""
+    sent_ranges = []
+    failed = []
+
+    def fake_post(url, data=None, headers=None, timeout=None, files=None):
+        sent_ranges.append(headers['Content-Range'])
+        if headers['Content-Range'].startswith('bytes 10-') and not failed:
+            failed.append(True)
+            raise requests.ConnectionError("connection reset")
+        return make_chunk_response(headers)
+
+    states = []
+
+    publisher = VKPublisher(access_token="token")
+    publisher.upload_session = MagicMock()
+    publisher.upload_session.post.side_effect = fake_post
+    with patch.object(publisher, '_api_request', return_value={
+        'upload_url': 'https://upload.vk.com/x', 'video_id': 1, 'owner_id': -2
+    }):
+        result = publisher.publish_video(
+            video_path=video_file,
+            title="Test",
+            chunked=True,
+            chunk_size=CHUNK_SIZE,
+            on_upload_state=lambda state: states.append(state and dict(state))
+        )
+
+    assert result['platform_job_id'] == "-2_1"
+    assert sent_ranges == [
+        f"bytes 0-9/{FILE_SIZE}",
+        f"bytes 10-19/{FILE_SIZE}",
+        f"bytes 10-19/{FILE_SIZE}",
+        f"bytes 20-24/{FILE_SIZE}",
+    ]
+    assert states[-1]['acked'] == [[0, FILE_SIZE - 1]]
+
+
+def test_chunked_upload_resumes_from_saved_state(video_file):
+    """Возобновление пропускает video.save и подтвержденные чанки"""
+    mock_post = MagicMock(side_effect=lambda url, data=None, headers=None, timeout=None: make_chunk_response(headers))
+
+    upload_state = {
+        'upload_url': 'https://upload.vk.com/x',
+        'video_id': 1,
+        'owner_id': -2,
+        'session_id': 'session',
+        'file_size': FILE_SIZE,
+        'chunk_size': CHUNK_SIZE,
+        'acked': [[0, 19]]
+    }
+
+    progress = []
+
+    publisher = VKPublisher(access_token="token")
+    publisher.upload_session = MagicMock(post=mock_post)
+    with patch.object(publisher, '_api_request') as mock_api:
+        publisher.publish_video(
+            video_path=video_file,
+            title="Test",
+            chunked=True,
+            upload_state=upload_state,
+            on_progress=lambda sent, total: progress.append((sent, total))
+        )
+
+    mock_api.assert_not_called()
+    assert mock_post.call_count == 1
+    assert mock_post.call_args.kwargs['headers']['Content-Range'] == f"bytes 20-24/{FILE_SIZE}"
+    assert mock_post.call_args.kwargs['headers']['Session-ID'] == 'session'
+    # Прогресс считается по подтвержденным сервером диапазонам
+    assert progress == [(FILE_SIZE, FILE_SIZE)]
+
+
+def test_sessions_are_shared_per_process():
+    """Publisher'ы одного процесса используют общий пул соединений"""
+    first = VKPublisher(access_token="token1")
+    second = VKPublisher(access_token="token2")
+
+    assert first.session is second.session
+    assert first.upload_session is not first.session
+    assert first.session.get_adapter("https://api.vk.com").max_retries.total > 0
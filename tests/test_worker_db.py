@@ -0,0 +1,27 @@
+"""Тесты пула соединений воркера"""
+from types import SimpleNamespace
+
+from celery.concurrency.prefork import TaskPool as PreforkPool
+from celery.concurrency.thread import TaskPool as ThreadPool
+
+from app.database import SessionLocal, ReadSessionLocal, configure_pool, is_replica, settings
+from workers.db import size_db_pool
+
+
+def test_pool_sized_by_tasks_per_process():
+    """prefork: пул на одну задачу процесса; threads: на всю конкурентность"""
+    try:
+        size_db_pool(sender=SimpleNamespace(pool_cls=PreforkPool, concurrency=8))
+        assert SessionLocal.kw['bind'].pool.size() == 2
+
+        size_db_pool(sender=SimpleNamespace(pool_cls=ThreadPool, concurrency=8))
+        assert SessionLocal.kw['bind'].pool.size() == 16
+
+        db = SessionLocal()
+        try:
+            assert ReadSessionLocal.kw['bind'] is SessionLocal.kw['bind']
+            assert not is_replica(db)
+        finally:
+            db.close()
+    finally:
+        configure_pool(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
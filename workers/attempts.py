@@ -0,0 +1,85 @@
+"""Учет попыток публикации: длительности этапов для publish_attempts"""
+import time
+import socket
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.database import PublishAttempt
+from app.tracing import tracer
+
+WORKER_HOST = socket.gethostname()
+
+
+class AttemptRecorder:
+    """
+    Замеры одной попытки публикации
+
+    Этапы и вызовы API накапливаются в памяти; строка PublishAttempt
+    создается один раз в конце попытки и сохраняется вместе с итоговым
+    статусом задачи, без отдельных запросов к БД по ходу работы.
+    """
+
+    def __init__(
+        self,
+        submission_id: str,
+        platform: str,
+        attempt: int,
+        task_id: Optional[str] = None,
+        queue_wait: Optional[float] = None
+    ):
+        """
+        Args:
+            submission_id: ID заявки
+            platform: Платформа
+            attempt: Номер попытки (с 1)
+            task_id: ID задачи Celery
+            queue_wait: Время ожидания в очереди, секунды
+        """
+        self.submission_id = submission_id
+        self.platform = platform
+        self.attempt = attempt
+        self.task_id = task_id
+        self.queue_wait = queue_wait
+
+        self.started_at = datetime.utcnow()
+        self.stages: Dict[str, float] = {}
+        self.api_seconds = 0.0
+        self.api_calls = 0
+        self.upload = None  # UploadLease загрузки (источник bytes_sent)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Замерить этап (время добавляется и при исключении); этап — span трассы"""
+        started = time.monotonic()
+        try:
+            with tracer.start_as_current_span(f"stage {name}", attributes={"platform": self.platform}):
+                yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.monotonic() - started
+
+    def record_api_call(self, name: str, elapsed: float, healthy: bool):
+        """Callback on_api_call для publisher'ов"""
+        self.api_calls += 1
+        self.api_seconds += elapsed
+
+    def finish(self, outcome: str, exc: Optional[BaseException] = None) -> PublishAttempt:
+        """Строка publish_attempts для завершившейся попытки"""
+        return PublishAttempt(
+            submission_id=self.submission_id,
+            platform=self.platform,
+            attempt=self.attempt,
+            task_id=self.task_id,
+            worker_host=WORKER_HOST,
+            outcome=outcome,
+            started_at=self.started_at,
+            finished_at=datetime.utcnow(),
+            queue_wait_seconds=self.queue_wait,
+            download_seconds=self.stages.get('download'),
+            publish_seconds=self.stages.get('publish'),
+            api_seconds=self.api_seconds,
+            api_calls=self.api_calls,
+            bytes_sent=self.upload.bytes_sent if self.upload else None,
+            error_class=type(exc).__name__ if exc else None,
+            error_message=str(exc) if exc else None
+        )
@@ -0,0 +1,266 @@
+"""Распределение исходящей полосы между загрузками на одном узле"""
+import json
+import time
+import socket
+import threading
+import redis
+import structlog
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from platforms.streams import MeteredStream
+
+logger = structlog.get_logger()
+
+UNLIMITED = float('inf')
+
+# Как часто загрузка пересчитывает свою долю полосы (секунды)
+REBALANCE_INTERVAL = 1.0
+
+# Загрузка без обновлений дольше этого срока считается завершенной
+# (с запасом: YouTube читает поток чанками по 10 MB)
+STALE_AFTER = 30.0
+
+
+def parse_rates(value: str) -> Dict[str, float]:
+    """
+    Разобрать строку вида "youtube=5000000,vk=2000000"
+
+    Значения (лимиты и веса) должны быть положительными: нулевой вес
+    платформы дал бы деление на ноль при распределении полосы.
+    """
+    rates = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, rate = item.split('=', 1)
+            rates[name.strip()] = float(rate)
+            if not rates[name.strip()] > 0:
+                raise Exception(f"Rate must be positive: {item.strip()}")
+    return rates
+
+
+def allocate(
+    uploads: Dict[str, Tuple[str, float]],
+    total_rate: float = UNLIMITED,
+    platform_caps: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
+    """
+    Взвешенное справедливое распределение полосы (water-filling)
+
+    Общая полоса делится между платформами пропорционально сумме весов их
+    загрузок; платформа, упершаяся в свой лимит, получает лимит, а остаток
+    перераспределяется между остальными. Внутри платформы полоса делится
+    пропорционально весам загрузок.
+
+    Args:
+        uploads: {upload_id: (platform, weight)}
+        total_rate: Общий лимит узла, байт/с
+        platform_caps: Лимиты платформ, байт/с
+
+    Returns:
+        {upload_id: байт/с}
+    """
+    platform_caps = platform_caps or {}
+
+    platform_weights: Dict[str, float] = {}
+    for platform, weight in uploads.values():
+        platform_weights[platform] = platform_weights.get(platform, 0) + weight
+
+    platform_rates: Dict[str, float] = {}
+    remaining = total_rate
+    active = dict(platform_weights)
+
+    while active:
+        share = remaining / sum(active.values())
+        capped = {
+            platform: platform_caps[platform]
+            for platform, weight in active.items()
+            if platform_caps.get(platform) and platform_caps[platform] <= weight * share
+        }
+
+        if not capped:
+            for platform, weight in active.items():
+                platform_rates[platform] = weight * share
+            break
+
+        for platform, cap in capped.items():
+            platform_rates[platform] = cap
+            remaining -= cap
+            del active[platform]
+
+    return {
+        upload_id: platform_rates[platform] * weight / platform_weights[platform]
+        for upload_id, (platform, weight) in uploads.items()
+    }
+
+
+class UploadLease:
+    """Доля полосы одной загрузки; притормаживает чтение потока"""
+
+    def __init__(self, manager: 'BandwidthManager', upload_id: str, platform: str):
+        self.manager = manager
+        self.upload_id = upload_id
+        self.platform = platform
+        self.weight = manager.weights.get(platform, 1.0)
+
+        self.started = time.monotonic()
+        self.bytes_sent = 0
+        self.rate = 0.0  # Измеренная скорость, байт/с
+        self.allocated = UNLIMITED
+
+        self._lock = threading.Lock()
+        self._window_start = self.started
+        self._window_bytes = 0
+        self._last_rebalance = 0.0
+
+    def wrap(self, fileobj: BinaryIO) -> MeteredStream:
+        """Обернуть поток загрузки (передается в publisher как wrap_stream)"""
+        return MeteredStream(fileobj, self.throttle)
+
+    def throttle(self, size: int):
+        """Учесть отправленные байты и подождать, если загрузка опережает свою долю"""
+        with self._lock:
+            now = time.monotonic()
+            self.bytes_sent += size
+            self._window_bytes += size
+
+            if now - self._last_rebalance >= REBALANCE_INTERVAL:
+                self._rebalance(now)
+
+            delay = 0.0
+            if self.allocated != UNLIMITED:
+                delay = self._window_start + self._window_bytes / self.allocated - now
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def _rebalance(self, now: float):
+        """Обновить скорость и получить новую долю полосы"""
+        elapsed = now - self._window_start
+        if elapsed > 0:
+            self.rate = self._window_bytes / elapsed
+
+        self.allocated = self.manager.rebalance(self)
+
+        # Новое окно: долг по скорости прошлого окна не переносим
+        self._window_start = now
+        self._window_bytes = 0
+        self._last_rebalance = now
+
+    def to_dict(self) -> dict:
+        return {
+            'platform': self.platform,
+            'weight': self.weight,
+            'bytes_sent': self.bytes_sent,
+            'rate': round(self.rate),
+            'allocated': None if self.allocated == UNLIMITED else round(self.allocated),
+            'updated': time.time()
+        }
+
+
+class BandwidthManager:
+    """
+    Менеджер исходящей полосы узла
+
+    Загрузки всех процессов воркера на хосте регистрируются в Redis-хеше
+    bandwidth:{node}; каждая раз в REBALANCE_INTERVAL публикует свою
+    скорость и пересчитывает долю через allocate(). Тот же хеш — источник
+    живой статистики скорости по загрузкам.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis],
+        node: Optional[str] = None,
+        total_rate: float = UNLIMITED,
+        platform_caps: Optional[Dict[str, float]] = None,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            redis_client: Клиент Redis (None — только локальное ограничение)
+            node: Имя узла (по умолчанию hostname)
+            total_rate: Общий лимит узла, байт/с
+            platform_caps: Лимиты платформ, байт/с
+            weights: Веса платформ при разделе полосы (> 0, по умолчанию 1)
+        """
+        self.redis = redis_client
+        self.node = node or socket.gethostname()
+        self.key = f"bandwidth:{self.node}"
+        self.total_rate = total_rate
+        self.platform_caps = platform_caps or {}
+        self.weights = weights or {}
+
+    @contextmanager
+    def upload(self, upload_id: str, platform: str):
+        """Зарегистрировать загрузку на время выполнения блока"""
+        lease = UploadLease(self, upload_id, platform)
+        lease._rebalance(time.monotonic())
+
+        try:
+            yield lease
+        finally:
+            self._unregister(lease)
+            logger.info(
+                "Upload bandwidth released",
+                upload_id=upload_id,
+                platform=platform,
+                bytes_sent=lease.bytes_sent,
+                avg_rate=round(lease.bytes_sent / max(time.monotonic() - lease.started, 1e-6))
+            )
+
+    def rebalance(self, lease: UploadLease) -> float:
+        """Опубликовать состояние загрузки и вычислить ее долю полосы"""
+        uploads = {lease.upload_id: (lease.platform, lease.weight)}
+
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.hset(self.key, lease.upload_id, json.dumps(lease.to_dict()))
+                pipe.expire(self.key, int(STALE_AFTER * 6))
+                pipe.hgetall(self.key)
+                entries = pipe.execute()[2]
+
+                now = time.time()
+                for upload_id, raw in entries.items():
+                    entry = json.loads(raw)
+                    if now - entry['updated'] > STALE_AFTER:
+                        self.redis.hdel(self.key, upload_id)
+                        continue
+                    uploads[upload_id] = (entry['platform'], entry['weight'])
+
+            except redis.RedisError as e:
+                logger.warning("Bandwidth registry unavailable", error=str(e))
+
+        return allocate(uploads, self.total_rate, self.platform_caps)[lease.upload_id]
+
+    def _unregister(self, lease: UploadLease):
+        if self.redis is None:
+            return
+        try:
+            self.redis.hdel(self.key, lease.upload_id)
+        except redis.RedisError as e:
+            logger.warning("Bandwidth registry unavailable", error=str(e))
+
+
+def get_node_throughput(redis_client: redis.Redis) -> Dict[str, Dict[str, dict]]:
+    """
+    Живая статистика загрузок по всем узлам
+
+    Returns:
+        {node: {upload_id: {platform, bytes_sent, rate, allocated, ...}}}
+    """
+    nodes = {}
+    now = time.time()
+
+    for key in redis_client.scan_iter(match="bandwidth:*"):
+        node = key.split(':', 1)[1]
+        uploads = {}
+        for upload_id, raw in redis_client.hgetall(key).items():
+            entry = json.loads(raw)
+            if now - entry['updated'] <= STALE_AFTER:
+                uploads[upload_id] = entry
+        if uploads:
+            nodes[node] = uploads
+
+    return nodes
@@ -10,7 +10,7 @@ celery_app = Celery(
     'fanout_publisher',
     broker=os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0'),
     backend=os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0'),
-    include=['workers.tasks_publish']
+    include=['workers.tasks_publish', 'workers.tasks_status', 'workers.tasks_retention', 'workers.tasks_stats']
 )
 
 # Конфигурация
@@ -29,8 +29,37 @@ celery_app.conf.update(
     worker_max_tasks_per_child=50,  # Перезапуск воркера после 50 задач
 )
 
+# Периодические задачи (celery beat)
+celery_app.conf.beat_schedule = {
+    'poll-platform-statuses': {
+        'task': 'workers.tasks_status.poll_platform_statuses',
+        'schedule': float(os.getenv('STATUS_POLL_INTERVAL', '60')),  # секунды
+    },
+    'reap-expired-leases': {
+        'task': 'workers.tasks_publish.reap_expired_leases',
+        'schedule': float(os.getenv('LEASE_REAPER_INTERVAL', '30')),  # секунды
+    },
+    'roll-up-publish-stats': {
+        'task': 'workers.tasks_stats.roll_up_publish_stats',
+        'schedule': float(os.getenv('STATS_ROLLUP_INTERVAL', '30')),  # секунды
+    },
+    'archive-publish-jobs': {
+        'task': 'workers.tasks_retention.archive_publish_jobs',
+        'schedule': float(os.getenv('ARCHIVE_INTERVAL', '3600')),  # секунды
+    },
+}
+
 # Настройки retry
 celery_app.conf.task_default_retry_delay = 60  # 1 минута между retry
 celery_app.conf.task_max_retries = 3
 
+# Сигналы метрик: отметка постановки в очередь нужна и в API, и в воркере
+import workers.metrics  # noqa: E402,F401
+
+# Пул соединений с БД по конкурентности воркера, отдельный в каждом процессе
+import workers.db  # noqa: E402,F401
+
+# Трассировка задач и передача контекста в заголовках
+import workers.tracing  # noqa: E402,F401
+
 
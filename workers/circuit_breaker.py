@@ -0,0 +1,135 @@
+"""Circuit breaker для API платформ с общим состоянием в Redis"""
+import os
+import redis
+import structlog
+
+logger = structlog.get_logger()
+
+# Сколько неудачных вызовов подряд (в пределах окна) открывают цепь
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_FAILURE_WINDOW = int(os.getenv('CIRCUIT_FAILURE_WINDOW', '120'))  # секунды
+
+# Сколько цепь остается открытой перед пробным запросом
+CIRCUIT_OPEN_SECONDS = int(os.getenv('CIRCUIT_OPEN_SECONDS', '60'))
+
+# Сколько ждем результата пробного запроса, прежде чем разрешить новый
+CIRCUIT_PROBE_TIMEOUT = int(os.getenv('CIRCUIT_PROBE_TIMEOUT', '300'))
+
+# Сколько держим признак half-open (очистка забытых ключей)
+CIRCUIT_STATE_TTL = 24 * 3600
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для пары (платформа, аккаунт)
+
+    Состояние хранится в Redis и общее для всех воркеров:
+        closed    — вызовы разрешены, неудачи считаются в окне
+        open      — вызовы запрещены до истечения ключа open
+        half-open — разрешен один пробный вызов; успех закрывает цепь,
+                    неудача снова открывает
+
+    При недоступности Redis breaker пропускает вызовы (fail-open).
+    """
+
+    def __init__(self, redis_client: redis.Redis, platform: str, account: str):
+        """
+        Args:
+            redis_client: Клиент Redis
+            platform: Платформа (vk, tiktok)
+            account: Идентификатор аккаунта на платформе
+        """
+        self.redis = redis_client
+        self.platform = platform
+        self.account = account
+
+        prefix = f"circuit:{platform}:{account}"
+        self.failures_key = f"{prefix}:failures"
+        self.open_key = f"{prefix}:open"
+        self.half_open_key = f"{prefix}:half_open"
+        self.probe_key = f"{prefix}:probe"
+
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к платформе"""
+        try:
+            if self.redis.exists(self.open_key):
+                return False
+
+            if self.redis.exists(self.half_open_key):
+                # Пропускаем только один пробный вызов
+                return bool(self.redis.set(self.probe_key, 1, nx=True, ex=CIRCUIT_PROBE_TIMEOUT))
+
+            return True
+
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker unavailable, allowing call", platform=self.platform, error=str(e))
+            return True
+
+    def retry_after(self) -> int:
+        """Через сколько секунд имеет смысл повторить (0 если цепь не открыта)"""
+        try:
+            ttl = self.redis.ttl(self.open_key)
+            if ttl and ttl > 0:
+                return ttl
+            if self.redis.exists(self.probe_key):
+                return max(self.redis.ttl(self.probe_key), 1)
+            return 0
+
+        except redis.RedisError:
+            return 0
+
+    def record_success(self):
+        """Успешный вызов: сброс счетчика, закрытие цепи после пробы"""
+        try:
+            pipe = self.redis.pipeline()
+            pipe.delete(self.failures_key)
+            pipe.delete(self.half_open_key)
+            pipe.delete(self.probe_key)
+            closed_from_half_open = pipe.execute()[1]
+
+            if closed_from_half_open:
+                logger.info("Circuit closed", platform=self.platform, account=self.account)
+
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker unavailable", platform=self.platform, error=str(e))
+
+    def record_failure(self):
+        """Неудачный вызов: открыть цепь при превышении порога или провале пробы"""
+        try:
+            if self.redis.exists(self.half_open_key):
+                self._open()
+                return
+
+            pipe = self.redis.pipeline()
+            pipe.incr(self.failures_key)
+            pipe.expire(self.failures_key, CIRCUIT_FAILURE_WINDOW, nx=True)
+            failures = pipe.execute()[0]
+
+            if failures >= CIRCUIT_FAILURE_THRESHOLD:
+                self._open()
+
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker unavailable", platform=self.platform, error=str(e))
+
+    def record(self, name: str, elapsed: float, healthy: bool):
+        """Callback on_api_call для publisher'ов"""
+        if healthy:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def _open(self):
+        """Открыть цепь на CIRCUIT_OPEN_SECONDS"""
+        pipe = self.redis.pipeline()
+        pipe.set(self.open_key, 1, ex=CIRCUIT_OPEN_SECONDS)
+        pipe.set(self.half_open_key, 1, ex=CIRCUIT_STATE_TTL)
+        pipe.delete(self.failures_key)
+        pipe.delete(self.probe_key)
+        pipe.execute()
+
+        logger.warning(
+            "Circuit opened",
+            platform=self.platform,
+            account=self.account,
+            open_seconds=CIRCUIT_OPEN_SECONDS
+        )
@@ -0,0 +1,54 @@
+"""Соединения с БД в процессах воркера Celery"""
+import os
+import structlog
+from celery.signals import worker_init, worker_process_init
+
+from app.database import configure_pool, dispose_inherited_connections
+
+logger = structlog.get_logger()
+
+# Соединений на одну выполняемую задачу: сессия задачи и продление аренды
+WORKER_DB_CONNECTIONS_PER_TASK = int(os.getenv('WORKER_DB_CONNECTIONS_PER_TASK', '2'))
+
+# Запас сверх расчетного размера пула
+WORKER_DB_MAX_OVERFLOW = int(os.getenv('WORKER_DB_MAX_OVERFLOW', '1'))
+
+
+def uses_prefork(worker) -> bool:
+    """Задачи выполняются в дочерних процессах (пул prefork)"""
+    pool_cls = worker.pool_cls
+    name = pool_cls if isinstance(pool_cls, str) else pool_cls.__module__
+    return 'prefork' in name
+
+
+def tasks_per_process(worker) -> int:
+    """Сколько задач одновременно выполняет один процесс воркера"""
+    # prefork: каждый дочерний процесс выполняет по одной задаче;
+    # threads/gevent/eventlet: все задачи в одном процессе
+    return 1 if uses_prefork(worker) else max(worker.concurrency or 1, 1)
+
+
+@worker_init.connect
+def size_db_pool(sender=None, **kwargs):
+    """
+    Пул соединений по реальной конкурентности процесса (до fork)
+
+    Пул API (DB_POOL_SIZE) на каждый prefork-процесс быстро исчерпывает
+    max_connections PostgreSQL при масштабировании воркеров; процессу
+    нужно не больше соединений, чем задач, которые он выполняет.
+    """
+    pool_size = tasks_per_process(sender) * WORKER_DB_CONNECTIONS_PER_TASK
+    configure_pool(pool_size, WORKER_DB_MAX_OVERFLOW)
+
+    logger.info(
+        "Worker DB pool configured",
+        pool_size=pool_size,
+        max_overflow=WORKER_DB_MAX_OVERFLOW,
+        concurrency=sender.concurrency
+    )
+
+
+@worker_process_init.connect
+def reset_db_connections(**kwargs):
+    """Дочерний процесс открывает свои соединения, а не использует родительские"""
+    dispose_inherited_connections()
@@ -0,0 +1,107 @@
+"""Аренда задачи публикации воркером"""
+import os
+import uuid
+import socket
+import threading
+import structlog
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import PublishJob
+
+logger = structlog.get_logger()
+
+# Срок аренды задачи и период ее продления (секунды)
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '180'))
+JOB_LEASE_RENEW_INTERVAL = float(os.getenv('JOB_LEASE_RENEW_INTERVAL', str(JOB_LEASE_SECONDS / 3)))
+
+
+def lease_expiry() -> datetime:
+    """Момент истечения аренды, взятой или продленной сейчас"""
+    return datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+
+
+def new_lease_owner() -> str:
+    """Идентификатор владельца аренды: узел, процесс и попытка"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobLease:
+    """
+    Продление аренды задачи в фоновом потоке
+
+    Пока попытка скачивает и загружает видео, поток раз в
+    JOB_LEASE_RENEW_INTERVAL сдвигает lease_expires_at. Если процесс
+    воркера погиб, аренда истекает и задачу снова ставит в очередь
+    reap_expired_leases. Продление не меняет версию и updated_at: это не
+    изменение статуса.
+    """
+
+    def __init__(self, session_factory, submission_id: str, owner: str):
+        """
+        Args:
+            session_factory: Фабрика сессий БД (у потока своя сессия)
+            submission_id: ID заявки
+            owner: Владелец аренды, записанный при захвате задачи
+        """
+        self.session_factory = session_factory
+        self.submission_id = submission_id
+        self.owner = owner
+        self.lost = False
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{submission_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Остановить продление (повторный вызов безопасен)"""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def renew(self) -> bool:
+        """
+        Продлить аренду
+
+        Returns:
+            False если задача больше не принадлежит этому владельцу
+        """
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(PublishJob).where(
+                    PublishJob.submission_id == self.submission_id,
+                    PublishJob.status == "PROCESSING",
+                    PublishJob.lease_owner == self.owner
+                ).values(
+                    lease_expires_at=lease_expiry(),
+                    updated_at=PublishJob.updated_at
+                )
+            )
+            db.commit()
+            return result.rowcount > 0
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopped.wait(JOB_LEASE_RENEW_INTERVAL):
+            try:
+                if not self.renew():
+                    self.lost = True
+                    logger.warning(
+                        "Job lease lost",
+                        submission_id=self.submission_id,
+                        owner=self.owner
+                    )
+                    return
+            except SQLAlchemyError as e:
+                # Следующая попытка продления — через интервал; срок аренды
+                # в несколько раз больше интервала
+                logger.warning(
+                    "Failed to renew job lease",
+                    submission_id=self.submission_id,
+                    error=str(e)
+                )
@@ -0,0 +1,61 @@
+"""Экспорт метрик воркера и время ожидания задач в очереди"""
+import os
+import time
+import structlog
+from datetime import datetime
+from typing import Optional
+from celery.signals import before_task_publish, task_prerun, worker_init, worker_process_shutdown
+from prometheus_client import start_http_server, multiprocess
+
+from app.metrics import QUEUE_WAIT_SECONDS, get_registry
+
+logger = structlog.get_logger()
+
+# Порт HTTP-экспортера метрик воркера (0 — не запускать)
+WORKER_METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', '0'))
+
+
+@before_task_publish.connect
+def add_enqueued_at(headers=None, **kwargs):
+    """Отметка времени постановки в очередь (в API и при retry в воркере)"""
+    if headers is not None:
+        headers['enqueued_at'] = time.time()
+
+
+def queue_wait_seconds(request) -> Optional[float]:
+    """Сколько задача ждала в очереди; для отложенных задач отсчет от ETA"""
+    enqueued_at = getattr(request, 'enqueued_at', None) or (request.headers or {}).get('enqueued_at')
+    if not enqueued_at:
+        return None
+
+    ready_at = float(enqueued_at)
+    if request.eta:
+        eta = request.eta if isinstance(request.eta, datetime) else datetime.fromisoformat(request.eta)
+        ready_at = max(ready_at, eta.timestamp())
+
+    return max(time.time() - ready_at, 0)
+
+
+@task_prerun.connect
+def observe_queue_wait(task=None, **kwargs):
+    """Время ожидания задачи в очереди"""
+    wait = queue_wait_seconds(task.request)
+    if wait is not None:
+        QUEUE_WAIT_SECONDS.labels(task=task.name).observe(wait)
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """HTTP-экспортер в главном процессе воркера (до fork дочерних)"""
+    if not WORKER_METRICS_PORT:
+        return
+
+    start_http_server(WORKER_METRICS_PORT, registry=get_registry())
+    logger.info("Worker metrics exporter started", port=WORKER_METRICS_PORT)
+
+
+@worker_process_shutdown.connect
+def mark_process_dead(pid=None, **kwargs):
+    """Убрать gauge-значения завершившегося дочернего процесса"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,141 @@
+"""
+Relay transactional outbox -> брокер Celery
+
+Запуск: python -m workers.outbox_relay
+
+API не обращается к брокеру: задача Celery записывается в outbox_messages
+в одной транзакции с PublishJob, а relay пачками отправляет неотправленные
+сообщения и отмечает их sent_at. Доставка — как минимум один раз: после
+сбоя между отправкой и коммитом сообщение уйдет повторно, повтор
+отсекает атомарный захват задачи в publish_submission.
+"""
+import os
+import time
+import structlog
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+
+from workers.celery_app import celery_app
+from app.database import SessionLocal, OutboxMessage, configure_pool
+
+logger = structlog.get_logger()
+
+# Сколько сообщений отправлять за один проход
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '200'))
+
+# Пауза, когда неотправленных сообщений меньше пачки (секунды)
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '0.5'))
+
+# Сколько хранить отправленные сообщения (часы) и как часто чистить (секунды)
+OUTBOX_RETENTION_HOURS = int(os.getenv('OUTBOX_RETENTION_HOURS', '24'))
+OUTBOX_CLEANUP_INTERVAL = int(os.getenv('OUTBOX_CLEANUP_INTERVAL', '300'))
+OUTBOX_CLEANUP_BATCH = 5000
+
+
+def relay_batch(db: Session) -> int:
+    """
+    Отправить пачку неотправленных сообщений
+
+    Строки блокируются FOR UPDATE SKIP LOCKED, поэтому несколько relay
+    могут работать параллельно, не отправляя одно сообщение дважды.
+    Все сообщения пачки идут через одно соединение с брокером.
+
+    Returns:
+        Число отправленных сообщений
+    """
+    messages = db.query(OutboxMessage).filter(
+        OutboxMessage.sent_at.is_(None)
+    ).order_by(OutboxMessage.id).limit(OUTBOX_BATCH_SIZE).with_for_update(skip_locked=True).all()
+
+    if not messages:
+        db.rollback()
+        return 0
+
+    sent = 0
+    try:
+        with celery_app.producer_or_acquire() as producer:
+            for message in messages:
+                celery_app.send_task(
+                    message.task,
+                    args=message.args,
+                    producer=producer,
+                    **(message.options or {})
+                )
+                message.sent_at = datetime.utcnow()
+                sent += 1
+    except Exception as e:
+        logger.error(
+            "Outbox relay failed to publish",
+            error=str(e),
+            error_type=type(e).__name__,
+            sent=sent,
+            pending=len(messages) - sent
+        )
+    finally:
+        # Фиксируем отправленные и снимаем блокировки с остальных
+        db.commit()
+
+    if sent:
+        logger.info("Outbox messages relayed", sent=sent)
+
+    return sent
+
+
+def cleanup_sent(db: Session) -> int:
+    """Удалить отправленные сообщения старше OUTBOX_RETENTION_HOURS"""
+    cutoff = datetime.utcnow() - timedelta(hours=OUTBOX_RETENTION_HOURS)
+    deleted = 0
+
+    while True:
+        ids = db.query(OutboxMessage.id).filter(
+            OutboxMessage.sent_at < cutoff
+        ).limit(OUTBOX_CLEANUP_BATCH).subquery()
+        count = db.query(OutboxMessage).filter(
+            OutboxMessage.id.in_(db.query(ids.c.id))
+        ).delete(synchronize_session=False)
+        db.commit()
+
+        deleted += count
+        if count < OUTBOX_CLEANUP_BATCH:
+            return deleted
+
+
+def run():
+    """Основной цикл relay"""
+    # Relay работает в одном потоке: одно соединение
+    configure_pool(pool_size=1, max_overflow=0)
+
+    logger.info(
+        "Outbox relay started",
+        batch_size=OUTBOX_BATCH_SIZE,
+        poll_interval=OUTBOX_POLL_INTERVAL
+    )
+    last_cleanup = 0.0
+
+    while True:
+        sent = 0
+        db = SessionLocal()
+
+        try:
+            sent = relay_batch(db)
+
+            if time.monotonic() - last_cleanup >= OUTBOX_CLEANUP_INTERVAL:
+                deleted = cleanup_sent(db)
+                last_cleanup = time.monotonic()
+                if deleted:
+                    logger.info("Outbox cleaned up", deleted=deleted)
+
+        except Exception as e:
+            logger.error("Outbox relay error", error=str(e), error_type=type(e).__name__)
+            db.rollback()
+
+        finally:
+            db.close()
+
+        # Полная пачка — сразу следующая, иначе ждем новых сообщений
+        if sent < OUTBOX_BATCH_SIZE:
+            time.sleep(OUTBOX_POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,58 @@
+"""Прореживание отчетов о прогрессе загрузки"""
+import os
+import time
+import structlog
+from typing import Optional
+
+from app.progress import progress_payload, store_progress
+
+logger = structlog.get_logger()
+
+# Не чаще одного отчета в PROGRESS_MIN_INTERVAL секунд
+PROGRESS_MIN_INTERVAL = float(os.getenv('PROGRESS_MIN_INTERVAL', '2'))
+
+# и только если прогресс вырос хотя бы на PROGRESS_MIN_STEP процентов
+PROGRESS_MIN_STEP = float(os.getenv('PROGRESS_MIN_STEP', '1'))
+
+
+class ProgressReporter:
+    """
+    Callback on_progress для publisher'ов
+
+    Publisher'ы сообщают прогресс на каждый чанк или блок потока; в Redis
+    уходит только последнее значение не чаще PROGRESS_MIN_INTERVAL и с
+    шагом не меньше PROGRESS_MIN_STEP, а завершение загрузки — всегда.
+    В БД прогресс не пишется.
+    """
+
+    def __init__(self, submission_id: str, group_id: Optional[str] = None):
+        """
+        Args:
+            submission_id: ID заявки
+            group_id: ID группы (прогресс рассылается и подписчикам группы)
+        """
+        self.submission_id = submission_id
+        self.group_id = group_id
+
+        self.reported_at = 0.0
+        self.reported_percent = None
+        self.reports = 0
+
+    def __call__(self, bytes_sent: int, total_bytes: int):
+        percent = 100 * bytes_sent / total_bytes if total_bytes else 0
+        now = time.monotonic()
+        finished = total_bytes and bytes_sent >= total_bytes
+
+        if not finished and self.reported_percent is not None:
+            if now - self.reported_at < PROGRESS_MIN_INTERVAL:
+                return
+            if percent - self.reported_percent < PROGRESS_MIN_STEP:
+                return
+
+        if finished and self.reported_percent == 100:
+            return
+
+        self.reported_at = now
+        self.reported_percent = percent
+        self.reports += 1
+        store_progress(self.submission_id, self.group_id, progress_payload(bytes_sent, total_bytes))
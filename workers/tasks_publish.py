@@ -1,15 +1,37 @@
 """Celery задачи для публикации видео"""
 import os
+import copy
+import time
+import random
+import hashlib
 import tempfile
 import structlog
-from datetime import datetime
+from typing import Optional
+from datetime import datetime, timedelta
 from celery import Task
+from celery.exceptions import Retry
 from minio import Minio
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
 
 from workers.celery_app import celery_app
-from app.database import PublishJob
+from app.database import SessionLocal, PublishJob, PUBLISH_MAX_RETRIES, transition_job, enqueue_task, record_stats
+from app.redis_client import get_redis
+from app.events import publish_job_event
+from app.tracing import storage_span, detached_context
+from app.metrics import (
+    STORAGE_DOWNLOAD_SECONDS,
+    PUBLISH_DURATION_SECONDS,
+    PUBLISH_BYTES_PER_SECOND,
+    PUBLISH_RETRIES,
+    PUBLISH_FAILURES
+)
+from workers.circuit_breaker import CircuitBreaker
+from workers.attempts import AttemptRecorder
+from workers.leases import JobLease, lease_expiry, new_lease_owner
+from workers.progress import ProgressReporter
+from workers.metrics import queue_wait_seconds
+from workers.bandwidth import BandwidthManager, UNLIMITED, parse_rates
 from platforms.youtube import YouTubePublisher
 from platforms.vk import VKPublisher
 from platforms.tiktok import TikTokPublisher
@@ -24,11 +46,6 @@ structlog.configure(
 
 logger = structlog.get_logger()
 
-# Настройка БД
-DATABASE_URL = os.getenv('DATABASE_URL')
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 # Настройка MinIO
 MINIO_ENDPOINT = os.getenv('MINIO_ENDPOINT', 'minio:9000')
 MINIO_ACCESS_KEY = os.getenv('MINIO_ACCESS_KEY', 'minioadmin')
@@ -54,6 +71,8 @@ VK_ACCESS_TOKEN = os.getenv('VK_ACCESS_TOKEN', '')
 VK_GROUP_ID = int(os.getenv('VK_GROUP_ID', '0'))
 VK_DEFAULT_PRIVACY = os.getenv('VK_DEFAULT_PRIVACY', 'private')
 VK_AS_CLIP = os.getenv('VK_AS_CLIP', 'false').lower() == 'true'
+VK_CHUNKED_UPLOAD = os.getenv('VK_CHUNKED_UPLOAD', 'true').lower() == 'true'
+VK_UPLOAD_CHUNK_SIZE = int(os.getenv('VK_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
 
 # TikTok credentials
 TIKTOK_CLIENT_KEY = os.getenv('TIKTOK_CLIENT_KEY', '')
@@ -65,6 +84,18 @@ TIKTOK_DISABLE_DUET = os.getenv('TIKTOK_DISABLE_DUET', 'false').lower() == 'true
 TIKTOK_DISABLE_COMMENT = os.getenv('TIKTOK_DISABLE_COMMENT', 'false').lower() == 'true'
 TIKTOK_DISABLE_STITCH = os.getenv('TIKTOK_DISABLE_STITCH', 'false').lower() == 'true'
 
+# Исходящая полоса узла (байт/с, 0 = без ограничения)
+UPLOAD_BANDWIDTH_LIMIT = float(os.getenv('UPLOAD_BANDWIDTH_LIMIT', '0')) or UNLIMITED
+UPLOAD_BANDWIDTH_CAPS = parse_rates(os.getenv('UPLOAD_BANDWIDTH_CAPS', ''))  # youtube=5000000,vk=...
+UPLOAD_BANDWIDTH_WEIGHTS = parse_rates(os.getenv('UPLOAD_BANDWIDTH_WEIGHTS', 'tiktok=3,vk=2,youtube=1'))
+
+bandwidth_manager = BandwidthManager(
+    get_redis(),
+    total_rate=UPLOAD_BANDWIDTH_LIMIT,
+    platform_caps=UPLOAD_BANDWIDTH_CAPS,
+    weights=UPLOAD_BANDWIDTH_WEIGHTS
+)
+
 
 def save_tiktok_tokens(access_token: str, refresh_token: str):
     """
@@ -126,6 +157,70 @@ def save_tiktok_tokens(access_token: str, refresh_token: str):
         )
 
 
+def get_circuit_breaker(platform: str) -> Optional[CircuitBreaker]:
+    """
+    Circuit breaker для платформы и настроенного аккаунта
+    
+    Returns:
+        CircuitBreaker или None, если платформа не защищена breaker'ом
+    """
+    if platform == "vk":
+        account = str(VK_GROUP_ID) if VK_GROUP_ID > 0 else hashlib.sha256(VK_ACCESS_TOKEN.encode()).hexdigest()[:12]
+    elif platform == "tiktok":
+        account = TIKTOK_CLIENT_KEY
+    else:
+        return None
+    
+    return CircuitBreaker(get_redis(), platform, account)
+
+
+def parked_count(request) -> int:
+    """Сколько раз задача уже откладывалась из-за открытой цепи"""
+    return int(getattr(request, 'parked', None) or (request.headers or {}).get('parked') or 0)
+
+
+def api_call_hook(platform: str, on_api_call=None):
+    """Callback on_api_call: circuit breaker платформы и дополнительный обработчик"""
+    breaker = get_circuit_breaker(platform)
+    
+    def hook(name: str, elapsed: float, healthy: bool):
+        if breaker:
+            breaker.record(name, elapsed, healthy)
+        if on_api_call:
+            on_api_call(name, elapsed, healthy)
+    
+    return hook
+
+
+# Статусы, из которых задачу можно взять в работу
+CLAIMABLE_STATUSES = ("PENDING", "FAILED")
+
+# Сколько раз подряд задача откладывается при открытой цепи; дальше
+# выполняется попытка, которая при неудаче расходует retry
+CIRCUIT_MAX_PARKS = int(os.getenv('CIRCUIT_MAX_PARKS', '10'))
+
+# Сколько задач с истекшей арендой обрабатывать за один запуск reaper'а
+LEASE_REAPER_BATCH = int(os.getenv('LEASE_REAPER_BATCH', '100'))
+
+# Задачи PROCESSING без аренды (взятые до ее появления) считаются
+# брошенными после этого срока, секунды
+UNLEASED_PROCESSING_TIMEOUT = int(os.getenv('UNLEASED_PROCESSING_TIMEOUT', '3600'))
+
+
+def skip_duplicate_delivery(submission_id: str, status: str) -> dict:
+    """Задача уже выполняется или завершена другой доставкой"""
+    logger.warning(
+        "Duplicate delivery skipped",
+        submission_id=submission_id,
+        status=status
+    )
+    return {
+        'submission_id': submission_id,
+        'status': 'SKIPPED',
+        'current_status': status
+    }
+
+
 class PublishTask(Task):
     """Базовый класс для задач публикации"""
     
@@ -141,7 +236,7 @@ class PublishTask(Task):
         )
 
 
-@celery_app.task(base=PublishTask, bind=True, max_retries=3)
+@celery_app.task(base=PublishTask, bind=True, max_retries=PUBLISH_MAX_RETRIES)
 def publish_submission(self, submission_id: str):
     """
     Публикация видео на платформу
@@ -150,6 +245,11 @@ def publish_submission(self, submission_id: str):
         submission_id: ID заявки на публикацию
     """
     db = SessionLocal()
+    job = None
+    claimed = False
+    attempt = None
+    lease = None
+    lease_owner = new_lease_owner()
     temp_file_path = None
     
     try:
@@ -162,9 +262,77 @@ def publish_submission(self, submission_id: str):
             logger.error("Job not found", submission_id=submission_id)
             raise Exception(f"Job not found: {submission_id}")
         
-        # Обновляем статус
-        job.status = "PROCESSING"
-        db.commit()
+        if job.status not in CLAIMABLE_STATUSES:
+            return skip_duplicate_delivery(submission_id, job.status)
+        
+        # Платформа недоступна — откладываем задачу до скачивания видео
+        breaker = get_circuit_breaker(job.platform)
+        parks = parked_count(self.request)
+        if breaker and not breaker.allow() and parks < CIRCUIT_MAX_PARKS:
+            countdown = breaker.retry_after() + random.randint(1, 30)
+            logger.warning(
+                "Circuit open, parking job",
+                submission_id=submission_id,
+                platform=job.platform,
+                countdown=countdown,
+                parks=parks + 1
+            )
+            # Тот же счетчик retries: ожидание не расходует попытки публикации,
+            # но число откладываний ограничено CIRCUIT_MAX_PARKS. Доставка —
+            # через outbox: при недоступном брокере задача не теряется
+            enqueue_task(
+                db, publish_submission.name, submission_id,
+                countdown=countdown,
+                retries=self.request.retries,
+                headers={'parked': parks + 1}
+            )
+            db.commit()
+            return {
+                'submission_id': submission_id,
+                'status': 'PARKED',
+                'countdown': countdown
+            }
+        
+        # Захватываем задачу: из повторных доставок одного сообщения
+        # (task_acks_late) публикацию выполнит только одна. FAILED
+        # захватывается только доставкой своего retry — по счетчику попыток.
+        # Вместе с задачей берется аренда, которая продлевается до конца попытки.
+        try:
+            job = transition_job(
+                db, submission_id, CLAIMABLE_STATUSES, "PROCESSING",
+                or_(PublishJob.status != "FAILED", PublishJob.retry_count == self.request.retries),
+                lease_owner=lease_owner,
+                lease_expires_at=lease_expiry()
+            )
+            db.commit()
+        except IntegrityError:
+            # Пока задача ждала retry, на то же видео и платформу создали
+            # новую заявку — она и будет опубликована
+            db.rollback()
+            logger.warning(
+                "Job superseded by newer submission",
+                submission_id=submission_id
+            )
+            return {
+                'submission_id': submission_id,
+                'status': 'SUPERSEDED'
+            }
+        
+        if job is None:
+            current = db.query(PublishJob.status).filter_by(submission_id=submission_id).scalar()
+            return skip_duplicate_delivery(submission_id, current)
+        
+        claimed = True
+        lease = JobLease(SessionLocal, submission_id, lease_owner)
+        lease.start()
+        attempt = AttemptRecorder(
+            submission_id,
+            job.platform,
+            attempt=self.request.retries + 1,
+            task_id=self.request.id,
+            queue_wait=queue_wait_seconds(self.request)
+        )
+        publish_job_event(job)
         
         logger.info(
             "Processing job",
@@ -183,51 +351,113 @@ def publish_submission(self, submission_id: str):
                 temp_path=temp_file_path
             )
             
-            minio_client.fget_object(
-                MINIO_BUCKET,
-                job.s3_key,
-                temp_file_path
-            )
+            with STORAGE_DOWNLOAD_SECONDS.time(), attempt.stage('download'), \
+                    storage_span("fget_object", MINIO_BUCKET, job.s3_key):
+                minio_client.fget_object(
+                    MINIO_BUCKET,
+                    job.s3_key,
+                    temp_file_path
+                )
             
             logger.info(
                 "Video downloaded",
                 size=os.path.getsize(temp_file_path)
             )
         
-        # Публикуем на платформу
-        if job.platform == "youtube":
-            result = publish_to_youtube(
-                video_path=temp_file_path,
-                title=job.title,
-                description=job.description or "",
-                tags=job.tags or []
-            )
-        elif job.platform == "vk":
-            result = publish_to_vk(
-                video_path=temp_file_path,
-                title=job.title,
-                description=job.description or "",
-                privacy_status=None  # Используем дефолтный из настроек
-            )
-        elif job.platform == "tiktok":
-            result = publish_to_tiktok(
-                video_path=temp_file_path,
-                title=job.title,
-                description=job.description or "",
-                privacy_level=None  # Используем дефолтный из настроек
-            )
-        else:
-            raise Exception(f"Unsupported platform: {job.platform}")
+        # Публикуем на платформу (поток загрузки идет через менеджер полосы узла)
+        progress = ProgressReporter(submission_id, job.group_id)
+        publish_started = time.monotonic()
+        with attempt.stage('publish'), bandwidth_manager.upload(submission_id, job.platform) as bandwidth:
+            attempt.upload = bandwidth
+            if job.platform == "youtube":
+                result = publish_to_youtube(
+                    video_path=temp_file_path,
+                    title=job.title,
+                    description=job.description or "",
+                    tags=job.tags or [],
+                    wrap_stream=bandwidth.wrap,
+                    on_progress=progress
+                )
+            elif job.platform == "vk":
+                def save_upload_state(state):
+                    # Сохраняем прогресс, чтобы retry задачи продолжил загрузку.
+                    # Условный UPDATE по владельцу аренды: после reaper'а
+                    # задача уже не наша, и загрузку нужно остановить
+                    saved = db.execute(
+                        update(PublishJob).where(
+                            PublishJob.submission_id == submission_id,
+                            PublishJob.status == "PROCESSING",
+                            PublishJob.lease_owner == lease_owner
+                        ).values(upload_state=copy.deepcopy(state), updated_at=PublishJob.updated_at)
+                    ).rowcount
+                    db.commit()
+                    if not saved:
+                        raise Exception(f"Job lease lost during upload: {submission_id}")
+                
+                result = publish_to_vk(
+                    video_path=temp_file_path,
+                    title=job.title,
+                    description=job.description or "",
+                    privacy_status=None,  # Используем дефолтный из настроек
+                    upload_state=job.upload_state,
+                    on_upload_state=save_upload_state,
+                    wrap_stream=bandwidth.wrap,
+                    on_api_call=attempt.record_api_call,
+                    on_progress=progress
+                )
+            elif job.platform == "tiktok":
+                result = publish_to_tiktok(
+                    video_path=temp_file_path,
+                    title=job.title,
+                    description=job.description or "",
+                    privacy_level=None,  # Используем дефолтный из настроек
+                    wrap_stream=bandwidth.wrap,
+                    on_api_call=attempt.record_api_call,
+                    on_progress=progress
+                )
+            else:
+                raise Exception(f"Unsupported platform: {job.platform}")
         
-        # Обновляем результаты
-        job.status = "COMPLETED"
-        job.platform_job_id = result['platform_job_id']
-        job.public_url = result['public_url']
-        job.published_at = datetime.utcnow()
-        job.error_message = None
+        publish_elapsed = time.monotonic() - publish_started
+        PUBLISH_DURATION_SECONDS.labels(platform=job.platform).observe(publish_elapsed)
+        PUBLISH_BYTES_PER_SECOND.labels(platform=job.platform).observe(
+            os.path.getsize(temp_file_path) / max(publish_elapsed, 1e-3)
+        )
         
+        # Обновляем результаты (только если аренда все еще наша)
+        lease.stop()
+        published_at = datetime.utcnow()
+        completed = transition_job(
+            db, submission_id, ("PROCESSING",), "COMPLETED",
+            PublishJob.lease_owner == lease_owner,
+            lease_owner=None,
+            lease_expires_at=None,
+            platform_job_id=result['platform_job_id'],
+            public_url=result['public_url'],
+            platform_status=result.get('status'),
+            published_at=published_at,
+            error_message=None,
+            upload_state=None
+        )
+        db.add(attempt.finish("COMPLETED"))
+        if completed is not None:
+            record_stats(
+                db, completed.platform, completed=1,
+                duration=(published_at - completed.created_at).total_seconds()
+            )
         db.commit()
         
+        if completed is None:
+            # Статус изменили в обход этого воркера; видео уже загружено
+            logger.warning(
+                "Job left PROCESSING during publish",
+                submission_id=submission_id,
+                platform_job_id=result['platform_job_id']
+            )
+        else:
+            job = completed
+            publish_job_event(job)
+        
         logger.info(
             "Job completed successfully",
             submission_id=submission_id,
@@ -249,24 +479,68 @@ def publish_submission(self, submission_id: str):
             error_type=type(exc).__name__
         )
         
+        platform = job.platform if job else 'unknown'
+        will_retry = self.request.retries < self.max_retries
+        retry_delay = 60 * (2 ** self.request.retries)  # 60s, 120s, 240s
+        
         # Обновляем статус в БД
-        if db and job:
-            job.status = "FAILED"
-            job.error_message = str(exc)
-            job.retry_count += 1
+        if claimed:
+            if lease:
+                lease.stop()
+            db.rollback()
+            failed = transition_job(
+                db, submission_id, ("PROCESSING",), "FAILED",
+                PublishJob.lease_owner == lease_owner,
+                lease_owner=None,
+                lease_expires_at=None,
+                error_message=str(exc),
+                retry_count=PublishJob.retry_count + 1
+            )
+            db.add(attempt.finish("FAILED", exc))
+            if failed is not None:
+                if will_retry:
+                    # Следующая попытка — в outbox в одной транзакции с FAILED,
+                    # как в reap_expired_leases: без брокера задача не останется
+                    # FAILED в ожидании retry, которого нет ни в одной очереди
+                    enqueue_task(
+                        db, publish_submission.name, submission_id,
+                        retries=self.request.retries + 1,
+                        countdown=retry_delay
+                    )
+                    record_stats(db, failed.platform, retried=1)
+                else:
+                    record_stats(db, failed.platform, failed=1)
             db.commit()
+            
+            if failed is None:
+                # Аренду забрал reaper: он и поставил retry
+                logger.warning(
+                    "Job lease lost, retry left to the lease reaper",
+                    submission_id=submission_id
+                )
+                return {
+                    'submission_id': submission_id,
+                    'status': 'LEASE_LOST'
+                }
+            
+            job = failed
+            publish_job_event(job)
         
         # Retry с экспоненциальным backoff
-        if self.request.retries < self.max_retries:
-            retry_delay = 60 * (2 ** self.request.retries)  # 60s, 120s, 240s
+        if will_retry:
+            PUBLISH_RETRIES.labels(platform=platform, error=type(exc).__name__).inc()
             logger.info(
                 f"Retrying in {retry_delay}s",
                 submission_id=submission_id,
                 retry=self.request.retries + 1,
                 max_retries=self.max_retries
             )
+            if claimed:
+                # Сообщение retry уже в outbox: только состояние RETRY
+                raise Retry(exc=exc, when=retry_delay)
             raise self.retry(exc=exc, countdown=retry_delay)
         else:
+            PUBLISH_FAILURES.labels(platform=platform, error=type(exc).__name__).inc()
             logger.error(
                 "Max retries reached",
                 submission_id=submission_id
@@ -274,6 +548,9 @@ def publish_submission(self, submission_id: str):
             raise
         
     finally:
+        if lease:
+            lease.stop()
+        
         # Очистка временного файла
         if temp_file_path and os.path.exists(temp_file_path):
             try:
@@ -291,12 +568,144 @@ def publish_submission(self, submission_id: str):
             db.close()
 
 
+@celery_app.task
+def reap_expired_leases():
+    """
+    Вернуть в очередь задачи, аренда которых истекла (воркер погиб)
+    
+    Задачи PROCESSING с lease_expires_at в прошлом выбираются по индексу
+    (status, lease_expires_at). Потерянная попытка считается неудачной:
+    задача переводится в FAILED с увеличением retry_count, а доставка
+    следующего retry ставится в outbox — как при обычной ошибке. Когда
+    попытки исчерпаны, задача остается FAILED.
+    """
+    db = SessionLocal()
+    
+    try:
+        now = datetime.utcnow()
+        expired = or_(
+            PublishJob.lease_expires_at < now,
+            # Захваченные до появления аренды
+            (PublishJob.lease_expires_at.is_(None))
+            & (PublishJob.updated_at < now - timedelta(seconds=UNLEASED_PROCESSING_TIMEOUT))
+        )
+        
+        candidates = db.query(PublishJob.submission_id).filter(
+            PublishJob.status == "PROCESSING",
+            expired
+        ).order_by(PublishJob.lease_expires_at).limit(LEASE_REAPER_BATCH).all()
+        
+        reaped = []
+        for row in candidates:
+            # Условие повторяется в UPDATE: аренду могли продлить после выборки
+            job = transition_job(
+                db, row.submission_id, ("PROCESSING",), "FAILED",
+                expired,
+                lease_owner=None,
+                lease_expires_at=None,
+                error_message="Worker lost: job lease expired",
+                retry_count=PublishJob.retry_count + 1
+            )
+            if job is None:
+                continue
+            
+            if job.retry_count <= publish_submission.max_retries:
+                # Повтор относится к заявке, а не к запуску reaper'а
+                with detached_context():
+                    enqueue_task(
+                        db, "workers.tasks_publish.publish_submission", job.submission_id,
+                        retries=job.retry_count
+                    )
+                record_stats(db, job.platform, retried=1)
+            else:
+                record_stats(db, job.platform, failed=1)
+            reaped.append(job)
+        
+        db.commit()
+        
+        for job in reaped:
+            publish_job_event(job)
+            logger.warning(
+                "Expired job lease reaped",
+                submission_id=job.submission_id,
+                platform=job.platform,
+                retry_count=job.retry_count,
+                requeued=job.retry_count <= publish_submission.max_retries
+            )
+        
+        return {'reaped': len(reaped)}
+    
+    finally:
+        db.close()
+
+
+def get_youtube_publisher() -> YouTubePublisher:
+    """Создать YouTube publisher из настроек окружения"""
+    if not YOUTUBE_CLIENT_ID or not YOUTUBE_CLIENT_SECRET or not YOUTUBE_REFRESH_TOKEN:
+        raise Exception(
+            "YouTube credentials not configured. "
+            "Set YOUTUBE_CLIENT_ID, YOUTUBE_CLIENT_SECRET, and YOUTUBE_REFRESH_TOKEN"
+        )
+    
+    return YouTubePublisher(
+        client_id=YOUTUBE_CLIENT_ID,
+        client_secret=YOUTUBE_CLIENT_SECRET,
+        refresh_token=YOUTUBE_REFRESH_TOKEN
+    )
+
+
+def get_vk_publisher(on_api_call=None) -> VKPublisher:
+    """
+    Создать VK publisher из настроек окружения
+    
+    Args:
+        on_api_call: Дополнительный callback вызовов API (к circuit breaker)
+    """
+    if not VK_ACCESS_TOKEN:
+        raise Exception(
+            "VK credentials not configured. "
+            "Set VK_ACCESS_TOKEN in .env"
+        )
+    
+    return VKPublisher(
+        access_token=VK_ACCESS_TOKEN,
+        group_id=VK_GROUP_ID if VK_GROUP_ID > 0 else None,
+        on_api_call=api_call_hook("vk", on_api_call)
+    )
+
+
+def get_tiktok_publisher(on_api_call=None) -> TikTokPublisher:
+    """
+    Создать TikTok publisher с автоматическим обновлением токена
+    
+    Args:
+        on_api_call: Дополнительный callback вызовов API (к circuit breaker)
+    """
+    if not TIKTOK_CLIENT_KEY or not TIKTOK_CLIENT_SECRET or not TIKTOK_ACCESS_TOKEN:
+        raise Exception(
+            "TikTok credentials not configured. "
+            "Set TIKTOK_CLIENT_KEY, TIKTOK_CLIENT_SECRET, and TIKTOK_ACCESS_TOKEN"
+        )
+    
+    # Создаем publisher с refresh token и callback для сохранения
+    return TikTokPublisher(
+        client_key=TIKTOK_CLIENT_KEY,
+        client_secret=TIKTOK_CLIENT_SECRET,
+        access_token=TIKTOK_ACCESS_TOKEN,
+        refresh_token=TIKTOK_REFRESH_TOKEN if TIKTOK_REFRESH_TOKEN else None,
+        on_token_refresh=save_tiktok_tokens,  # Callback для автосохранения токенов
+        on_api_call=api_call_hook("tiktok", on_api_call)
+    )
+
+
 def publish_to_youtube(
     video_path: str,
     title: str,
     description: str,
     tags: list,
-    privacy_status: str = None
+    privacy_status: str = None,
+    wrap_stream=None,
+    on_progress=None
 ) -> dict:
     """
     Публикация на YouTube
@@ -307,16 +716,12 @@ def publish_to_youtube(
         description: Описание
         tags: Теги
         privacy_status: Статус приватности (public, private, unlisted)
+        wrap_stream: Обертка потока загрузки
+        on_progress: Callback прогресса загрузки
         
     Returns:
         Dict с результатами публикации
     """
-    if not YOUTUBE_CLIENT_ID or not YOUTUBE_CLIENT_SECRET or not YOUTUBE_REFRESH_TOKEN:
-        raise Exception(
-            "YouTube credentials not configured. "
-            "Set YOUTUBE_CLIENT_ID, YOUTUBE_CLIENT_SECRET, and YOUTUBE_REFRESH_TOKEN"
-        )
-    
     # Используем переданный статус или дефолтный из .env
     if privacy_status is None:
         privacy_status = YOUTUBE_DEFAULT_PRIVACY
@@ -327,11 +732,7 @@ def publish_to_youtube(
         privacy_status=privacy_status
     )
     
-    publisher = YouTubePublisher(
-        client_id=YOUTUBE_CLIENT_ID,
-        client_secret=YOUTUBE_CLIENT_SECRET,
-        refresh_token=YOUTUBE_REFRESH_TOKEN
-    )
+    publisher = get_youtube_publisher()
     
     result = publisher.publish_video(
         video_path=video_path,
@@ -339,7 +740,9 @@ def publish_to_youtube(
         description=description,
         tags=tags,
         privacy_status=privacy_status,
-        made_for_kids=False
+        made_for_kids=False,
+        wrap_stream=wrap_stream,
+        on_progress=on_progress
     )
     
     return result
@@ -349,7 +752,12 @@ def publish_to_vk(
     video_path: str,
     title: str,
     description: str,
-    privacy_status: str = None
+    privacy_status: str = None,
+    upload_state: dict = None,
+    on_upload_state=None,
+    wrap_stream=None,
+    on_api_call=None,
+    on_progress=None
 ) -> dict:
     """
     Публикация на VK
@@ -359,16 +767,15 @@ def publish_to_vk(
         title: Заголовок
         description: Описание
         privacy_status: Статус приватности (private или public)
+        upload_state: Прогресс прошлой попытки чанковой загрузки
+        on_upload_state: Callback для сохранения прогресса загрузки
+        wrap_stream: Обертка потока загрузки
+        on_api_call: Callback вызовов API (учет попытки)
+        on_progress: Callback прогресса загрузки
         
     Returns:
         Dict с результатами публикации
     """
-    if not VK_ACCESS_TOKEN:
-        raise Exception(
-            "VK credentials not configured. "
-            "Set VK_ACCESS_TOKEN in .env"
-        )
-    
     # Используем переданный статус или дефолтный из .env
     if privacy_status is None:
         privacy_status = VK_DEFAULT_PRIVACY
@@ -382,10 +789,7 @@ def publish_to_vk(
         is_clip=VK_AS_CLIP
     )
     
-    publisher = VKPublisher(
-        access_token=VK_ACCESS_TOKEN,
-        group_id=VK_GROUP_ID if VK_GROUP_ID > 0 else None
-    )
+    publisher = get_vk_publisher(on_api_call)
     
     result = publisher.publish_video(
         video_path=video_path,
@@ -393,7 +797,13 @@ def publish_to_vk(
         description=description,
         is_private=is_private,
         is_clip=VK_AS_CLIP,
-        wallpost=False  # Не публикуем на стене автоматически
+        wallpost=False,  # Не публикуем на стене автоматически
+        chunked=VK_CHUNKED_UPLOAD,
+        chunk_size=VK_UPLOAD_CHUNK_SIZE,
+        upload_state=upload_state,
+        on_upload_state=on_upload_state,
+        wrap_stream=wrap_stream,
+        on_progress=on_progress
     )
     
     return result
@@ -403,7 +813,10 @@ def publish_to_tiktok(
     video_path: str,
     title: str,
     description: str,
-    privacy_level: str = None
+    privacy_level: str = None,
+    wrap_stream=None,
+    on_api_call=None,
+    on_progress=None
 ) -> dict:
     """
     Публикация на TikTok с автоматическим обновлением токена
@@ -413,16 +826,13 @@ def publish_to_tiktok(
         title: Заголовок
         description: Описание
         privacy_level: Уровень приватности (SELF_ONLY, PUBLIC_TO_EVERYONE, etc.)
+        wrap_stream: Обертка потока загрузки
+        on_api_call: Callback вызовов API (учет попытки)
+        on_progress: Callback прогресса загрузки
         
     Returns:
         Dict с результатами публикации
     """
-    if not TIKTOK_CLIENT_KEY or not TIKTOK_CLIENT_SECRET or not TIKTOK_ACCESS_TOKEN:
-        raise Exception(
-            "TikTok credentials not configured. "
-            "Set TIKTOK_CLIENT_KEY, TIKTOK_CLIENT_SECRET, and TIKTOK_ACCESS_TOKEN"
-        )
-    
     # Используем переданный статус или дефолтный из .env
     if privacy_level is None:
         privacy_level = TIKTOK_DEFAULT_PRIVACY
@@ -434,14 +844,7 @@ def publish_to_tiktok(
         has_refresh_token=bool(TIKTOK_REFRESH_TOKEN)
     )
     
-    # Создаем publisher с refresh token и callback для сохранения
-    publisher = TikTokPublisher(
-        client_key=TIKTOK_CLIENT_KEY,
-        client_secret=TIKTOK_CLIENT_SECRET,
-        access_token=TIKTOK_ACCESS_TOKEN,
-        refresh_token=TIKTOK_REFRESH_TOKEN if TIKTOK_REFRESH_TOKEN else None,
-        on_token_refresh=save_tiktok_tokens  # Callback для автосохранения токенов
-    )
+    publisher = get_tiktok_publisher(on_api_call)
     
     result = publisher.publish_video(
         video_path=video_path,
@@ -450,7 +853,9 @@ def publish_to_tiktok(
         privacy_level=privacy_level,
         disable_duet=TIKTOK_DISABLE_DUET,
         disable_comment=TIKTOK_DISABLE_COMMENT,
-        disable_stitch=TIKTOK_DISABLE_STITCH
+        disable_stitch=TIKTOK_DISABLE_STITCH,
+        wrap_stream=wrap_stream,
+        on_progress=on_progress
     )
     
     return result
@@ -0,0 +1,156 @@
+"""Celery задачи хранения: перенос старых задач публикации в архив, очистка истории попыток"""
+import os
+import time
+import structlog
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, insert, delete, literal, select
+from sqlalchemy.orm import Session
+
+from workers.celery_app import celery_app
+from app.database import SessionLocal, PublishJob, PublishJobArchive, PublishAttempt, PUBLISH_MAX_RETRIES
+
+logger = structlog.get_logger()
+
+# Через сколько дней после создания завершенная задача уходит в архив
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', '90'))
+
+# Размер пачки и пауза между пачками (не держим блокировки подолгу)
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+ARCHIVE_BATCH_PAUSE = float(os.getenv('ARCHIVE_BATCH_PAUSE', '0.2'))
+
+# Сколько дней хранится история попыток публикации
+ATTEMPT_RETENTION_DAYS = int(os.getenv('ATTEMPT_RETENTION_DAYS', '30'))
+
+# Максимум пачек за один запуск; остаток — в следующий запуск
+ARCHIVE_MAX_BATCHES = int(os.getenv('ARCHIVE_MAX_BATCHES', '100'))
+
+# Колонки, переносимые в архив (общие для обеих таблиц)
+ARCHIVED_COLUMNS = [
+    column.name for column in PublishJobArchive.__table__.columns
+    if column.name != 'archived_at'
+]
+
+
+def terminal_job_filter(cutoff: datetime):
+    """
+    Задачи в финальном статусе, созданные раньше cutoff
+
+    FAILED финальна только после исчерпанных retry: задача, ждущая
+    автоматического повтора, остается в publish_jobs.
+    """
+    return and_(
+        PublishJob.created_at < cutoff,
+        or_(
+            and_(PublishJob.status == "FAILED", PublishJob.retry_count > PUBLISH_MAX_RETRIES),
+            and_(
+                PublishJob.status == "COMPLETED",
+                or_(
+                    PublishJob.platform_status.is_(None),
+                    PublishJob.platform_status.notin_(("uploaded", "processing"))
+                )
+            )
+        )
+    )
+
+
+def archive_batch(db: Session, cutoff: datetime) -> int:
+    """
+    Перенести одну пачку задач в архив
+
+    INSERT ... SELECT и DELETE по одному списку id в одной транзакции;
+    выбранные строки блокируются FOR UPDATE SKIP LOCKED, поэтому
+    задачи, которые сейчас обновляет воркер, пропускаются.
+
+    Returns:
+        Число перенесенных задач
+    """
+    ids = [
+        row.id for row in db.query(PublishJob.id).filter(
+            terminal_job_filter(cutoff)
+        ).order_by(PublishJob.created_at).limit(ARCHIVE_BATCH_SIZE).with_for_update(skip_locked=True)
+    ]
+
+    if not ids:
+        db.rollback()
+        return 0
+
+    source = select(
+        *[PublishJob.__table__.c[name] for name in ARCHIVED_COLUMNS],
+        literal(datetime.utcnow()).label('archived_at')
+    ).where(PublishJob.id.in_(ids))
+
+    db.execute(insert(PublishJobArchive).from_select(ARCHIVED_COLUMNS + ['archived_at'], source))
+    db.execute(delete(PublishJob).where(PublishJob.id.in_(ids)))
+    db.commit()
+
+    return len(ids)
+
+
+def purge_attempts_batch(db: Session, cutoff: datetime) -> int:
+    """
+    Удалить одну пачку попыток, начатых раньше cutoff
+
+    Returns:
+        Число удаленных строк
+    """
+    ids = [
+        row.id for row in db.query(PublishAttempt.id).filter(
+            PublishAttempt.started_at < cutoff
+        ).order_by(PublishAttempt.id).limit(ARCHIVE_BATCH_SIZE)
+    ]
+
+    if ids:
+        db.execute(delete(PublishAttempt).where(PublishAttempt.id.in_(ids)))
+    db.commit()
+
+    return len(ids)
+
+
+@celery_app.task
+def archive_publish_jobs():
+    """
+    Перенести завершенные задачи старше JOB_RETENTION_DAYS в архив
+
+    Статус архивных заявок по-прежнему доступен через /status и
+    /api/status; дедупликация /ingest работает только по рабочей таблице.
+    История попыток старше ATTEMPT_RETENTION_DAYS удаляется.
+    """
+    db = SessionLocal()
+    cutoff = datetime.utcnow() - timedelta(days=JOB_RETENTION_DAYS)
+    attempts_cutoff = datetime.utcnow() - timedelta(days=ATTEMPT_RETENTION_DAYS)
+    archived = 0
+    purged = 0
+    started = time.monotonic()
+
+    try:
+        for _ in range(ARCHIVE_MAX_BATCHES):
+            count = archive_batch(db, cutoff)
+            archived += count
+
+            if count < ARCHIVE_BATCH_SIZE:
+                break
+            time.sleep(ARCHIVE_BATCH_PAUSE)
+
+        for _ in range(ARCHIVE_MAX_BATCHES):
+            count = purge_attempts_batch(db, attempts_cutoff)
+            purged += count
+
+            if count < ARCHIVE_BATCH_SIZE:
+                break
+            time.sleep(ARCHIVE_BATCH_PAUSE)
+
+        if archived:
+            logger.info(
+                "Publish jobs archived",
+                archived=archived,
+                cutoff=cutoff.isoformat(),
+                elapsed=round(time.monotonic() - started, 2)
+            )
+
+        if purged:
+            logger.info("Publish attempts purged", purged=purged, cutoff=attempts_cutoff.isoformat())
+
+        return {'archived': archived, 'purged_attempts': purged}
+
+    finally:
+        db.close()
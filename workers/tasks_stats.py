@@ -0,0 +1,42 @@
+"""Celery задачи статистики: свертка приращений в почасовые счетчики"""
+import os
+import structlog
+
+from workers.celery_app import celery_app
+from app.database import SessionLocal, roll_up_stats
+
+logger = structlog.get_logger()
+
+# Событий в одной транзакции свертки и максимум пачек за запуск
+STATS_ROLLUP_BATCH_SIZE = int(os.getenv('STATS_ROLLUP_BATCH_SIZE', '10000'))
+STATS_ROLLUP_MAX_BATCHES = int(os.getenv('STATS_ROLLUP_MAX_BATCHES', '20'))
+
+
+@celery_app.task
+def roll_up_publish_stats():
+    """
+    Свернуть publish_stats_events в publish_stats_hourly
+
+    Единственный писатель строк часа: запросы и воркеры только добавляют
+    события. /api/stats отстает от событий на STATS_ROLLUP_INTERVAL.
+    """
+    db = SessionLocal()
+    rolled_up = 0
+
+    try:
+        for _ in range(STATS_ROLLUP_MAX_BATCHES):
+            count = roll_up_stats(db, STATS_ROLLUP_BATCH_SIZE)
+            db.commit()
+            rolled_up += count
+            if count < STATS_ROLLUP_BATCH_SIZE:
+                break
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if rolled_up:
+        logger.info("Publish stats rolled up", events=rolled_up)
+
+    return {'rolled_up': rolled_up}
@@ -0,0 +1,126 @@
+"""Celery задачи для отслеживания обработки видео на платформах"""
+import os
+import structlog
+from datetime import datetime, timedelta
+from collections import defaultdict
+
+from workers.celery_app import celery_app
+from workers.tasks_publish import (
+    get_youtube_publisher,
+    get_vk_publisher,
+    get_tiktok_publisher
+)
+from app.database import SessionLocal, PublishJob
+from app.events import publish_job_event
+
+logger = structlog.get_logger()
+
+# Сколько задач одной платформы опрашивать за один запуск
+STATUS_POLL_BATCH = int(os.getenv('STATUS_POLL_BATCH', '500'))
+
+# Через сколько часов после публикации прекращаем опрос
+STATUS_POLL_MAX_AGE_HOURS = int(os.getenv('STATUS_POLL_MAX_AGE_HOURS', '48'))
+
+# Статусы платформы, для которых обработка еще не закончилась
+PENDING_PLATFORM_STATUSES = ('uploaded', 'processing')
+
+PUBLISHER_FACTORIES = {
+    'youtube': get_youtube_publisher,
+    'vk': get_vk_publisher,
+    'tiktok': get_tiktok_publisher,
+}
+
+
+@celery_app.task
+def poll_platform_statuses():
+    """
+    Опросить платформы о видео, которые еще обрабатываются
+
+    Задачи группируются по платформе и опрашиваются пакетно
+    (YouTube videos.list — 50 id за вызов, VK video.get — список через запятую),
+    результат записывается в platform_status и public_url.
+    """
+    db = SessionLocal()
+
+    try:
+        cutoff = datetime.utcnow() - timedelta(hours=STATUS_POLL_MAX_AGE_HOURS)
+
+        jobs_by_platform = defaultdict(list)
+        for platform in PUBLISHER_FACTORIES:
+            jobs = db.query(PublishJob).filter(
+                PublishJob.platform == platform,
+                PublishJob.status == "COMPLETED",
+                PublishJob.platform_status.in_(PENDING_PLATFORM_STATUSES),
+                PublishJob.platform_job_id.isnot(None),
+                PublishJob.published_at >= cutoff
+            ).order_by(PublishJob.published_at).limit(STATUS_POLL_BATCH).all()
+
+            if jobs:
+                jobs_by_platform[platform] = jobs
+
+        updated = 0
+
+        for platform, jobs in jobs_by_platform.items():
+            try:
+                publisher = PUBLISHER_FACTORIES[platform]()
+                statuses = publisher.get_videos_status([job.platform_job_id for job in jobs])
+            except Exception as e:
+                logger.warning(
+                    "Platform status poll failed",
+                    platform=platform,
+                    jobs=len(jobs),
+                    error=str(e)
+                )
+                continue
+
+            changed = [
+                job for job in jobs
+                if apply_platform_status(job, statuses.get(job.platform_job_id, {}))
+            ]
+
+            db.commit()
+
+            for job in changed:
+                publish_job_event(job)
+            updated += len(changed)
+
+            logger.info(
+                "Platform statuses polled",
+                platform=platform,
+                jobs=len(jobs)
+            )
+
+        return {'polled': sum(len(jobs) for jobs in jobs_by_platform.values()), 'updated': updated}
+
+    finally:
+        db.close()
+
+
+def apply_platform_status(job: PublishJob, status: dict) -> bool:
+    """
+    Записать статус платформы в задачу
+
+    Args:
+        job: Задача публикации
+        status: Нормализованный статус из get_videos_status
+
+    Returns:
+        True если задача изменилась
+    """
+    platform_status = status.get('status')
+
+    # not_found / error — временное состояние, попробуем в следующий раз
+    if platform_status not in ('processing', 'ready', 'failed'):
+        return False
+
+    changed = platform_status != job.platform_status
+    job.platform_status = platform_status
+
+    if status.get('public_url') and status['public_url'] != job.public_url:
+        job.public_url = status['public_url']
+        changed = True
+
+    if platform_status == 'failed' and status.get('error'):
+        job.error_message = status['error']
+
+    return changed
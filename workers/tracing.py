@@ -0,0 +1,97 @@
+"""Трассировка задач Celery: span задачи — потомок запроса, поставившего ее"""
+from celery.signals import (
+    before_task_publish,
+    task_prerun,
+    task_postrun,
+    task_retry,
+    task_failure,
+    worker_init,
+    worker_process_init,
+)
+from opentelemetry import context, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from app.tracing import tracer, setup_tracing, inject_context, extract_context
+from workers.db import uses_prefork
+
+# Заголовки W3C Trace Context
+TRACE_HEADERS = ('traceparent', 'tracestate')
+
+# Открытые span'ы выполняемых задач: task_id -> (span, токен контекста)
+_task_spans = {}
+
+
+@before_task_publish.connect
+def add_trace_context(headers=None, **kwargs):
+    """
+    Контекст трассировки в заголовках задачи (retry, прямой apply_async)
+
+    Задачи из outbox уже несут контекст запроса, поставившего их.
+    """
+    if headers is not None and 'traceparent' not in headers:
+        headers.update(inject_context())
+
+
+def task_trace_context(request) -> context.Context:
+    """Родительский контекст из заголовков задачи"""
+    carrier = {}
+    for key in TRACE_HEADERS:
+        value = getattr(request, key, None) or (request.headers or {}).get(key)
+        if value:
+            carrier[key] = value
+    return extract_context(carrier)
+
+
+@task_prerun.connect
+def start_task_span(task_id=None, task=None, **kwargs):
+    span = tracer.start_span(
+        f"celery {task.name}",
+        context=task_trace_context(task.request),
+        kind=SpanKind.CONSUMER,
+        attributes={
+            "celery.task_id": task_id,
+            "celery.retries": task.request.retries or 0
+        }
+    )
+    token = context.attach(trace.set_span_in_context(span))
+    _task_spans[task_id] = (span, token)
+
+
+@task_retry.connect
+def mark_task_retry(request=None, reason=None, **kwargs):
+    span, _ = _task_spans.get(request.id, (None, None))
+    if span is not None:
+        span.record_exception(reason)
+        span.set_status(Status(StatusCode.ERROR, type(reason).__name__))
+
+
+@task_failure.connect
+def mark_task_failure(task_id=None, exception=None, **kwargs):
+    span, _ = _task_spans.get(task_id, (None, None))
+    if span is not None:
+        span.record_exception(exception)
+        span.set_status(Status(StatusCode.ERROR, type(exception).__name__))
+
+
+@task_postrun.connect
+def end_task_span(task_id=None, state=None, **kwargs):
+    span, token = _task_spans.pop(task_id, (None, None))
+    if span is None:
+        return
+
+    span.set_attribute("celery.state", state or "")
+    context.detach(token)
+    span.end()
+
+
+@worker_init.connect
+def setup_worker_tracing(sender=None, **kwargs):
+    """threads/gevent/eventlet: задачи выполняются в главном процессе"""
+    if not uses_prefork(sender):
+        setup_tracing("fanout-worker")
+
+
+@worker_process_init.connect
+def setup_process_tracing(**kwargs):
+    """prefork: экспорт в каждом дочернем процессе"""
+    setup_tracing("fanout-worker")